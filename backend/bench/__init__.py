@@ -0,0 +1 @@
+"""Load-test harness for the CineGraph backend (see ``bench/run.py``)."""
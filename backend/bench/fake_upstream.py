@@ -0,0 +1,240 @@
+"""
+Local stand-in for OMDb, TMDB and poster hosts, for benchmarks.
+
+One app serves all three, so the backend only needs its base URLs pointed
+here (``OMDB_BASE_URL=http://127.0.0.1:9000``,
+``TMDB_BASE_URL=http://127.0.0.1:9000/3``):
+
+- ``GET /?i=tt...`` / ``GET /?s=...``               OMDb title and search
+- ``GET /3/find/{imdb_id}``                          TMDB ID lookup
+- ``GET /3/search/movie?query=...``                  TMDB title search
+- ``GET /3/movie/{id}``                              TMDB details
+- ``GET /3/movie/{id}/recommendations``              TMDB recommendations
+- ``GET /3/movie/{id}/external_ids``                 TMDB -> IMDb ID
+- ``GET /images/{name}``                             poster bytes
+
+Every payload is derived deterministically from the requested ID, so any
+``tt`` ID resolves and runs are reproducible. TMDB IDs are the numeric part
+of the IMDb ID. Latency, jitter and the error rate are configurable:
+
+    python -m bench.fake_upstream --port 9000 --latency-ms 80 --jitter-ms 40 --error-rate 0.01
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import random
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, Query, Request
+from fastapi.responses import JSONResponse, Response
+
+GENRES = ["Action", "Adventure", "Animation", "Comedy", "Crime", "Drama", "Fantasy",
+          "Horror", "Mystery", "Romance", "Sci-Fi", "Thriller"]
+LANGUAGES = [("English", "en"), ("Hindi", "hi"), ("Tamil", "ta"), ("Telugu", "te"), ("French", "fr")]
+WORDS = ["dark", "night", "return", "city", "lost", "star", "dream", "river", "king", "shadow",
+         "last", "empire", "secret", "storm", "silent", "golden", "broken", "wild", "iron", "ghost"]
+
+CATALOG_START = 100000
+CATALOG_SIZE = int(os.environ.get('FAKE_CATALOG_SIZE', 5000))
+IMAGE_BYTES = int(os.environ.get('FAKE_IMAGE_BYTES', 40 * 1024))
+
+config = {
+    "latency": float(os.environ.get('FAKE_LATENCY_MS', 50)) / 1000,
+    "jitter": float(os.environ.get('FAKE_JITTER_MS', 20)) / 1000,
+    "error_rate": float(os.environ.get('FAKE_ERROR_RATE', 0.0)),
+}
+counters: Dict[str, int] = {}
+
+app = FastAPI()
+
+
+def _seed(key: str) -> int:
+    return int.from_bytes(hashlib.sha1(key.encode()).digest()[:8], "big")
+
+
+def imdb_id(number: int) -> str:
+    return f"tt{number:07d}"
+
+
+def catalog_ids() -> List[str]:
+    """The IMDb IDs a benchmark should draw from"""
+    return [imdb_id(CATALOG_START + k) for k in range(CATALOG_SIZE)]
+
+
+@lru_cache(maxsize=None)
+def title_for(number: int) -> str:
+    rng = random.Random(number)
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 3))).title()
+
+
+def movie(number: int) -> Dict[str, Any]:
+    rng = random.Random(number)
+    language, code = LANGUAGES[rng.randrange(len(LANGUAGES))] if rng.random() < 0.4 else LANGUAGES[0]
+    year = rng.randint(1970, 2024)
+    return {
+        "number": number,
+        "title": title_for(number),
+        "year": year,
+        "genres": rng.sample(GENRES, rng.randint(1, 3)),
+        "language": language,
+        "code": code,
+        "rating": round(rng.uniform(4.0, 9.3), 1),
+        "runtime": rng.randint(80, 180),
+        "plot": " ".join(rng.choice(WORDS) for _ in range(30)).capitalize() + ".",
+    }
+
+
+def omdb_movie(number: int, image_base: str) -> Dict[str, Any]:
+    m = movie(number)
+    return {
+        "Title": m["title"], "Year": str(m["year"]), "Rated": "PG-13",
+        "Released": f"01 Jan {m['year']}", "Runtime": f"{m['runtime']} min",
+        "Genre": ", ".join(m["genres"]), "Director": "Jane Doe", "Actors": "A. Actor, B. Actor",
+        "Plot": m["plot"], "Language": m["language"], "Country": "USA",
+        "Awards": "N/A", "Poster": f"{image_base}images/{number}.jpg",
+        "imdbRating": str(m["rating"]), "imdbVotes": "12,345", "imdbID": imdb_id(number),
+        "Type": "movie", "Response": "True",
+    }
+
+
+def tmdb_movie(number: int) -> Dict[str, Any]:
+    m = movie(number)
+    return {
+        "id": number, "title": m["title"], "original_language": m["code"],
+        "release_date": f"{m['year']}-01-01", "poster_path": f"/{number}.jpg",
+        "vote_average": m["rating"], "overview": m["plot"], "imdb_id": imdb_id(number),
+    }
+
+
+def search_hits(query: str) -> List[int]:
+    """Catalog numbers whose title contains every word of the query"""
+    words = query.lower().split()
+    return [
+        n for n in range(CATALOG_START, CATALOG_START + CATALOG_SIZE)
+        if all(word in title_for(n).lower().split() for word in words)
+    ]
+
+
+async def emulate(kind: str) -> Optional[Response]:
+    """Sleep for the configured latency; maybe return an injected failure"""
+    counters[kind] = counters.get(kind, 0) + 1
+    delay = config["latency"] + random.uniform(-config["jitter"], config["jitter"])
+    if delay > 0:
+        await asyncio.sleep(delay)
+    if config["error_rate"] and random.random() < config["error_rate"]:
+        counters["errors"] = counters.get("errors", 0) + 1
+        return JSONResponse({"status_message": "injected failure"}, status_code=503)
+    return None
+
+
+def parse_imdb_id(value: str) -> Optional[int]:
+    if not value.startswith("tt") or not value[2:].isdigit():
+        return None
+    return int(value[2:])
+
+
+@app.get("/")
+async def omdb(request: Request, i: Optional[str] = None, s: Optional[str] = None, page: int = 1):
+    failure = await emulate("omdb_search" if s else "omdb_title")
+    if failure:
+        return failure
+    if i:
+        number = parse_imdb_id(i)
+        if number is None:
+            return {"Response": "False", "Error": "Incorrect IMDb ID."}
+        return omdb_movie(number, str(request.base_url))
+    if s:
+        hits = search_hits(s)
+        if not hits:
+            return {"Response": "False", "Error": "Movie not found!"}
+        start = (page - 1) * 10
+        return {
+            "Search": [
+                {"Title": title_for(n), "Year": str(movie(n)["year"]), "imdbID": imdb_id(n),
+                 "Type": "movie", "Poster": f"{request.base_url}images/{n}.jpg"}
+                for n in hits[start:start + 10]
+            ],
+            "totalResults": str(len(hits)),
+            "Response": "True",
+        }
+    return {"Response": "False", "Error": "No API key provided."}
+
+
+@app.get("/3/find/{external_id}")
+async def tmdb_find(external_id: str, external_source: str = Query("imdb_id")):
+    failure = await emulate("tmdb_find")
+    if failure:
+        return failure
+    number = parse_imdb_id(external_id)
+    return {"movie_results": [tmdb_movie(number)] if number is not None else [], "tv_results": []}
+
+
+@app.get("/3/search/movie")
+async def tmdb_search(query: str = "", page: int = 1):
+    failure = await emulate("tmdb_search")
+    if failure:
+        return failure
+    # Same matches as OMDb, in a different order, so paging has to merge and dedupe
+    hits = sorted(search_hits(query), key=lambda n: _seed(f"search{n}"))
+    start = (page - 1) * 20
+    results = [{k: v for k, v in tmdb_movie(n).items() if k != "imdb_id"} for n in hits[start:start + 20]]
+    total_pages = (len(hits) + 19) // 20
+    return {"page": page, "results": results, "total_pages": total_pages, "total_results": len(hits)}
+
+
+@app.get("/3/movie/{tmdb_id}")
+async def tmdb_details(tmdb_id: int):
+    failure = await emulate("tmdb_movie")
+    return failure or tmdb_movie(tmdb_id)
+
+
+@app.get("/3/movie/{tmdb_id}/recommendations")
+async def tmdb_recommendations(tmdb_id: int):
+    failure = await emulate("tmdb_recommendations")
+    if failure:
+        return failure
+    rng = random.Random(_seed(f"recs{tmdb_id}"))
+    picks = rng.sample(range(CATALOG_START, CATALOG_START + CATALOG_SIZE), 20)
+    results = [{k: v for k, v in tmdb_movie(n).items() if k != "imdb_id"} for n in picks if n != tmdb_id]
+    return {"page": 1, "results": results, "total_pages": 1, "total_results": len(results)}
+
+
+@app.get("/3/movie/{tmdb_id}/external_ids")
+async def tmdb_external_ids(tmdb_id: int):
+    failure = await emulate("tmdb_external_ids")
+    return failure or {"id": tmdb_id, "imdb_id": imdb_id(tmdb_id)}
+
+
+@app.get("/images/{name}")
+async def image(name: str):
+    failure = await emulate("image")
+    if failure:
+        return failure
+    body = hashlib.sha256(name.encode()).digest() * (IMAGE_BYTES // 32)
+    return Response(b"\xff\xd8\xff\xe0" + body, media_type="image/jpeg")
+
+
+@app.get("/_stats")
+async def stats():
+    return {"config": config, "requests": counters}
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Fake OMDb/TMDB/image upstream for benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency-ms", type=float, default=config["latency"] * 1000)
+    parser.add_argument("--jitter-ms", type=float, default=config["jitter"] * 1000)
+    parser.add_argument("--error-rate", type=float, default=config["error_rate"])
+    args = parser.parse_args()
+
+    config.update(latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000, error_rate=args.error_rate)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+In-process micro-benchmarks for the backend's hot data structures.
+
+Each benchmark times individual calls over a synthetic catalog (the same
+deterministic titles the fake upstream serves) and reports ops/s and
+per-call percentiles in the same JSON format as ``bench.run``:
+
+    python -m bench.micro
+    python -m bench.micro --only search --baseline bench/baselines/micro.json
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from bench import report
+from bench.fake_upstream import CATALOG_START, WORDS, catalog_ids, omdb_movie, title_for
+from caching import TTLCache
+from recommender import RecommendationIndex
+import rendering
+from search_index import TitleSearchIndex
+from store import SQLiteStore, normalize_omdb_movie
+
+
+def timed(fn: Callable[[int], Any], iterations: int) -> Dict[str, float]:
+    latencies: List[float] = []
+    started = time.perf_counter()
+    for i in range(iterations):
+        begin = time.perf_counter()
+        fn(i)
+        latencies.append(time.perf_counter() - begin)
+    return report.summarize(latencies, time.perf_counter() - started)
+
+
+def catalog_payloads(size: int) -> List[Dict[str, Any]]:
+    return [omdb_movie(CATALOG_START + k, "http://127.0.0.1/") for k in range(size)]
+
+
+def bench_cache(payloads, iterations):
+    cache = TTLCache(max_entries=len(payloads), default_ttl=3600)
+    keys = [f"omdb_{p['imdbID']}" for p in payloads]
+    for key, payload in zip(keys, payloads):
+        cache.set("omdb_detail", key, payload)
+    return {
+        "cache.lookup_hit": timed(lambda i: cache.lookup("omdb_detail", keys[i % len(keys)]), iterations),
+        "cache.lookup_miss": timed(lambda i: cache.lookup("omdb_detail", f"missing_{i}"), iterations),
+        "cache.set": timed(lambda i: cache.set("omdb_detail", keys[i % len(keys)], payloads[i % len(keys)]), iterations),
+    }
+
+
+def bench_search(payloads, iterations):
+    index = TitleSearchIndex()
+    index.add_many(normalize_omdb_movie(p) for p in payloads)
+    prefixes = [title_for(CATALOG_START + k).lower()[:5] for k in range(len(payloads))]
+    typos = [word[:2] + word[3:] + "x" for word in WORDS]
+    return {
+        "search.prefix": timed(lambda i: index.search(prefixes[i % len(prefixes)]), iterations),
+        "search.typo": timed(lambda i: index.search(typos[i % len(typos)]), iterations),
+    }
+
+
+def bench_recommender(payloads, iterations):
+    index = RecommendationIndex()
+    for payload in payloads:
+        index.add(normalize_omdb_movie(payload))
+    ids = catalog_ids()[:len(payloads)]
+    return {"recommender.similar": timed(lambda i: index.similar(ids[i % len(ids)], k=10), iterations)}
+
+
+def bench_store(payloads, iterations):
+    with tempfile.TemporaryDirectory(prefix="cinegraph-micro-") as data_dir:
+        store = SQLiteStore(os.path.join(data_dir, "micro.db"))
+        try:
+            keys = [f"omdb_{p['imdbID']}" for p in payloads]
+            expires_at = time.time() + 3600
+            for key, payload in zip(keys, payloads):
+                store.set(key, "omdb_detail", payload, expires_at)
+            store.put_movies([normalize_omdb_movie(p) for p in payloads])
+            ids = [p['imdbID'] for p in payloads]
+            return {
+                "store.get": timed(lambda i: store.get(keys[i % len(keys)]), iterations),
+                "store.get_movie": timed(lambda i: store.get_movie(ids[i % len(ids)]), iterations),
+            }
+        finally:
+            store.close()
+
+
+def bench_encode(payloads, iterations):
+    page = payloads[:10]
+    return {
+        "encode.stdlib_json": timed(lambda i: json.dumps(page), iterations),
+        "encode.rendering_dumps": timed(lambda i: rendering.dumps(page), iterations),
+    }
+
+
+BENCHMARKS = {
+    "cache": bench_cache,
+    "search": bench_search,
+    "recommender": bench_recommender,
+    "store": bench_store,
+    "encode": bench_encode,
+}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for caches, indexes and the store")
+    parser.add_argument("--only", help=f"comma-separated subset of {', '.join(BENCHMARKS)}")
+    parser.add_argument("--catalog-size", type=int, default=5000)
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--out", help="write results JSON here (default bench/results/<timestamp>.json)")
+    parser.add_argument("--save-baseline", metavar="PATH", help="also write the results as a baseline file")
+    parser.add_argument("--baseline", help="compare against this baseline file")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative change counted as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true", help="exit 1 if any regression is found")
+    args = parser.parse_args(argv)
+
+    names = [n.strip() for n in args.only.split(",")] if args.only else list(BENCHMARKS)
+    unknown = set(names) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    payloads = catalog_payloads(args.catalog_size)
+    results: Dict[str, Dict[str, float]] = {}
+    for name in names:
+        results.update(BENCHMARKS[name](payloads, args.iterations))
+    report.print_table(results)
+
+    meta = report.run_metadata(kind="micro", catalog_size=args.catalog_size, iterations=args.iterations)
+    out = args.out or str(Path(__file__).parent / "results" / f"micro-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    report.save(out, meta, results)
+    print(f"\nResults written to {out}")
+    if args.save_baseline:
+        report.save(args.save_baseline, meta, results)
+
+    if args.baseline:
+        lines, regressions = report.compare(report.load(args.baseline), results, args.threshold)
+        print()
+        print("\n".join(lines))
+        if regressions and args.fail_on_regression:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
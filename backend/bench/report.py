@@ -0,0 +1,98 @@
+"""
+Summaries, JSON result files and baseline comparison shared by the load and
+micro benchmarks.
+
+A result file looks like::
+
+    {"meta": {...}, "results": {"movie@50": {"throughput_rps": ..., "p95_ms": ..., ...}}}
+
+``compare`` matches entries by key and flags a regression when throughput
+drops, or p95/p99 latency grows, by more than the threshold.
+"""
+import json
+import math
+import platform
+import subprocess
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Sequence, Tuple
+
+LATENCY_KEYS = ("p95_ms", "p99_ms")
+THROUGHPUT_KEY = "throughput_rps"
+
+
+def percentile(sorted_values: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted sequence"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies: List[float], elapsed: float, errors: int = 0) -> Dict[str, float]:
+    """Throughput and latency percentiles (latencies in seconds, reported in ms)"""
+    ordered = sorted(latencies)
+    count = len(ordered)
+    return {
+        "requests": count,
+        "errors": errors,
+        THROUGHPUT_KEY: round(count / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(sum(ordered) / count * 1000, 3) if count else 0.0,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3) if count else 0.0,
+    }
+
+
+def run_metadata(**extra: Any) -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        **extra,
+    }
+
+
+def save(path: str, meta: Dict[str, Any], results: Dict[str, Dict[str, float]]):
+    out = Path(path)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps({"meta": meta, "results": results}, indent=2, sort_keys=True) + "\n")
+
+
+def load(path: str) -> Dict[str, Dict[str, float]]:
+    return json.loads(Path(path).read_text())["results"]
+
+
+def compare(baseline: Dict[str, Dict[str, float]], current: Dict[str, Dict[str, float]],
+            threshold: float = 0.10) -> Tuple[List[str], List[str]]:
+    """Return (report lines, regression descriptions) for entries present in both runs"""
+    lines = [f"{'benchmark':<28}{'metric':<16}{'baseline':>12}{'current':>12}{'change':>10}"]
+    regressions = []
+    for key in sorted(set(baseline) & set(current)):
+        for metric in (THROUGHPUT_KEY, *LATENCY_KEYS):
+            old, new = baseline[key].get(metric), current[key].get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = change < -threshold if metric == THROUGHPUT_KEY else change > threshold
+            flag = "  <-- regression" if worse else ""
+            lines.append(f"{key:<28}{metric:<16}{old:>12.2f}{new:>12.2f}{change:>+10.1%}{flag}")
+            if worse:
+                regressions.append(f"{key} {metric} {old:.2f} -> {new:.2f} ({change:+.1%})")
+    return lines, regressions
+
+
+def print_table(results: Dict[str, Dict[str, float]]):
+    print(f"{'benchmark':<28}{'reqs':>8}{'errors':>8}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for key, r in results.items():
+        print(f"{key:<28}{r['requests']:>8}{r['errors']:>8}{r[THROUGHPUT_KEY]:>10.1f}"
+              f"{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}")
@@ -0,0 +1,274 @@
+"""
+Load benchmark for the backend API against the local fake upstream.
+
+By default this starts ``bench.fake_upstream`` and the backend (``uvicorn
+server:app``) as subprocesses on free ports, with a throwaway data directory
+and the base URLs pointed at the fake, then drives each scenario at each
+concurrency level for a fixed duration:
+
+    python -m bench.run --concurrency 1,10,50 --duration 10
+    python -m bench.run --scenarios movie,recs --save-baseline bench/baselines/local.json
+    python -m bench.run --baseline bench/baselines/local.json --fail-on-regression
+
+Scenarios draw IDs from the fake catalog with a hot/cold mix (most requests
+hit a small hot set, the rest are spread over the whole catalog), seeded so
+runs are repeatable. ``--target`` benchmarks an already running backend
+instead; it must be configured against a fake upstream at ``--upstream``.
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from bench import report
+from bench.fake_upstream import CATALOG_SIZE, CATALOG_START, WORDS, catalog_ids, title_for
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+HOT_SET = 100
+HOT_RATIO = 0.8
+
+RequestSpec = Tuple[str, Dict[str, str]]
+
+
+class Workload:
+    """Generates (path, params) for each scenario from a seeded RNG"""
+
+    def __init__(self, upstream_url: str, seed: int = 42):
+        self.rng = random.Random(seed)
+        self.ids = catalog_ids()
+        self.upstream_url = upstream_url.rstrip("/")
+
+    def _pick(self) -> int:
+        if self.rng.random() < HOT_RATIO:
+            return self.rng.randrange(min(HOT_SET, len(self.ids)))
+        return self.rng.randrange(len(self.ids))
+
+    def search(self) -> RequestSpec:
+        # Search-as-you-type: a prefix of a real title, or a random word prefix
+        if self.rng.random() < 0.7:
+            title = title_for(CATALOG_START + self._pick()).lower()
+            query = title[:self.rng.randint(3, len(title))] if len(title) > 3 else title
+        else:
+            word = self.rng.choice(WORDS)
+            query = word[:self.rng.randint(3, len(word))]
+        return "/api/search", {"query": query}
+
+    def movie(self) -> RequestSpec:
+        return f"/api/movie/{self.ids[self._pick()]}", {}
+
+    def recs(self) -> RequestSpec:
+        return f"/api/movie/{self.ids[self._pick()]}/recommendations", {}
+
+    def trending(self) -> RequestSpec:
+        return "/api/trending", {}
+
+    def proxy_image(self) -> RequestSpec:
+        return "/api/proxy-image", {"url": f"{self.upstream_url}/images/{CATALOG_START + self._pick()}.jpg"}
+
+    def scenario(self, name: str) -> Callable[[], RequestSpec]:
+        return getattr(self, name.replace("-", "_"))
+
+
+SCENARIOS = ("search", "movie", "recs", "trending", "proxy-image")
+
+
+async def drive(client: httpx.AsyncClient, next_request: Callable[[], RequestSpec], concurrency: int,
+                duration: float, warmup: float) -> Dict[str, float]:
+    """Run `concurrency` closed-loop workers; only requests started after warmup are measured"""
+    latencies: List[float] = []
+    errors = 0
+    started = time.perf_counter()
+    measure_from = started + warmup
+    deadline = measure_from + duration
+
+    async def worker():
+        nonlocal errors
+        while True:
+            begin = time.perf_counter()
+            if begin >= deadline:
+                return
+            path, params = next_request()
+            try:
+                response = await client.get(path, params=params)
+                failed = response.status_code >= 500
+                # Drain streamed bodies (proxy-image) so timing includes the transfer
+                await response.aread()
+            except httpx.HTTPError:
+                failed = True
+            if begin >= measure_from:
+                latencies.append(time.perf_counter() - begin)
+                errors += failed
+
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return report.summarize(latencies, duration, errors)
+
+
+async def run_benchmarks(target: str, upstream: str, scenarios: List[str], levels: List[int],
+                         duration: float, warmup: float, seed: int) -> Dict[str, Dict[str, float]]:
+    results = {}
+    workload = Workload(upstream, seed)
+    for scenario in scenarios:
+        for concurrency in levels:
+            limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+            async with httpx.AsyncClient(base_url=target, timeout=30.0, limits=limits) as client:
+                key = f"{scenario}@{concurrency}"
+                results[key] = await drive(client, workload.scenario(scenario), concurrency, duration, warmup)
+                r = results[key]
+                print(f"{key:<28} {r['throughput_rps']:>9.1f} rps  p50 {r['p50_ms']:.1f} ms  "
+                      f"p95 {r['p95_ms']:.1f} ms  p99 {r['p99_ms']:.1f} ms  errors {r['errors']}", flush=True)
+    return results
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_until_up(url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout:.0f}s")
+
+
+def start_stack(args, data_dir: str) -> Tuple[List[subprocess.Popen], str, str]:
+    """Start the fake upstream and the backend; returns (processes, backend URL, upstream URL)"""
+    upstream_port, backend_port = free_port(), free_port()
+    upstream_url = f"http://127.0.0.1:{upstream_port}"
+    backend_url = f"http://127.0.0.1:{backend_port}"
+    output = None if args.show_logs else subprocess.DEVNULL
+
+    fake = subprocess.Popen(
+        [sys.executable, "-m", "bench.fake_upstream", "--port", str(upstream_port),
+         "--latency-ms", str(args.upstream_latency_ms), "--jitter-ms", str(args.upstream_jitter_ms),
+         "--error-rate", str(args.upstream_error_rate)],
+        cwd=BACKEND_DIR, stdout=output, stderr=output,
+    )
+    env = {
+        **os.environ,
+        "OMDB_API_KEY": "bench",
+        "TMDB_API_KEY": "bench",
+        "OMDB_BASE_URL": upstream_url,
+        "TMDB_BASE_URL": f"{upstream_url}/3",
+        # Measure the backend, not its client-side protection of the real providers' quotas
+        "OMDB_RATE_LIMIT": "100000",
+        "OMDB_RATE_BURST": "100000",
+        "TMDB_RATE_LIMIT": "100000",
+        "TMDB_RATE_BURST": "100000",
+        "METADATA_STORE_PATH": os.path.join(data_dir, "cinegraph.db"),
+        "RECOMMENDER_INDEX_PATH": os.path.join(data_dir, "recommender"),
+        "IMAGE_CACHE_DIR": os.path.join(data_dir, "images"),
+        "WARMER_ENABLED": "1" if args.warmer else "0",
+    }
+    backend = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1", "--port", str(backend_port),
+         "--log-level", "warning", "--no-access-log"],
+        cwd=BACKEND_DIR, env=env, stdout=output, stderr=output,
+    )
+    processes = [fake, backend]
+    try:
+        wait_until_up(f"{upstream_url}/_stats")
+        wait_until_up(f"{backend_url}/api/")
+    except RuntimeError:
+        stop_stack(processes)
+        raise
+    return processes, backend_url, upstream_url
+
+
+def stop_stack(processes: List[subprocess.Popen]):
+    for process in reversed(processes):
+        process.terminate()
+    for process in processes:
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def parse_levels(value: str) -> List[int]:
+    return [int(level) for level in value.split(",") if level.strip()]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the CineGraph API against a fake upstream")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"comma-separated subset of {', '.join(SCENARIOS)}")
+    parser.add_argument("--concurrency", type=parse_levels, default=[1, 10, 50], help="comma-separated levels")
+    parser.add_argument("--duration", type=float, default=10.0, help="measured seconds per scenario and level")
+    parser.add_argument("--warmup", type=float, default=2.0, help="unmeasured seconds before each measurement")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--target", help="benchmark an already running backend at this URL")
+    parser.add_argument("--upstream", default="http://127.0.0.1:9000", help="fake upstream URL used with --target")
+    parser.add_argument("--upstream-latency-ms", type=float, default=50.0)
+    parser.add_argument("--upstream-jitter-ms", type=float, default=20.0)
+    parser.add_argument("--upstream-error-rate", type=float, default=0.0)
+    parser.add_argument("--warmer", action="store_true", help="keep the background cache warmer enabled")
+    parser.add_argument("--show-logs", action="store_true", help="pass the backend's and fake upstream's logs through")
+    parser.add_argument("--out", help="write results JSON here (default bench/results/<timestamp>.json)")
+    parser.add_argument("--save-baseline", metavar="PATH", help="also write the results as a baseline file")
+    parser.add_argument("--baseline", help="compare against this baseline file")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative change counted as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true", help="exit 1 if any regression is found")
+    args = parser.parse_args(argv)
+
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    with tempfile.TemporaryDirectory(prefix="cinegraph-bench-") as data_dir:
+        processes: List[subprocess.Popen] = []
+        if args.target:
+            target, upstream = args.target, args.upstream
+        else:
+            processes, target, upstream = start_stack(args, data_dir)
+        try:
+            results = asyncio.run(run_benchmarks(
+                target, upstream, scenarios, args.concurrency, args.duration, args.warmup, args.seed))
+        finally:
+            stop_stack(processes)
+
+    meta = report.run_metadata(
+        kind="load",
+        duration=args.duration,
+        warmup=args.warmup,
+        seed=args.seed,
+        catalog_size=CATALOG_SIZE,
+        upstream_latency_ms=args.upstream_latency_ms,
+        upstream_jitter_ms=args.upstream_jitter_ms,
+        upstream_error_rate=args.upstream_error_rate,
+        warmer=args.warmer,
+    )
+    out = args.out or str(Path(__file__).parent / "results" / f"load-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    report.save(out, meta, results)
+    print(f"\nResults written to {out}")
+    if args.save_baseline:
+        report.save(args.save_baseline, meta, results)
+        print(f"Baseline written to {args.save_baseline}")
+
+    if args.baseline:
+        lines, regressions = report.compare(report.load(args.baseline), results, args.threshold)
+        print()
+        print("\n".join(lines))
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+            if args.fail_on_regression:
+                return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,306 @@
+"""
+Bounded in-process cache used by the OMDb/TMDB request helpers.
+
+Entries are grouped into namespaces (e.g. ``omdb_detail``, ``omdb_search``,
+``tmdb``) so each kind of upstream payload gets its own TTL and its own
+hit/miss counters. The cache is capped both by entry count and by an
+approximate byte budget; when either cap is exceeded the least recently used
+entries are evicted. A background task periodically sweeps expired entries so
+memory stays flat even for keys that are never read again.
+
+Expired entries are kept for an extra ``stale_ttl`` window so callers can
+serve them immediately while a refresh runs in the background
+(stale-while-revalidate). Negative results are stored like any other value,
+just with a short TTL and no stale window.
+"""
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MISSING = object()
+
+
+def estimate_size(value: Any) -> int:
+    """Approximate the memory footprint of a JSON-like value in bytes"""
+    try:
+        return len(json.dumps(value, separators=(",", ":"), default=str))
+    except (TypeError, ValueError):
+        return 256
+
+
+class CachedFailure:
+    """Negative-cache marker for an upstream call that failed"""
+    __slots__ = ("detail",)
+
+    def __init__(self, detail: str):
+        self.detail = detail
+
+    def __repr__(self) -> str:
+        return f"CachedFailure({self.detail!r})"
+
+
+class CacheEntry:
+    __slots__ = ("namespace", "value", "size", "stored_at", "expires_at", "stale_until")
+
+    def __init__(self, namespace: str, value: Any, size: int, stored_at: float, expires_at: float, stale_until: float):
+        self.namespace = namespace
+        self.value = value
+        self.size = size
+        self.stored_at = stored_at
+        self.expires_at = expires_at
+        self.stale_until = stale_until
+
+
+class NamespaceStats:
+    __slots__ = ("hits", "stale_hits", "misses", "sets", "evictions", "expirations")
+
+    def __init__(self):
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class TTLCache:
+    """LRU cache with per-namespace TTLs and entry/byte caps"""
+
+    def __init__(
+        self,
+        max_entries: int = 5000,
+        max_bytes: int = 64 * 1024 * 1024,
+        default_ttl: float = 3600,
+        namespace_ttls: Optional[Dict[str, float]] = None,
+        stale_ttl: float = 0,
+        sweep_interval: float = 60,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.stale_ttl = stale_ttl
+        self.namespace_ttls = dict(namespace_ttls or {})
+        self.sweep_interval = sweep_interval
+
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._bytes = 0
+        self._stats: Dict[str, NamespaceStats] = {}
+        self._sweeper: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and entry.expires_at > time.time()
+
+    @property
+    def total_bytes(self) -> int:
+        return self._bytes
+
+    def ttl_for(self, namespace: str) -> float:
+        return self.namespace_ttls.get(namespace, self.default_ttl)
+
+    def _stats_for(self, namespace: str) -> NamespaceStats:
+        stats = self._stats.get(namespace)
+        if stats is None:
+            stats = self._stats[namespace] = NamespaceStats()
+        return stats
+
+    def peek(self, key: str) -> Optional[CacheEntry]:
+        """Return the live (fresh or stale) entry for key without touching LRU order or stats"""
+        entry = self._entries.get(key)
+        if entry is None or entry.stale_until <= time.time():
+            return None
+        return entry
+
+    def lookup(self, namespace: str, key: str) -> Optional[Tuple[Any, bool]]:
+        """Return (value, is_stale) for key, or None if missing or past its stale window"""
+        entry = self._entries.get(key)
+        stats = self._stats_for(namespace)
+        if entry is None:
+            stats.misses += 1
+            return None
+        now = time.time()
+        if entry.stale_until <= now:
+            self._remove(key)
+            stats.misses += 1
+            stats.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        if entry.expires_at <= now:
+            stats.stale_hits += 1
+            return entry.value, True
+        stats.hits += 1
+        return entry.value, False
+
+    def get(self, namespace: str, key: str, default: Any = None) -> Any:
+        """Return the fresh cached value for key, or default if missing/expired"""
+        entry = self._entries.get(key)
+        stats = self._stats_for(namespace)
+        if entry is None:
+            stats.misses += 1
+            return default
+        now = time.time()
+        if entry.expires_at <= now:
+            if entry.stale_until <= now:
+                self._remove(key)
+                stats.expirations += 1
+            stats.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        stats.hits += 1
+        return entry.value
+
+    def set(
+        self,
+        namespace: str,
+        key: str,
+        value: Any,
+        ttl: Optional[float] = None,
+        size: Optional[int] = None,
+        stale_ttl: Optional[float] = None,
+    ):
+        """Store value under key, evicting LRU entries if over capacity"""
+        if ttl is None:
+            ttl = self.ttl_for(namespace)
+        if stale_ttl is None:
+            stale_ttl = self.stale_ttl
+        if size is None:
+            size = estimate_size(value)
+        if size > self.max_bytes:
+            # Never let a single oversized payload flush the whole cache
+            return
+
+        if key in self._entries:
+            self._remove(key)
+
+        now = time.time()
+        self._entries[key] = CacheEntry(namespace, value, size, now, now + ttl, now + ttl + stale_ttl)
+        self._bytes += size
+        self._stats_for(namespace).sets += 1
+        self._evict()
+
+    def delete(self, key: str):
+        if key in self._entries:
+            self._remove(key)
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    def _remove(self, key: str) -> CacheEntry:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+        return entry
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            _, entry = self._entries.popitem(last=False)
+            self._bytes -= entry.size
+            self._stats_for(entry.namespace).evictions += 1
+
+    def sweep(self) -> int:
+        """Drop every entry past its stale window, returning how many were removed"""
+        now = time.time()
+        expired = [key for key, entry in self._entries.items() if entry.stale_until <= now]
+        for key in expired:
+            entry = self._remove(key)
+            self._stats_for(entry.namespace).expirations += 1
+        return len(expired)
+
+    def stats(self) -> Dict[str, Any]:
+        namespaces = {name: stats.as_dict() for name, stats in self._stats.items()}
+        hits = sum(s["hits"] + s["stale_hits"] for s in namespaces.values())
+        misses = sum(s["misses"] for s in namespaces.values())
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hit_ratio": hits / (hits + misses) if hits + misses else 0.0,
+            "namespaces": namespaces,
+        }
+
+    async def _sweep_loop(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                removed = self.sweep()
+                if removed:
+                    logger.debug("Cache sweep removed %d expired entries", removed)
+            except Exception:
+                logger.exception("Cache sweep failed")
+
+    def start_sweeper(self):
+        """Start the background expiry sweep on the running event loop"""
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.get_running_loop().create_task(self._sweep_loop())
+
+    async def stop_sweeper(self):
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            try:
+                await self._sweeper
+            except asyncio.CancelledError:
+                pass
+            self._sweeper = None
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key into a single in-flight task.
+
+    The first caller for a key starts the work; everyone arriving while it is
+    still running awaits the same task and receives its result or exception.
+    Waiters are shielded from each other, so one client disconnecting does
+    not cancel the fetch the others are waiting on.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._inflight
+
+    def _start(self, key: str, fn: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        task = asyncio.ensure_future(fn())
+        self._inflight[key] = task
+        task.add_done_callback(lambda t, key=key: self._done(key, t))
+        self.started += 1
+        return task
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._start(key, fn)
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def spawn(self, key: str, fn: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        """Run fn in the background unless a call for key is already in flight"""
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._start(key, fn)
+        return task
+
+    def _done(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved in case every waiter went away
+        if not task.cancelled():
+            task.exception()
@@ -0,0 +1,145 @@
+"""
+In-process IP-to-country lookup over a local range database.
+
+The database is a CSV of address ranges, one per row::
+
+    start,end,country_code[,country_name]
+
+where ``start``/``end`` are either IP address strings (DB-IP "IP to Country
+Lite") or integers (IP2Location LITE DB1); IPv4 and IPv6 rows may be mixed
+and ``.gz`` files are read directly. Ranges are kept per address family as
+sorted parallel lists, so a lookup is one ``bisect`` plus a bounds check,
+and recent answers sit in a small LRU cache in front of that.
+"""
+import bisect
+import csv
+import gzip
+import io
+import ipaddress
+import logging
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+Country = Tuple[str, str]  # (ISO code, name)
+
+
+class _Ranges:
+    """Sorted, non-overlapping ranges for one address family"""
+
+    __slots__ = ("starts", "ends", "countries")
+
+    def __init__(self):
+        self.starts: List[int] = []
+        self.ends: List[int] = []
+        self.countries: List[Country] = []
+
+    def find(self, address: int) -> Optional[Country]:
+        i = bisect.bisect_right(self.starts, address) - 1
+        if i >= 0 and address <= self.ends[i]:
+            return self.countries[i]
+        return None
+
+
+IPV4_MAPPED = int(ipaddress.ip_address("::ffff:0.0.0.0"))
+
+
+def _parse_bound(value: str) -> Tuple[int, int]:
+    """(IP version, integer address) for an address string or an integer column"""
+    value = value.strip()
+    if value.isdigit():
+        number = int(value)
+        version = 4 if number < 2 ** 32 else 6
+    else:
+        address = ipaddress.ip_address(value)
+        number, version = int(address), address.version
+    # IPv6 databases list IPv4 space as ::ffff:a.b.c.d; store it with the IPv4 ranges
+    if version == 6 and IPV4_MAPPED <= number < IPV4_MAPPED + 2 ** 32:
+        return 4, number - IPV4_MAPPED
+    return version, number
+
+
+class GeoIPDatabase:
+    """Country lookups for IPv4 and IPv6 client addresses"""
+
+    __slots__ = ("_families", "_cached_lookup")
+
+    def __init__(self, cache_size: int = 10000):
+        self._families: Dict[int, _Ranges] = {4: _Ranges(), 6: _Ranges()}
+        self._cached_lookup = lru_cache(maxsize=cache_size)(self._lookup)
+
+    def __len__(self) -> int:
+        return sum(len(ranges.starts) for ranges in self._families.values())
+
+    @classmethod
+    def load(cls, path: str, cache_size: int = 10000) -> "GeoIPDatabase":
+        db = cls(cache_size)
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rb") as raw:
+            db.add_rows(csv.reader(io.TextIOWrapper(raw, encoding="utf-8", newline="")))
+        return db
+
+    def add_rows(self, rows) -> int:
+        """Add (start, end, code[, name]) rows; malformed rows and headers are skipped"""
+        parsed: Dict[int, List[Tuple[int, int, Country]]] = {4: [], 6: []}
+        skipped = 0
+        for row in rows:
+            if len(row) < 3:
+                skipped += 1
+                continue
+            try:
+                version, start = _parse_bound(row[0])
+                _, end = _parse_bound(row[1])
+            except ValueError:
+                skipped += 1
+                continue
+            code = row[2].strip().upper()
+            if not code or code == "-" or code == "ZZ":
+                continue
+            name = row[3].strip() if len(row) > 3 and row[3].strip() else code
+            parsed[version].append((start, end, (code, name)))
+        if skipped:
+            logger.debug("Skipped %d malformed GeoIP rows", skipped)
+
+        added = 0
+        for version, items in parsed.items():
+            added += len(items)
+            ranges = self._families[version]
+            items.extend(zip(ranges.starts, ranges.ends, ranges.countries))
+            items.sort(key=lambda item: item[0])
+            ranges.starts = [item[0] for item in items]
+            ranges.ends = [item[1] for item in items]
+            ranges.countries = [item[2] for item in items]
+        self._cached_lookup.cache_clear()
+        return added
+
+    def _lookup(self, ip: str) -> Optional[Country]:
+        try:
+            address = ipaddress.ip_address(ip)
+        except ValueError:
+            return None
+        if address.version == 6 and address.ipv4_mapped is not None:
+            address = address.ipv4_mapped
+        return self._families[address.version].find(int(address))
+
+    def lookup(self, ip: str) -> Optional[Country]:
+        """(country code, country name) for an address, or None if unknown/private/invalid"""
+        return self._cached_lookup(ip)
+
+    def cache_info(self):
+        return self._cached_lookup.cache_info()
+
+
+def client_ip(headers, peer: Optional[str]) -> Optional[str]:
+    """The originating client address: first valid X-Forwarded-For hop, else the socket peer"""
+    forwarded = headers.get("x-forwarded-for")
+    if forwarded:
+        for hop in forwarded.split(","):
+            hop = hop.strip()
+            try:
+                ipaddress.ip_address(hop)
+                return hop
+            except ValueError:
+                continue
+    return peer
@@ -0,0 +1,198 @@
+"""
+Bidirectional IMDb <-> TMDB ID index.
+
+The frontend speaks IMDb IDs while TMDB recommendations speak TMDB IDs, so
+every recommendation request used to pay for a ``/find`` call plus one
+``/external_ids`` call per result just to translate IDs. ``IdMapIndex``
+keeps that mapping (and each title's original language) in memory, learns
+it from every TMDB payload that passes through ``tmdb_request``, persists it
+in the metadata store and can be bulk-loaded from a dump file:
+
+    python id_map.py load mappings.csv.gz
+
+Dump files are CSV (``tmdb_id,imdb_id[,original_language]``, header
+optional) or JSON lines with ``id``/``tmdb_id``, ``imdb_id`` and optionally
+``original_language`` keys; either may be gzip-compressed.
+"""
+import argparse
+import csv
+import gzip
+import json
+import logging
+import os
+import re
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from store import MetadataStore, open_store
+
+logger = logging.getLogger(__name__)
+
+IMDB_ID_RE = re.compile(r"^tt\d+$")
+MOVIE_PATH_RE = re.compile(r"^/movie/(\d+)(/external_ids)?$")
+
+Mapping = Tuple[int, Optional[str], Optional[str]]
+
+
+class IdMapIndex:
+    """In-memory IMDb <-> TMDB index backed by a MetadataStore"""
+
+    def __init__(self, store: MetadataStore, write: Optional[Callable[..., Any]] = None):
+        self.store = store
+        # How writes reach the store: inline by default, or e.g. queued on a writer thread
+        self._write = write or (lambda fn, *args: fn(*args))
+        self._imdb_to_tmdb: Dict[str, int] = {}
+        self._tmdb_to_imdb: Dict[int, str] = {}
+        self._language: Dict[int, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._imdb_to_tmdb)
+
+    def load(self) -> int:
+        """Load every persisted mapping into memory"""
+        for tmdb_id, imdb_id, language in self.store.iter_id_mappings():
+            self._remember(tmdb_id, imdb_id, language)
+        return len(self)
+
+    def _remember(self, tmdb_id: int, imdb_id: Optional[str], language: Optional[str]) -> bool:
+        changed = False
+        if imdb_id and self._tmdb_to_imdb.get(tmdb_id) != imdb_id:
+            self._tmdb_to_imdb[tmdb_id] = imdb_id
+            self._imdb_to_tmdb[imdb_id] = tmdb_id
+            changed = True
+        if language and self._language.get(tmdb_id) != language:
+            self._language[tmdb_id] = language
+            changed = True
+        return changed
+
+    def _fill_from_store(self, imdb_id: Optional[str] = None, tmdb_id: Optional[int] = None):
+        # Another worker may have learned the mapping since we loaded
+        try:
+            row = self.store.get_id_mapping(imdb_id=imdb_id, tmdb_id=tmdb_id)
+        except Exception as e:  # unknown then, and the caller asks TMDB instead
+            logger.warning("ID mapping lookup failed: %s", e)
+            return
+        if row:
+            self._remember(*row)
+
+    def tmdb_id(self, imdb_id: str) -> Optional[int]:
+        if imdb_id not in self._imdb_to_tmdb:
+            self._fill_from_store(imdb_id=imdb_id)
+        return self._imdb_to_tmdb.get(imdb_id)
+
+    def imdb_id(self, tmdb_id: int) -> Optional[str]:
+        if tmdb_id not in self._tmdb_to_imdb:
+            self._fill_from_store(tmdb_id=tmdb_id)
+        return self._tmdb_to_imdb.get(tmdb_id)
+
+    def language(self, tmdb_id: int) -> Optional[str]:
+        return self._language.get(tmdb_id)
+
+    def add_many(self, rows: List[Mapping]) -> int:
+        """Record mappings, persisting only the ones that taught us something new"""
+        changed = [row for row in rows if self._remember(*row)]
+        if changed:
+            self._write(self.store.put_id_mappings, changed)
+        return len(changed)
+
+    def add(self, tmdb_id: int, imdb_id: Optional[str] = None, language: Optional[str] = None) -> bool:
+        return self.add_many([(tmdb_id, imdb_id, language)]) > 0
+
+    def observe(self, path: str, data: Any) -> int:
+        """Learn mappings from a TMDB response for the given API path"""
+        if not isinstance(data, dict):
+            return 0
+        rows: List[Mapping] = []
+
+        if path.startswith("/find/"):
+            imdb_id = path[len("/find/"):]
+            for movie in data.get('movie_results') or []:
+                rows.append((movie['id'], imdb_id, movie.get('original_language')))
+        elif path.endswith("/recommendations"):
+            for movie in data.get('results') or []:
+                if movie.get('id') and movie.get('original_language'):
+                    rows.append((movie['id'], None, movie['original_language']))
+        else:
+            match = MOVIE_PATH_RE.match(path)
+            if match and data.get('imdb_id'):
+                rows.append((int(match.group(1)), data['imdb_id'], data.get('original_language')))
+
+        return self.add_many([row for row in rows if row[1] is None or IMDB_ID_RE.match(row[1])])
+
+
+def iter_dump(path: str) -> Iterator[Mapping]:
+    """Stream (tmdb_id, imdb_id, original_language) rows from a CSV or JSON-lines dump"""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        first = f.readline()
+        if not first:
+            return
+        if first.lstrip().startswith("{"):
+            for line in _chain(first, f):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    continue
+                tmdb_id = row.get('tmdb_id', row.get('id'))
+                if tmdb_id and row.get('imdb_id'):
+                    yield int(tmdb_id), row['imdb_id'], row.get('original_language')
+        else:
+            for row in csv.reader(_chain(first, f)):
+                if len(row) < 2 or not row[0].strip().isdigit() or not IMDB_ID_RE.match(row[1].strip()):
+                    continue  # header or malformed line
+                language = row[2].strip() if len(row) > 2 and row[2].strip() else None
+                yield int(row[0]), row[1].strip(), language
+
+
+def _chain(first: str, rest) -> Iterator[str]:
+    yield first
+    yield from rest
+
+
+def load_dump(index: IdMapIndex, path: str, batch_size: int = 5000) -> int:
+    """Bulk-load a dump file into the index and its store"""
+    total = 0
+    batch: List[Mapping] = []
+    for row in iter_dump(path):
+        batch.append(row)
+        if len(batch) >= batch_size:
+            total += index.add_many(batch)
+            batch = []
+    if batch:
+        total += index.add_many(batch)
+    return total
+
+
+def main():
+    from dotenv import load_dotenv
+
+    root_dir = Path(__file__).parent
+    load_dotenv(root_dir / '.env')
+
+    parser = argparse.ArgumentParser(description="Manage the IMDb <-> TMDB ID mapping index")
+    sub = parser.add_subparsers(dest="command", required=True)
+    load = sub.add_parser("load", help="bulk-load mappings from a CSV/JSON-lines dump (optionally .gz)")
+    load.add_argument("path")
+    sub.add_parser("stats", help="show how many mappings are stored")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    store = open_store(
+        os.environ.get('METADATA_STORE', 'sqlite'),
+        os.environ.get('METADATA_STORE_PATH', str(root_dir / 'data' / 'cinegraph.db')),
+    )
+    index = IdMapIndex(store)
+    index.load()
+    if args.command == "load":
+        added = load_dump(index, args.path)
+        logger.info("Loaded %d new mappings from %s (%d total)", added, args.path, len(index))
+    else:
+        logger.info("%d IMDb <-> TMDB mappings stored", len(index))
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+"""
+Streaming, disk-cached image proxy behind ``/api/proxy-image``.
+
+- Upstream bytes are streamed straight through to the client while being
+  teed into a temp file, so no image is ever fully buffered in memory.
+- Finished downloads land in a content-addressed blob store
+  (``blobs/<sha256[:2]>/<sha256>``); a small per-URL metadata file points at
+  the blob, so identical posters reached via different URLs share storage.
+- The blob hash doubles as a strong ETag, and ``If-None-Match`` is answered
+  with ``304 Not Modified``.
+- The cache is bounded by ``max_bytes``; least recently served blobs
+  (by mtime) are evicted first.
+- Width variants (``w=185``/``w=500``) are cached after the first render.
+  TMDB and Amazon poster URLs are rewritten to the host's own sized rendition,
+  which is streamed and teed like any other image; anything else is resized
+  locally with Pillow when it is installed (without Pillow, or for originals
+  over ``max_image_bytes``, the original is served).
+
+The proxy owns its own ``httpx.AsyncClient`` so slow image hosts cannot
+starve OMDb/TMDB calls of pooled connections.
+"""
+import asyncio
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+import tempfile
+from pathlib import Path
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+import httpx
+from fastapi import HTTPException
+from fastapi.responses import FileResponse, Response, StreamingResponse
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional; variants fall back to the original
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+ALLOWED_WIDTHS = (185, 500)
+CHUNK_SIZE = 64 * 1024
+TMDB_SIZE_RE = re.compile(r"(image\.tmdb\.org/t/p/)(w\d+|original)(/)")
+AMAZON_SIZE_RE = re.compile(r"\._V1_.*?\.(jpg|jpeg|png)$", re.IGNORECASE)
+
+UPSTREAM_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
+    "Referer": "https://www.imdb.com/"
+}
+
+
+def variant_url(url: str, width: int) -> Optional[str]:
+    """Return the host's own URL for a sized rendition, if it has one"""
+    if TMDB_SIZE_RE.search(url):
+        return TMDB_SIZE_RE.sub(rf"\g<1>w{width}\g<3>", url, count=1)
+    if "media-amazon.com" in url and AMAZON_SIZE_RE.search(url):
+        return AMAZON_SIZE_RE.sub(rf"._V1_SX{width}.\g<1>", url)
+    return None
+
+
+class ImageProxy:
+    """Proxy + bounded content-addressed disk cache for poster images"""
+
+    def __init__(self, cache_dir: str, max_bytes: int = 512 * 1024 * 1024, max_image_bytes: int = 10 * 1024 * 1024,
+                 timeout: float = 10.0, max_age: int = 86400):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.max_image_bytes = max_image_bytes
+        self.max_age = max_age
+        self.client = httpx.AsyncClient(
+            timeout=timeout,
+            follow_redirects=True,
+            headers=UPSTREAM_HEADERS,
+            limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+        )
+        self._total_bytes: Optional[int] = None
+        self._evicting = False
+
+    # Disk layout
+
+    @staticmethod
+    def _url_key(url: str, width: Optional[int]) -> str:
+        return hashlib.sha256(f"{url}|{width or ''}".encode()).hexdigest()
+
+    def _meta_path(self, url_key: str) -> Path:
+        return self.cache_dir / "urls" / url_key[:2] / f"{url_key}.json"
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.cache_dir / "blobs" / digest[:2] / digest
+
+    def _load_meta(self, url_key: str) -> Optional[Dict[str, str]]:
+        try:
+            meta = json.loads(self._meta_path(url_key).read_text())
+        except (OSError, ValueError):
+            return None
+        if not self._blob_path(meta["sha256"]).exists():
+            return None  # blob was evicted
+        return meta
+
+    def _store(self, url_key: str, tmp_path: Path, digest: str, size: int, content_type: str):
+        blob = self._blob_path(digest)
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        if blob.exists():
+            os.unlink(tmp_path)
+        else:
+            os.replace(tmp_path, blob)
+            if self._total_bytes is not None:
+                self._total_bytes += size
+        meta_path = self._meta_path(url_key)
+        meta_path.parent.mkdir(parents=True, exist_ok=True)
+        meta_path.write_text(json.dumps({"sha256": digest, "content_type": content_type, "size": size}))
+
+    def _store_bytes(self, url_key: str, content: bytes, content_type: str) -> str:
+        digest = hashlib.sha256(content).hexdigest()
+        tmp = self._new_temp_file()
+        with open(tmp, "wb") as f:
+            f.write(content)
+        self._store(url_key, tmp, digest, len(content), content_type)
+        return digest
+
+    def _new_temp_file(self) -> Path:
+        tmp_dir = self.cache_dir / "tmp"
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        fd, name = tempfile.mkstemp(dir=tmp_dir)
+        os.close(fd)
+        return Path(name)
+
+    # Eviction
+
+    def _scan_total(self) -> int:
+        return sum(p.stat().st_size for p in (self.cache_dir / "blobs").glob("*/*") if p.is_file())
+
+    def _evict(self):
+        if self._total_bytes is None:
+            self._total_bytes = self._scan_total()
+        if self._total_bytes <= self.max_bytes:
+            return
+        blobs = sorted(
+            ((p.stat().st_mtime, p.stat().st_size, p) for p in (self.cache_dir / "blobs").glob("*/*") if p.is_file()),
+            key=lambda item: item[0],
+        )
+        # Evict down to 90% so we are not evicting on every write
+        target = int(self.max_bytes * 0.9)
+        total = sum(size for _, size, _ in blobs)
+        for _, size, path in blobs:
+            if total <= target:
+                break
+            try:
+                path.unlink()
+                total -= size
+            except OSError:
+                pass
+        self._total_bytes = total
+
+    async def _maybe_evict(self):
+        if self._evicting:
+            return
+        self._evicting = True
+        try:
+            await asyncio.to_thread(self._evict)
+        except Exception as e:
+            logger.error("Image cache eviction failed: %s", e)
+        finally:
+            self._evicting = False
+
+    # Responses
+
+    def _headers(self, etag: Optional[str] = None) -> Dict[str, str]:
+        headers = {
+            "Cache-Control": f"public, max-age={self.max_age}",
+            "Access-Control-Allow-Origin": "*",
+        }
+        if etag:
+            headers["ETag"] = etag
+        return headers
+
+    @staticmethod
+    def _touch(path: Path):
+        try:
+            os.utime(path)  # mark as recently used for eviction
+        except OSError:
+            pass
+
+    async def _cached_response(self, meta: Dict[str, str], if_none_match: Optional[str]) -> Response:
+        etag = f'"{meta["sha256"]}"'
+        if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+            return Response(status_code=304, headers=self._headers(etag))
+        blob = self._blob_path(meta["sha256"])
+        await asyncio.to_thread(self._touch, blob)
+        return FileResponse(blob, media_type=meta["content_type"], headers=self._headers(etag))
+
+    async def _open_upstream(self, url: str) -> httpx.Response:
+        try:
+            response = await self.client.send(self.client.build_request("GET", url), stream=True)
+        except httpx.HTTPError as e:
+            raise HTTPException(status_code=404, detail=f"Failed to fetch image: {str(e)}")
+        if response.status_code >= 400:
+            await response.aclose()
+            raise HTTPException(status_code=404, detail=f"Failed to fetch image: upstream returned {response.status_code}")
+        return response
+
+    async def _tee(self, upstream: httpx.Response, url_key: str) -> AsyncIterator[bytes]:
+        """Yield upstream chunks to the client while writing them to the cache (disk work runs in threads)"""
+        content_type = upstream.headers.get("content-type", "image/jpeg")
+        tmp = await asyncio.to_thread(self._new_temp_file)
+        digest = hashlib.sha256()
+        size = 0
+        complete = False
+        f = None
+        try:
+            f = await asyncio.to_thread(open, tmp, "wb")
+            async for chunk in upstream.aiter_bytes(CHUNK_SIZE):
+                size += len(chunk)
+                if size <= self.max_image_bytes:
+                    await asyncio.to_thread(f.write, chunk)
+                    digest.update(chunk)
+                yield chunk
+            complete = size <= self.max_image_bytes
+        finally:
+            if f is not None:
+                await asyncio.to_thread(f.close)
+            await upstream.aclose()
+            if complete:
+                await asyncio.to_thread(self._store, url_key, tmp, digest.hexdigest(), size, content_type)
+                await self._maybe_evict()
+            else:
+                await asyncio.to_thread(tmp.unlink, missing_ok=True)
+
+    async def _read_capped(self, url: str) -> Optional[Tuple[bytes, str]]:
+        """(bytes, content type) of an image, or None (without reading it all) if it exceeds max_image_bytes"""
+        upstream = await self._open_upstream(url)
+        try:
+            declared = upstream.headers.get("content-length", "")
+            if declared.isdigit() and int(declared) > self.max_image_bytes:
+                return None
+            chunks = []
+            size = 0
+            async for chunk in upstream.aiter_bytes(CHUNK_SIZE):
+                size += len(chunk)
+                if size > self.max_image_bytes:
+                    return None
+                chunks.append(chunk)
+        except httpx.HTTPError as e:
+            raise HTTPException(status_code=404, detail=f"Failed to fetch image: {str(e)}")
+        finally:
+            await upstream.aclose()
+        return b"".join(chunks), upstream.headers.get("content-type", "image/jpeg")
+
+    async def _render_variant(self, url: str, width: int, url_key: str) -> Optional[Dict[str, str]]:
+        """Resize and cache a width variant locally; returns its metadata or None if not possible"""
+        if Image is None:
+            return None
+        original_key = self._url_key(url, None)
+        meta = await asyncio.to_thread(self._load_meta, original_key)
+        if meta is None:
+            downloaded = await self._read_capped(url)
+            if downloaded is None:
+                return None  # too large to decode safely
+            original, content_type = downloaded
+            await asyncio.to_thread(self._store_bytes, original_key, original, content_type)
+        elif int(meta.get("size", 0)) > self.max_image_bytes:
+            return None
+        else:
+            original = await asyncio.to_thread(self._blob_path(meta["sha256"]).read_bytes)
+        content = await asyncio.to_thread(self._resize, original, width)
+        if content is None:
+            return None
+
+        await asyncio.to_thread(self._store_bytes, url_key, content, "image/jpeg")
+        await self._maybe_evict()
+        return await asyncio.to_thread(self._load_meta, url_key)
+
+    @staticmethod
+    def _resize(content: bytes, width: int) -> Optional[bytes]:
+        try:
+            with Image.open(io.BytesIO(content)) as image:
+                if image.width <= width:
+                    return content
+                height = round(image.height * width / image.width)
+                resized = image.convert("RGB").resize((width, height), Image.LANCZOS)
+                out = io.BytesIO()
+                resized.save(out, format="JPEG", quality=85, optimize=True)
+                return out.getvalue()
+        except Exception as e:
+            logger.warning("Could not resize image: %s", e)
+            return None
+
+    async def serve(self, url: str, width: Optional[int] = None, if_none_match: Optional[str] = None) -> Response:
+        if not url:
+            raise HTTPException(status_code=400, detail="URL parameter is required")
+        if not url.startswith(("http://", "https://")):
+            raise HTTPException(status_code=400, detail="Only http(s) image URLs can be proxied")
+        if width is not None and width not in ALLOWED_WIDTHS:
+            raise HTTPException(status_code=400, detail=f"Width must be one of {', '.join(map(str, ALLOWED_WIDTHS))}")
+
+        url_key = self._url_key(url, width)
+        meta = await asyncio.to_thread(self._load_meta, url_key)
+        if meta is not None:
+            return await self._cached_response(meta, if_none_match)
+
+        if width is not None:
+            sized_url = variant_url(url, width)
+            if sized_url is not None:
+                # The host renders the size: stream it through, cached under the variant key
+                try:
+                    return self._stream(await self._open_upstream(sized_url), url_key)
+                except HTTPException as e:
+                    logger.warning("Sized rendition %s unavailable, sizing locally: %s", sized_url, e.detail)
+            meta = await self._render_variant(url, width, url_key)
+            if meta is not None:
+                return await self._cached_response(meta, None)
+            # No way to size this image: serve (and cache) the original
+            url_key = self._url_key(url, None)
+            meta = await asyncio.to_thread(self._load_meta, url_key)
+            if meta is not None:
+                return await self._cached_response(meta, if_none_match)
+
+        return self._stream(await self._open_upstream(url), url_key)
+
+    def _stream(self, upstream: httpx.Response, url_key: str) -> StreamingResponse:
+        return StreamingResponse(
+            self._tee(upstream, url_key),
+            media_type=upstream.headers.get("content-type", "image/jpeg"),
+            headers=self._headers(),
+        )
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    def stats(self) -> Dict[str, int]:
+        return {"bytes": self._total_bytes or 0, "max_bytes": self.max_bytes}
@@ -0,0 +1,446 @@
+"""
+Bulk catalog ingestion from the public IMDb and TMDB dataset dumps.
+
+Sources are streamed line by line straight out of the gzip (local files or
+http(s) URLs), normalized and written into the metadata store in batched
+transactions, so even the multi-million row IMDb dumps never sit in memory:
+
+    python ingest.py imdb-basics title.basics.tsv.gz     # titles, years, runtimes, genres
+    python ingest.py imdb-ratings title.ratings.tsv.gz   # ratings for titles already stored
+    python ingest.py tmdb-ids movie_ids_05_15_2024.json.gz --top 10000
+
+- ``imdb-basics`` (https://datasets.imdbws.com/title.basics.tsv.gz) creates
+  or updates a record per title of the selected types.
+- ``imdb-ratings`` (https://datasets.imdbws.com/title.ratings.tsv.gz) only
+  updates titles that are already stored, so episodes and shorts skipped by
+  ``imdb-basics`` do not turn into bare records.
+- ``tmdb-ids`` reads a TMDB daily ID export
+  (http://files.tmdb.org/p/exports/movie_ids_MM_DD_YYYY.json.gz). Those
+  exports carry no IMDb IDs, so the ``--top`` most popular movies are resolved
+  through TMDB ``/movie/{id}`` (rate limited like the server's client) to
+  learn the IMDb <-> TMDB mapping, original language, poster and overview.
+  Titles already mapped and stored are skipped.
+
+Each run records a checkpoint (rows consumed and written) after every
+committed batch in ``<store dir>/ingest_checkpoints.json``; an interrupted run
+resumes where it stopped when re-run on the same source (same file size and
+mtime, or for URLs the same ETag, Last-Modified and Content-Length), and
+``--restart`` starts over. Progress is logged every few seconds.
+
+After a large ingest, rebuild the local recommendation index with
+``python recommender.py build``.
+"""
+import argparse
+import asyncio
+import codecs
+import csv
+import gzip
+import heapq
+import io
+import json
+import logging
+import os
+import sys
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Union
+
+import httpx
+
+from store import MetadataStore, open_store
+
+logger = logging.getLogger(__name__)
+
+NULL = "\\N"
+PROGRESS_INTERVAL = 5.0
+TMDB_IMAGE_BASE = "https://image.tmdb.org/t/p/w500"
+
+# TMDB genre names that differ from IMDb's (which OMDb and the recommender use)
+TMDB_GENRES = {"Science Fiction": "Sci-Fi", "TV Movie": None}
+# TMDB original_language codes for the languages the recommender knows
+TMDB_LANGUAGES = {
+    "en": "English", "hi": "Hindi", "ta": "Tamil", "te": "Telugu", "kn": "Kannada", "ml": "Malayalam",
+    "bn": "Bengali", "mr": "Marathi", "pa": "Punjabi", "es": "Spanish", "fr": "French", "de": "German",
+    "it": "Italian", "ja": "Japanese", "ko": "Korean", "zh": "Mandarin", "cn": "Cantonese",
+    "pt": "Portuguese", "ru": "Russian", "tr": "Turkish", "ar": "Arabic", "fa": "Persian",
+}
+
+
+# Streaming sources
+
+class SourceProgress:
+    """Compressed bytes consumed so far, against the source's total size if known"""
+
+    __slots__ = ("consumed", "total")
+
+    def __init__(self, total: int = 0):
+        self.consumed = 0
+        self.total = total
+
+    def percent(self) -> Optional[float]:
+        return 100.0 * self.consumed / self.total if self.total else None
+
+
+class _CountingReader(io.RawIOBase):
+    def __init__(self, raw, progress: SourceProgress):
+        self._raw = raw
+        self._progress = progress
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        n = self._raw.readinto(buffer)
+        self._progress.consumed += n or 0
+        return n
+
+
+def _file_lines(path: str, progress: SourceProgress) -> Iterator[str]:
+    progress.total = os.path.getsize(path)
+    with open(path, "rb") as raw:
+        counted = io.BufferedReader(_CountingReader(raw, progress), buffer_size=1 << 20)
+        binary = gzip.GzipFile(fileobj=counted) if path.endswith(".gz") else counted
+        yield from io.TextIOWrapper(binary, encoding="utf-8", newline="")
+
+
+def _url_lines(url: str, progress: SourceProgress) -> Iterator[str]:
+    with httpx.stream("GET", url, follow_redirects=True, timeout=60.0) as response:
+        response.raise_for_status()
+        progress.total = int(response.headers.get("content-length") or 0)
+        inflate = zlib.decompressobj(wbits=47) if url.split("?")[0].endswith(".gz") else None
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        pending = ""
+        for chunk in response.iter_raw(1 << 20):
+            progress.consumed += len(chunk)
+            pending += decoder.decode(inflate.decompress(chunk) if inflate else chunk)
+            lines = pending.split("\n")
+            pending = lines.pop()
+            for line in lines:
+                yield line + "\n"
+        pending += decoder.decode(inflate.flush() if inflate else b"", final=True)
+        if pending:
+            yield pending
+
+
+def _url_validators(url: str) -> List[str]:
+    """ETag, Last-Modified and Content-Length of a URL (empty strings where unknown)"""
+    try:
+        response = httpx.head(url, follow_redirects=True, timeout=30.0)
+        response.raise_for_status()
+    except httpx.HTTPError as e:
+        logger.warning("Could not check %s for changes (%s); resuming by URL only", url, e)
+        return []
+    return [response.headers.get(name, "") for name in ("etag", "last-modified", "content-length")]
+
+
+def open_lines(source: str, progress: SourceProgress) -> Iterator[str]:
+    """Stream decoded text lines from a local file or URL, gunzipping on the fly"""
+    if source.startswith(("http://", "https://")):
+        return _url_lines(source, progress)
+    return _file_lines(source, progress)
+
+
+def iter_tsv(lines: Iterable[str]) -> Iterator[Dict[str, str]]:
+    """Rows of an IMDb-style TSV (header line, no quoting) as dicts"""
+    reader = csv.reader(lines, delimiter="\t", quoting=csv.QUOTE_NONE)
+    header = next(reader, None)
+    if header is None:
+        return
+    for row in reader:
+        if len(row) == len(header):
+            yield dict(zip(header, row))
+
+
+def iter_jsonl(lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            continue
+
+
+# Normalization
+
+def _int(value: str) -> Optional[int]:
+    return int(value) if value and value != NULL and value.isdigit() else None
+
+
+def imdb_basics_record(row: Dict[str, str], title_types: frozenset, include_adult: bool) -> Optional[Dict[str, Any]]:
+    if row.get("titleType") not in title_types:
+        return None
+    if row.get("isAdult") == "1" and not include_adult:
+        return None
+    title = row.get("primaryTitle")
+    if not title or title == NULL:
+        return None
+    genres = row.get("genres")
+    return {
+        "imdb_id": row["tconst"],
+        "title": title,
+        "year": _int(row.get("startYear", "")),
+        "runtime": _int(row.get("runtimeMinutes", "")),
+        "genres": genres.split(",") if genres and genres != NULL else None,
+    }
+
+
+def imdb_ratings_record(row: Dict[str, str]) -> Optional[Dict[str, Any]]:
+    try:
+        rating = float(row["averageRating"])
+    except (KeyError, ValueError):
+        return None
+    return {"imdb_id": row["tconst"], "rating": rating, "votes": _int(row.get("numVotes", ""))}
+
+
+def tmdb_movie_record(data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Store record fields from a TMDB /movie/{id} payload"""
+    imdb_id = data.get("imdb_id")
+    if not imdb_id or not imdb_id.startswith("tt"):
+        return None
+    genres = [TMDB_GENRES.get(g["name"], g["name"]) for g in data.get("genres") or []]
+    language = TMDB_LANGUAGES.get(data.get("original_language") or "")
+    release_date = data.get("release_date") or ""
+    return {
+        "imdb_id": imdb_id,
+        "tmdb_id": data["id"],
+        "title": data.get("title"),
+        "year": int(release_date[:4]) if release_date[:4].isdigit() else None,
+        "released": release_date or None,
+        "runtime": data.get("runtime") or None,
+        "genres": [g for g in genres if g] or None,
+        "languages": [language] if language else None,
+        "plot": data.get("overview") or None,
+        "poster": f"{TMDB_IMAGE_BASE}{data['poster_path']}" if data.get("poster_path") else None,
+    }
+
+
+# Checkpoints and the batch loop
+
+class Checkpoints:
+    """Per-source progress persisted to a small JSON file"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        try:
+            self._data: Dict[str, Dict[str, Any]] = json.loads(path.read_text())
+        except (OSError, ValueError):
+            self._data = {}
+
+    @staticmethod
+    def source_key(command: str, source: str) -> str:
+        if os.path.exists(source):
+            stat = os.stat(source)
+            return f"{command}:{os.path.abspath(source)}:{stat.st_size}:{int(stat.st_mtime)}"
+        if source.startswith(("http://", "https://")):
+            # Dumps are republished under the same URL, so key on the served version too
+            return ":".join([command, source, *_url_validators(source)])
+        return f"{command}:{source}"
+
+    def get(self, key: str) -> Dict[str, Any]:
+        return self._data.get(key, {})
+
+    def save(self, key: str, **state: Any):
+        self._data[key] = {**state, "updated_at": time.time()}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self._data, indent=2, sort_keys=True))
+        os.replace(tmp, self.path)
+
+
+async def run_batches(
+    name: str,
+    rows: Iterable[Any],
+    transform: Callable[[Any], Optional[Dict[str, Any]]],
+    write: Callable[[List[Dict[str, Any]]], Union[int, Awaitable[int]]],
+    checkpoints: Checkpoints,
+    key: str,
+    batch_size: int,
+    restart: bool = False,
+    progress: Optional[SourceProgress] = None,
+) -> int:
+    """Transform rows into records and write them in batches, checkpointing after each batch"""
+    state = {} if restart else checkpoints.get(key)
+    if state.get("done"):
+        logger.info("%s: already ingested (%d rows, %d written); use --restart to run again",
+                    name, state.get("rows", 0), state.get("written", 0))
+        return 0
+    skip = state.get("rows", 0)
+    written = state.get("written", 0)
+    if skip:
+        logger.info("%s: resuming after %d rows", name, skip)
+
+    started = last_report = time.monotonic()
+    consumed = 0
+    batch: List[Dict[str, Any]] = []
+
+    async def flush():
+        nonlocal written, batch
+        result = write(batch)
+        written += await result if asyncio.iscoroutine(result) else result
+        batch = []
+        checkpoints.save(key, rows=consumed, written=written)
+
+    for row in rows:
+        consumed += 1
+        if consumed <= skip:
+            continue
+        record = transform(row)
+        if record is not None:
+            batch.append(record)
+        if len(batch) >= batch_size:
+            await flush()
+        now = time.monotonic()
+        if now - last_report >= PROGRESS_INTERVAL:
+            last_report = now
+            rate = (consumed - skip) / (now - started)
+            percent = progress.percent() if progress else None
+            logger.info("%s: %d rows read%s, %d written, %.0f rows/s", name, consumed,
+                        f" ({percent:.1f}%)" if percent is not None else "", written, rate)
+
+    if batch:
+        await flush()
+    checkpoints.save(key, rows=consumed, written=written, done=True)
+    logger.info("%s: done, %d rows read, %d written in %.1fs", name, consumed, written, time.monotonic() - started)
+    return written
+
+
+# Commands
+
+async def ingest_imdb_basics(store: MetadataStore, args, checkpoints: Checkpoints) -> int:
+    title_types = frozenset(t.strip() for t in args.title_types.split(",") if t.strip())
+    progress = SourceProgress()
+    rows = iter_tsv(open_lines(args.source, progress))
+
+    def write(batch):
+        store.put_movies(batch)
+        return len(batch)
+
+    return await run_batches(
+        "imdb-basics", rows, lambda row: imdb_basics_record(row, title_types, args.include_adult), write,
+        checkpoints, Checkpoints.source_key("imdb-basics", args.source), args.batch_size, args.restart, progress,
+    )
+
+
+async def ingest_imdb_ratings(store: MetadataStore, args, checkpoints: Checkpoints) -> int:
+    progress = SourceProgress()
+    rows = iter_tsv(open_lines(args.source, progress))
+    return await run_batches(
+        "imdb-ratings", rows, imdb_ratings_record, store.update_movies,
+        checkpoints, Checkpoints.source_key("imdb-ratings", args.source), args.batch_size, args.restart, progress,
+    )
+
+
+def most_popular(rows: Iterable[Dict[str, Any]], top: int, include_adult: bool) -> List[int]:
+    """TMDB IDs of the `top` most popular movies, keeping only `top` rows in memory"""
+    heap: List[tuple] = []
+    for row in rows:
+        if not row.get("id") or row.get("video") or (row.get("adult") and not include_adult):
+            continue
+        item = (float(row.get("popularity") or 0), int(row["id"]))
+        if len(heap) < top:
+            heapq.heappush(heap, item)
+        elif item > heap[0]:
+            heapq.heapreplace(heap, item)
+    return [tmdb_id for _, tmdb_id in sorted(heap, reverse=True)]
+
+
+async def ingest_tmdb_ids(store: MetadataStore, args, checkpoints: Checkpoints) -> int:
+    from upstream import UpstreamClient, UpstreamUnavailable
+
+    api_key = os.environ.get('TMDB_API_KEY')
+    if not api_key:
+        raise SystemExit("TMDB_API_KEY is required to resolve TMDB IDs")
+    base_url = os.environ.get('TMDB_BASE_URL', "https://api.themoviedb.org/3")
+
+    logger.info("tmdb-ids: selecting the %d most popular movies", args.top)
+    ranked = most_popular(iter_jsonl(open_lines(args.source, SourceProgress())), args.top, args.include_adult)
+
+    client = UpstreamClient(
+        "tmdb",
+        max_connections=args.concurrency,
+        rate=float(os.environ.get('TMDB_RATE_LIMIT', 40)),
+        burst=float(os.environ.get('TMDB_RATE_BURST', 40)),
+        max_wait=30.0,
+    )
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def resolve(tmdb_id: int) -> Optional[Dict[str, Any]]:
+        mapping = store.get_id_mapping(tmdb_id=tmdb_id)
+        if mapping and mapping[1] and store.get_movie(mapping[1]):
+            return None  # already known
+        async with semaphore:
+            try:
+                response = await client.get(f"{base_url}/movie/{tmdb_id}", params={"api_key": api_key})
+            except (UpstreamUnavailable, httpx.HTTPError) as e:
+                logger.warning("tmdb-ids: could not resolve %d: %s", tmdb_id, e)
+                return None
+        if response.status_code != 200:
+            return None
+        return response.json()
+
+    async def write(batch: List[Dict[str, Any]]) -> int:
+        payloads = [p for p in await asyncio.gather(*[resolve(item["tmdb_id"]) for item in batch]) if p]
+        store.put_id_mappings([(p["id"], p.get("imdb_id") or None, p.get("original_language")) for p in payloads])
+        records = []
+        for payload in payloads:
+            record = tmdb_movie_record(payload)
+            if record is None:
+                continue
+            # Fill gaps only; IMDb/OMDb fields win over TMDB's
+            existing = store.get_movie(record["imdb_id"]) or {}
+            records.append({k: v for k, v in record.items() if k == "imdb_id" or existing.get(k) in (None, "", [])})
+        store.put_movies(records)
+        return len(records)
+
+    try:
+        return await run_batches(
+            "tmdb-ids", ({"tmdb_id": tmdb_id} for tmdb_id in ranked), lambda item: item, write,
+            checkpoints, Checkpoints.source_key(f"tmdb-ids-top{args.top}", args.source),
+            min(args.batch_size, 200), args.restart,
+        )
+    finally:
+        await client.aclose()
+
+
+COMMANDS = {
+    "imdb-basics": ingest_imdb_basics,
+    "imdb-ratings": ingest_imdb_ratings,
+    "tmdb-ids": ingest_tmdb_ids,
+}
+
+
+def main():
+    from dotenv import load_dotenv
+
+    root_dir = Path(__file__).parent
+    load_dotenv(root_dir / '.env')
+
+    parser = argparse.ArgumentParser(description="Ingest IMDb/TMDB dataset dumps into the metadata store")
+    parser.add_argument("command", choices=sorted(COMMANDS))
+    parser.add_argument("source", help="local path or http(s) URL (.gz is decompressed while streaming)")
+    parser.add_argument("--batch-size", type=int, default=5000, help="records per transaction")
+    parser.add_argument("--restart", action="store_true", help="ignore any checkpoint for this source")
+    parser.add_argument("--title-types", default="movie", help="imdb-basics: comma-separated titleType values to keep")
+    parser.add_argument("--include-adult", action="store_true")
+    parser.add_argument("--top", type=int, default=10000, help="tmdb-ids: how many of the most popular movies to resolve")
+    parser.add_argument("--concurrency", type=int, default=8, help="tmdb-ids: concurrent TMDB requests")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    store_path = os.environ.get('METADATA_STORE_PATH', str(root_dir / 'data' / 'cinegraph.db'))
+    store = open_store(os.environ.get('METADATA_STORE', 'sqlite'), store_path)
+    checkpoints = Checkpoints(Path(store_path).parent / "ingest_checkpoints.json")
+    try:
+        asyncio.run(COMMANDS[args.command](store, args, checkpoints))
+    except KeyboardInterrupt:
+        logger.info("Interrupted; re-run the same command to resume from the last checkpoint")
+        sys.exit(130)
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""
+Minimal Prometheus-style metrics and per-request timing.
+
+``Counter``, ``Gauge`` and ``Histogram`` keep labelled values in plain
+dicts and ``Registry.render()`` emits the Prometheus text exposition format,
+so ``/metrics`` needs no extra dependency. Gauges that mirror other state
+(cache size, in-flight fetches) are refreshed by collector callbacks right
+before each scrape instead of being updated on the hot path.
+
+``TimingMiddleware`` is a pure ASGI middleware that records per-route
+latency and in-flight requests, and adds a ``Server-Timing`` header built
+from the spans (``cache``, ``upstream``, ...) recorded during the request
+via ``span()``.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric:
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}", *self.samples()]
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def set(self, value: float, **labels):
+        """Overwrite the value, e.g. to mirror a total that is counted elsewhere"""
+        self._values[self._key(labels)] = value
+
+    def samples(self):
+        for key, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        counts = self._counts.get(key)
+        if counts is None:
+            counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+            self._sums[key] = 0.0
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+                break
+        else:
+            counts[-1] += 1
+        self._sums[key] += value
+
+    def samples(self):
+        for key, counts in self._counts.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {self._sums[key]!r}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[Metric] = []
+        self._collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], None]):
+        """Register a callback that refreshes gauges right before each scrape"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in self._collectors:
+            collector()
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Request-scoped timing
+
+class RequestTiming:
+    """Per-request span totals; overlapping spans of one name (e.g. concurrent
+    upstream calls) count wall time once, so spans never exceed the total"""
+
+    __slots__ = ("spans", "started", "_active", "_opened_at")
+
+    def __init__(self):
+        self.spans: Dict[str, float] = {}
+        self.started = time.perf_counter()
+        self._active: Dict[str, int] = {}
+        self._opened_at: Dict[str, float] = {}
+
+    def enter(self, name: str):
+        active = self._active.get(name, 0)
+        if not active:
+            self._opened_at[name] = time.perf_counter()
+        self._active[name] = active + 1
+
+    def exit(self, name: str):
+        self._active[name] -= 1
+        if not self._active[name]:
+            self.spans[name] = self.spans.get(name, 0.0) + time.perf_counter() - self._opened_at[name]
+
+    def header(self) -> str:
+        parts = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.spans.items()]
+        parts.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.2f}")
+        return ", ".join(parts)
+
+
+current_timing: ContextVar[Optional[RequestTiming]] = ContextVar("current_timing", default=None)
+
+
+@contextmanager
+def span(name: str):
+    """Count the wall time of the block towards the current request's Server-Timing span"""
+    timing = current_timing.get()
+    if timing is None:
+        yield
+        return
+    timing.enter(name)
+    try:
+        yield
+    finally:
+        timing.exit(name)
+
+
+class TimingMiddleware:
+    """Records route latency/in-flight metrics and emits a Server-Timing header"""
+
+    def __init__(self, app, latency: Histogram, in_flight: Gauge, skip_paths: Sequence[str] = ("/metrics",)):
+        self.app = app
+        self.latency = latency
+        self.in_flight = in_flight
+        self.skip_paths = frozenset(skip_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+
+        timing = RequestTiming()
+        token = current_timing.set(timing)
+        status = {"code": 500}
+        method = scope["method"]
+        self.in_flight.inc(method=method)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timing.header().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            self.in_flight.dec(method=method)
+            route = scope.get("route")
+            self.latency.observe(
+                time.perf_counter() - timing.started,
+                method=method,
+                route=getattr(route, "path", "unmatched"),
+                status=str(status["code"]),
+            )
+            current_timing.reset(token)
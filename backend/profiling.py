@@ -0,0 +1,364 @@
+"""
+Opt-in, request-scoped profiling for finding hot spots under real load.
+
+A request is profiled when it carries the profiling token in the
+``X-Profile`` header (never in the URL, where it would end up in access logs
+and browser history) or is picked by the sampling rate.
+While at least one profiled request is in flight, ``SamplingProfiler``
+wakes every few milliseconds on a background thread and records the event
+loop thread's Python stack. Each sample is charged to the profiled request
+whose task was running at that instant. If another task was running, it is
+charged as ``[other tasks]``. If the loop was parked in ``select()`` waiting
+on sockets, it is charged as ``[idle: awaiting I/O]``. Together these show
+where a slow request's wall time went, not just its CPU time. Nothing runs
+and nothing is sampled while no request is being profiled.
+
+A task factory installed on the loop records every task created on behalf
+of a profiled request (gather/as_completed children, single-flight
+fetches, streaming tasks) with its start, end, outcome and sample count.
+These records form the request's async task timeline.
+
+Finished reports are written as JSON to a directory shared by all workers.
+``ProfileStore`` lists and loads them for the admin endpoints. A report's
+``stacks`` are in collapsed-stack form (``frame;frame;frame count``), which
+``flamegraph.pl`` and speedscope read directly.
+"""
+import asyncio
+import json
+import logging
+import os
+import re
+import secrets
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+current_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("current_profile", default=None)
+
+try:
+    # The loop -> running task map behind asyncio.current_task(); readable from another thread
+    from asyncio.tasks import _current_tasks
+except ImportError:  # other interpreters: samples are charged to every active profile
+    _current_tasks = None
+
+PROFILE_ID_RE = re.compile(r'^[A-Za-z0-9_-]{8,32}$')
+OTHER_TASKS = "[other tasks]"
+IDLE = "[idle: awaiting I/O]"
+
+
+class TaskRecord:
+    """One task on a profiled request's timeline"""
+
+    __slots__ = ("name", "coro", "started", "ended", "state", "samples")
+
+    def __init__(self, name: str, coro: str, started: float):
+        self.name = name
+        self.coro = coro
+        self.started = started
+        self.ended: Optional[float] = None
+        self.state = "pending"
+        self.samples = 0
+
+    def finish(self, task: Optional[asyncio.Task] = None):
+        self.ended = time.perf_counter()
+        if task is None:
+            self.state = "done"
+        elif task.cancelled():
+            self.state = "cancelled"
+        else:
+            self.state = "error" if task.exception() is not None else "done"
+
+
+class RequestProfile:
+    """Samples and task timeline collected for one request"""
+
+    def __init__(self, method: str, path: str):
+        self.id = secrets.token_urlsafe(12)
+        self.method = method
+        self.path = path
+        self.route: Optional[str] = None
+        self.status: Optional[int] = None
+        self.created_at = time.time()
+        self.started = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.stacks: Dict[str, int] = {}
+        self.samples = {"running": 0, "other_tasks": 0, "idle": 0}
+        self.tasks: List[TaskRecord] = []
+
+    def add_stack(self, stack: str):
+        self.stacks[stack] = self.stacks.get(stack, 0) + 1
+
+    def finish(self, status: int, route: Optional[str]):
+        self.duration = time.perf_counter() - self.started
+        self.status = status
+        self.route = route
+
+    def top_functions(self, limit: int = 25) -> List[Dict[str, Any]]:
+        """Frames by self samples (leaf) and total samples (anywhere on the stack)"""
+        self_counts: Dict[str, int] = {}
+        total_counts: Dict[str, int] = {}
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            self_counts[frames[-1]] = self_counts.get(frames[-1], 0) + count
+            for frame in set(frames):
+                total_counts[frame] = total_counts.get(frame, 0) + count
+        ranked = sorted(total_counts, key=lambda frame: (self_counts.get(frame, 0), total_counts[frame]), reverse=True)
+        return [{"frame": frame, "self": self_counts.get(frame, 0), "total": total_counts[frame]}
+                for frame in ranked[:limit]]
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "route": self.route,
+            "status": self.status,
+            "created_at": round(self.created_at, 3),
+            "duration_ms": round((self.duration or 0) * 1000, 3),
+            "samples": sum(self.samples.values()),
+        }
+
+    def report(self, interval: float) -> Dict[str, Any]:
+        def offset(t: Optional[float]):
+            return round((t - self.started) * 1000, 3) if t is not None else None
+
+        return {
+            **self.summary(),
+            "interval_ms": round(interval * 1000, 3),
+            "sample_breakdown": dict(self.samples),
+            "tasks": [
+                {"name": r.name, "coro": r.coro, "start_ms": offset(r.started), "end_ms": offset(r.ended),
+                 "state": r.state, "samples": r.samples}
+                for r in sorted(self.tasks, key=lambda r: r.started)
+            ],
+            "top_functions": self.top_functions(),
+            "stacks": self.stacks,
+        }
+
+
+class SamplingProfiler:
+    """Background stack sampler for the event loop thread, active only while requests are profiled"""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._active: Dict[RequestProfile, asyncio.Task] = {}
+        self._tasks: Dict[asyncio.Task, Tuple[RequestProfile, TaskRecord]] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._labels: Dict[Any, str] = {}
+
+    @property
+    def installed(self) -> bool:
+        return self._loop is not None
+
+    def install(self, loop: asyncio.AbstractEventLoop):
+        """Track tasks created on behalf of profiled requests (call once, from the loop)"""
+        self._loop = loop
+        self._loop_thread = threading.get_ident()
+        previous = loop.get_task_factory()
+
+        def task_factory(loop, coro, **kwargs):
+            task = previous(loop, coro, **kwargs) if previous else asyncio.Task(coro, loop=loop, **kwargs)
+            context = kwargs.get("context")
+            profile = context.get(current_profile) if context is not None else current_profile.get()
+            if profile is not None and profile in self._active:
+                self.track(profile, task)
+            return task
+
+        loop.set_task_factory(task_factory)
+
+    def track(self, profile: RequestProfile, task: asyncio.Task, name: Optional[str] = None) -> TaskRecord:
+        coro = task.get_coro()
+        record = TaskRecord(name or task.get_name(), getattr(coro, "__qualname__", type(coro).__name__), time.perf_counter())
+        profile.tasks.append(record)
+        self._tasks[task] = (profile, record)
+
+        def done(task, record=record):
+            record.finish(task)
+            self._tasks.pop(task, None)
+
+        task.add_done_callback(done)
+        return record
+
+    def start(self, profile: RequestProfile) -> TaskRecord:
+        """Begin sampling for a request; call from the request's own task"""
+        task = asyncio.current_task()
+        record = TaskRecord("request", getattr(task.get_coro(), "__qualname__", "request"), profile.started)
+        profile.tasks.append(record)
+        with self._lock:
+            self._active[profile] = task
+            self._tasks[task] = (profile, record)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                self._thread.start()
+        return record
+
+    def stop(self, profile: RequestProfile):
+        # Under the lock, so no sample can touch the profile once this returns
+        with self._lock:
+            task = self._active.pop(profile, None)
+            entry = self._tasks.pop(task, None) if task is not None else None
+        if entry is not None:
+            entry[1].finish()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._active:
+                    self._thread = None
+                    return
+                try:
+                    self._sample(list(self._active))
+                except Exception:  # a sampler bug must never take the worker down
+                    logger.exception("Profiler sample failed")
+
+    def _sample(self, profiles: Sequence[RequestProfile]):
+        frame = sys._current_frames().get(self._loop_thread)
+        if frame is None:
+            return
+        task = _current_tasks.get(self._loop) if _current_tasks is not None else None
+        owner = self._tasks.get(task) if task is not None else None
+        if owner is not None and owner[0] not in profiles:
+            owner = None  # a leftover child task of a finished request
+        stack = self._collapse(frame)
+        if owner is not None:
+            profile, record = owner
+            profile.samples["running"] += 1
+            record.samples += 1
+            profile.add_stack(stack)
+            rest = [p for p in profiles if p is not profile]
+        elif task is None and _current_tasks is not None:
+            for profile in profiles:
+                profile.samples["idle"] += 1
+                profile.add_stack(IDLE)
+            return
+        else:
+            rest = profiles
+        for profile in rest:
+            profile.samples["other_tasks"] += 1
+            profile.add_stack(OTHER_TASKS if _current_tasks is not None else stack)
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            name = getattr(code, "co_qualname", code.co_name)
+            label = f"{Path(code.co_filename).stem}:{name}"
+            self._labels[code] = label
+        return label
+
+    def _collapse(self, frame) -> str:
+        frames = []
+        while frame is not None:
+            code = frame.f_code
+            # Stop at the event loop's callback runner: everything below is loop plumbing
+            if code.co_name == "_run" and code.co_filename.endswith(os.path.join("asyncio", "events.py")):
+                break
+            frames.append(self._label(code))
+            frame = frame.f_back
+        return ";".join(reversed(frames)) or "[event loop]"
+
+
+class ProfileStore:
+    """Finished reports as JSON files in a directory (shared by all workers), newest `max_reports` kept"""
+
+    def __init__(self, directory: str, max_reports: int = 100):
+        self.directory = Path(directory)
+        self.max_reports = max_reports
+
+    def save(self, report: Dict[str, Any]):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp = self.directory / f".{report['id']}.tmp"
+        tmp.write_text(json.dumps(report, separators=(",", ":")))
+        tmp.replace(self.directory / f"{report['id']}.json")
+        files = sorted(self.directory.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True)
+        for old in files[self.max_reports:]:
+            old.unlink(missing_ok=True)
+
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        if not PROFILE_ID_RE.match(profile_id):
+            return None
+        try:
+            return json.loads((self.directory / f"{profile_id}.json").read_text())
+        except (OSError, ValueError):
+            return None
+
+    def list(self) -> List[Dict[str, Any]]:
+        summaries = []
+        for path in sorted(self.directory.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True):
+            try:
+                report = json.loads(path.read_text())
+            except (OSError, ValueError):
+                continue
+            report.pop("stacks", None)
+            report.pop("tasks", None)
+            report.pop("top_functions", None)
+            summaries.append(report)
+        return summaries
+
+
+def collapsed(report: Dict[str, Any]) -> str:
+    """A report's stacks as flamegraph.pl / speedscope input"""
+    return "".join(f"{stack} {count}\n" for stack, count in report.get("stacks", {}).items())
+
+
+class ProfilingMiddleware:
+    """Profiles requests that carry the token or are picked by `sample_rate`; adds X-Profile-Id"""
+
+    def __init__(self, app, profiler: SamplingProfiler, store: ProfileStore, token: Optional[str] = None,
+                 sample_rate: float = 0.0, skip_prefixes: Sequence[str] = ("/metrics", "/api/admin")):
+        self.app = app
+        self.profiler = profiler
+        self.store = store
+        self.token = token
+        self.sample_rate = sample_rate
+        self.skip_prefixes = tuple(skip_prefixes)
+        self._rng = secrets.SystemRandom()
+
+    def wanted(self, scope) -> bool:
+        if self.token:
+            supplied = None
+            for name, value in scope.get("headers", []):
+                if name == b"x-profile":
+                    supplied = value.decode("latin-1")
+                    break
+            if supplied is not None and secrets.compare_digest(supplied, self.token):
+                return True
+        return self.sample_rate > 0 and self._rng.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] != "http" or scope["path"].startswith(self.skip_prefixes)
+                or not self.profiler.installed or not self.wanted(scope)):
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope["method"], scope["path"])
+        status = {"code": 500}
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-id", profile.id.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        token = current_profile.set(profile)
+        self.profiler.start(profile)
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            self.profiler.stop(profile)
+            current_profile.reset(token)
+            profile.finish(status["code"], getattr(scope.get("route"), "path", None))
+            try:
+                await asyncio.to_thread(self.store.save, profile.report(self.profiler.interval))
+            except Exception as e:
+                logger.warning("Could not save profile %s: %s", profile.id, e)
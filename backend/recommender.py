@@ -0,0 +1,261 @@
+"""
+Local content-based recommendation index.
+
+Every movie record in the metadata store is turned into a feature vector:
+genre one-hots, primary-language one-hot, release decade, IMDb rating and
+(optionally) a hashed TF-IDF of the plot. Each block is weighted, rows are
+L2-normalized and stacked into a float32 matrix, so "more like this" is a
+single matrix-vector product followed by a top-k partition.
+
+The matrix is built offline and saved as a ``.npy`` file that workers open
+memory-mapped, so several processes share one copy through the page cache:
+
+    python recommender.py build              # from the metadata store
+    python recommender.py query tt1375666    # sanity-check the result
+
+Titles fetched after the build are appended to a small in-memory delta via
+``RecommendationIndex.add`` and are searchable immediately.
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import re
+import zlib
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Fixed vocabularies keep vectors compatible between builds and incremental adds
+GENRES = [
+    "Action", "Adventure", "Animation", "Biography", "Comedy", "Crime", "Documentary",
+    "Drama", "Family", "Fantasy", "Film-Noir", "History", "Horror", "Music", "Musical",
+    "Mystery", "Romance", "Sci-Fi", "Short", "Sport", "Thriller", "War", "Western",
+]
+LANGUAGES = [
+    "English", "Hindi", "Tamil", "Telugu", "Kannada", "Malayalam", "Bengali", "Marathi",
+    "Punjabi", "Spanish", "French", "German", "Italian", "Japanese", "Korean", "Mandarin",
+    "Cantonese", "Portuguese", "Russian", "Turkish", "Arabic", "Persian",
+]
+DECADES = list(range(1920, 2040, 10))
+PLOT_DIMS = 128
+
+# Language alone (plus decade and rating) stays well below the default 0.6 serving threshold;
+# a match also needs genre or plot overlap. Rebuild the .npy after changing these.
+WEIGHTS = {"genre": 1.0, "language": 0.7, "decade": 0.5, "rating": 0.3, "plot": 0.7}
+
+STOPWORDS = frozenset(
+    "the and for with his her their from into that this who when where while after "
+    "before about over they them him she has have are was were will its but not".split()
+)
+TOKEN_RE = re.compile(r"[a-z]{3,}")
+
+GENRE_INDEX = {name: i for i, name in enumerate(GENRES)}
+LANGUAGE_INDEX = {name: i for i, name in enumerate(LANGUAGES)}
+OFFSET_LANGUAGE = len(GENRES)
+OFFSET_DECADE = OFFSET_LANGUAGE + len(LANGUAGES) + 1  # +1 for "other language"
+OFFSET_RATING = OFFSET_DECADE + len(DECADES)
+OFFSET_PLOT = OFFSET_RATING + 1
+
+
+def plot_tokens(plot: Optional[str]) -> List[int]:
+    """Hash plot words into PLOT_DIMS buckets (crc32 is stable across processes)"""
+    if not plot:
+        return []
+    return [
+        zlib.crc32(word.encode()) % PLOT_DIMS
+        for word in TOKEN_RE.findall(plot.lower())
+        if word not in STOPWORDS
+    ]
+
+
+def indexable(record: Dict[str, Any]) -> bool:
+    """Sparse records (e.g. from search hits) carry too little to compare"""
+    return bool(record.get('imdb_id') and record.get('genres'))
+
+
+def feature_dims(use_plot: bool) -> int:
+    return OFFSET_PLOT + (PLOT_DIMS if use_plot else 0)
+
+
+def vectorize(record: Dict[str, Any], idf: Optional[np.ndarray] = None) -> np.ndarray:
+    """Build the normalized feature vector for a movie record"""
+    use_plot = idf is not None
+    vector = np.zeros(feature_dims(use_plot), dtype=np.float32)
+
+    genres = [GENRE_INDEX[g] for g in record.get('genres') or [] if g in GENRE_INDEX]
+    for i in genres:
+        vector[i] = WEIGHTS["genre"] / math.sqrt(len(genres))
+
+    languages = record.get('languages') or []
+    if languages:
+        slot = LANGUAGE_INDEX.get(languages[0], len(LANGUAGES))
+        vector[OFFSET_LANGUAGE + slot] = WEIGHTS["language"]
+
+    year = record.get('year')
+    if year:
+        decade = min(max((int(year) // 10) * 10, DECADES[0]), DECADES[-1])
+        vector[OFFSET_DECADE + DECADES.index(decade)] = WEIGHTS["decade"]
+
+    if record.get('rating') is not None:
+        vector[OFFSET_RATING] = WEIGHTS["rating"] * float(record['rating']) / 10.0
+
+    if use_plot:
+        tokens = plot_tokens(record.get('plot'))
+        if tokens:
+            tf = np.bincount(tokens, minlength=PLOT_DIMS).astype(np.float32) * idf
+            norm = np.linalg.norm(tf)
+            if norm:
+                vector[OFFSET_PLOT:] = WEIGHTS["plot"] * tf / norm
+
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class RecommendationIndex:
+    """Top-k cosine similarity over a (memory-mapped) matrix plus an in-memory delta"""
+
+    def __init__(self, matrix: Optional[np.ndarray] = None, ids: Optional[List[str]] = None, idf: Optional[np.ndarray] = None):
+        self.idf = idf
+        self.dims = feature_dims(idf is not None)
+        self.matrix = matrix if matrix is not None else np.zeros((0, self.dims), dtype=np.float32)
+        self.ids = list(ids or [])
+        self.positions = {imdb_id: i for i, imdb_id in enumerate(self.ids)}
+        self._delta_rows: List[np.ndarray] = []
+        self._delta: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, imdb_id: str) -> bool:
+        return imdb_id in self.positions
+
+    @classmethod
+    def load(cls, path: str) -> "RecommendationIndex":
+        """Open a built index; the matrix stays memory-mapped"""
+        path = Path(path)
+        meta = json.loads(path.with_suffix(".json").read_text())
+        matrix = np.load(path.with_suffix(".npy"), mmap_mode="r")
+        idf = np.asarray(meta["idf"], dtype=np.float32) if meta.get("idf") else None
+        return cls(matrix, meta["ids"], idf)
+
+    def _vector_at(self, position: int) -> np.ndarray:
+        base = self.matrix.shape[0]
+        if position < base:
+            return np.asarray(self.matrix[position])
+        return self._delta_rows[position - base]
+
+    def add(self, record: Dict[str, Any]) -> bool:
+        """Add a newly seen title; existing titles are left as built"""
+        imdb_id = record.get('imdb_id')
+        if not indexable(record) or imdb_id in self.positions:
+            return False
+        self.positions[imdb_id] = len(self.ids)
+        self.ids.append(imdb_id)
+        self._delta_rows.append(vectorize(record, self.idf))
+        self._delta = None
+        return True
+
+    def similar(self, imdb_id: str, k: int = 10, min_score: float = 0.0) -> List[Tuple[str, float]]:
+        """Return up to k (imdb_id, score) pairs most similar to imdb_id"""
+        position = self.positions.get(imdb_id)
+        if position is None:
+            return []
+        query = self._vector_at(position)
+
+        scores = self.matrix @ query if self.matrix.shape[0] else np.zeros(0, dtype=np.float32)
+        if self._delta_rows:
+            if self._delta is None:
+                self._delta = np.vstack(self._delta_rows)
+            scores = np.concatenate([scores, self._delta @ query])
+        scores[position] = -1.0
+
+        k = min(k, len(scores) - 1)
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.ids[i], float(scores[i])) for i in top if scores[i] >= min_score]
+
+
+def build(records: Callable[[], Iterable[Dict[str, Any]]], out_path: str, use_plot: bool = True) -> int:
+    """
+    Build the index files from movie records. `records` returns a fresh
+    iterator and is called twice: once for document frequencies, once for vectors.
+    """
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+
+    ids: List[str] = []
+    doc_freq = np.zeros(PLOT_DIMS, dtype=np.float64)
+    for record in filter(indexable, records()):
+        ids.append(record['imdb_id'])
+        if use_plot:
+            doc_freq[np.unique(plot_tokens(record.get('plot')))] += 1
+
+    idf = None
+    if use_plot:
+        idf = (np.log((1 + len(ids)) / (1 + doc_freq)) + 1).astype(np.float32)
+
+    tmp_npy = out_path.with_suffix(".npy.tmp")
+    matrix = np.lib.format.open_memmap(tmp_npy, mode="w+", dtype=np.float32, shape=(len(ids), feature_dims(use_plot)))
+    for row, record in enumerate(filter(indexable, records())):
+        if row >= len(ids):
+            break
+        matrix[row] = vectorize(record, idf)
+    matrix.flush()
+    del matrix
+
+    tmp_json = out_path.with_suffix(".json.tmp")
+    tmp_json.write_text(json.dumps({"ids": ids, "idf": idf.tolist() if idf is not None else None}))
+    os.replace(tmp_npy, out_path.with_suffix(".npy"))
+    os.replace(tmp_json, out_path.with_suffix(".json"))
+    return len(ids)
+
+
+def main():
+    import time
+
+    from dotenv import load_dotenv
+
+    from store import open_store
+
+    root_dir = Path(__file__).parent
+    load_dotenv(root_dir / '.env')
+    default_path = os.environ.get('RECOMMENDER_INDEX_PATH', str(root_dir / 'data' / 'recommender'))
+
+    parser = argparse.ArgumentParser(description="Build or query the local recommendation index")
+    parser.add_argument("--index", default=default_path, help="index path (without extension)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build_cmd = sub.add_parser("build", help="build the index from the metadata store")
+    build_cmd.add_argument("--no-plot", action="store_true", help="skip plot TF-IDF features")
+    query_cmd = sub.add_parser("query", help="show the nearest titles for an IMDb ID")
+    query_cmd.add_argument("imdb_id")
+    query_cmd.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    if args.command == "build":
+        store = open_store(
+            os.environ.get('METADATA_STORE', 'sqlite'),
+            os.environ.get('METADATA_STORE_PATH', str(root_dir / 'data' / 'cinegraph.db')),
+        )
+        count = build(store.iter_movies, args.index, use_plot=not args.no_plot)
+        store.close()
+        logger.info("Built recommendation index with %d titles at %s", count, args.index)
+    else:
+        index = RecommendationIndex.load(args.index)
+        start = time.perf_counter()
+        results = index.similar(args.imdb_id, k=args.k)
+        elapsed = (time.perf_counter() - start) * 1000
+        for imdb_id, score in results:
+            print(f"{imdb_id}\t{score:.3f}")
+        logger.info("Query over %d titles took %.3f ms", len(index), elapsed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Pre-encoded JSON responses for hot endpoints.
+
+Building Pydantic models from OMDb payloads, validating them against the
+route's ``response_model`` and serializing them again costs far more than
+the cache lookup that produced the data. ``Rendered`` holds a response in its
+final form: the model object (for callers that compose it further), the
+encoded JSON bytes, a strong ETag derived from those bytes and the time the
+representation was first produced (``Last-Modified``).
+
+``Rendered.response()`` answers ``If-None-Match`` / ``If-Modified-Since``
+with ``304 Not Modified`` and otherwise returns the bytes as-is, bypassing
+FastAPI's response validation and serialization. Encoding uses orjson when
+it is installed and falls back to the standard library.
+"""
+import hashlib
+import json
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Any, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; the stdlib encoder gives identical JSON, just slower
+    orjson = None
+
+MEDIA_TYPE = "application/json"
+
+
+def jsonable(value: Any) -> Any:
+    """Convert models (and lists/dicts of them) to plain JSON types"""
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, (list, tuple)):
+        return [jsonable(item) for item in value]
+    if isinstance(value, dict):
+        return {key: jsonable(item) for key, item in value.items()}
+    return value
+
+
+def dumps(value: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def sse_event(event: str, data: Any) -> bytes:
+    """One Server-Sent Events message carrying `data` as JSON (encoded JSON never contains a newline)"""
+    return b"event: " + event.encode("utf-8") + b"\ndata: " + dumps(jsonable(data)) + b"\n\n"
+
+
+class Rendered:
+    """An encoded response plus the source object it was rendered from"""
+
+    __slots__ = ("model", "body", "etag", "last_modified", "source")
+
+    def __init__(self, model: Any, source: Any = None, last_modified: Optional[float] = None):
+        self.model = model
+        self.body = dumps(jsonable(model))
+        self.etag = '"' + hashlib.blake2b(self.body, digest_size=16).hexdigest() + '"'
+        self.last_modified = int(last_modified if last_modified is not None else time.time())
+        self.source = source
+
+    def not_modified(self, request: Request) -> bool:
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            tags = [tag.strip() for tag in if_none_match.split(",")]
+            return "*" in tags or self.etag in tags or f"W/{self.etag}" in tags
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since:
+            try:
+                return self.last_modified <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def response(self, request: Request, status_code: int = 200) -> Response:
+        headers = {
+            "ETag": self.etag,
+            "Last-Modified": formatdate(self.last_modified, usegmt=True),
+            # Let browsers keep the body but revalidate it (cheaply, via 304) on every use
+            "Cache-Control": "no-cache",
+        }
+        if self.not_modified(request):
+            return Response(status_code=304, headers=headers)
+        return Response(self.body, status_code=status_code, media_type=MEDIA_TYPE, headers=headers)
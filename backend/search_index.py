@@ -0,0 +1,213 @@
+"""
+Local title search index for search-as-you-type.
+
+OMDb's ``s=`` search only matches whole words and every distinct query
+string is a separate cache key, so "incep", "incept" and "inception" each
+cost an upstream round trip. ``TitleSearchIndex`` is an in-memory inverted
+index over every title we have seen (OMDb search results, detail payloads,
+bulk imports from the metadata store) that answers:
+
+- prefix matches on every query word (``"dark kni"`` -> The Dark Knight)
+- typo-tolerant matches via a trigram vocabulary index plus a bounded edit
+  distance check (``"incepton"`` -> Inception)
+
+Results must match every query word; they are ranked by match quality
+(exact word > prefix > fuzzy) with a bonus for titles that start with or
+equal the whole query.
+"""
+import re
+import unicodedata
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+MAX_PREFIX = 12
+MIN_FUZZY_LENGTH = 4
+
+SCORE_EXACT = 3.0
+SCORE_PREFIX = 2.0
+SCORE_FUZZY = 1.0
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase and strip accents so "Amélie" matches "amelie" """
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall(normalize_text(text))
+
+
+def trigrams(token: str) -> Set[str]:
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def within_edit_distance(a: str, b: str, limit: int) -> bool:
+    """Levenshtein distance check that bails out as soon as `limit` is exceeded"""
+    if abs(len(a) - len(b)) > limit:
+        return False
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return False
+        previous = current
+    return previous[-1] <= limit
+
+
+class TitleSearchIndex:
+    """Inverted index over movie titles with prefix and typo-tolerant lookup"""
+
+    def __init__(self):
+        self._docs: Dict[str, Dict[str, Any]] = {}
+        self._doc_tokens: Dict[str, Set[str]] = {}
+        self._token_docs: Dict[str, Set[str]] = {}
+        self._prefix_tokens: Dict[str, Set[str]] = {}
+        self._trigram_tokens: Dict[str, Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def __contains__(self, imdb_id: str) -> bool:
+        return imdb_id in self._docs
+
+    def get(self, imdb_id: str) -> Optional[Dict[str, Any]]:
+        return self._docs.get(imdb_id)
+
+    def _index_token(self, token: str):
+        for length in range(1, min(len(token), MAX_PREFIX) + 1):
+            self._prefix_tokens.setdefault(token[:length], set()).add(token)
+        for gram in trigrams(token):
+            self._trigram_tokens.setdefault(gram, set()).add(token)
+
+    def _unindex_token(self, token: str):
+        for length in range(1, min(len(token), MAX_PREFIX) + 1):
+            tokens = self._prefix_tokens.get(token[:length])
+            if tokens is not None:
+                tokens.discard(token)
+                if not tokens:
+                    del self._prefix_tokens[token[:length]]
+        for gram in trigrams(token):
+            tokens = self._trigram_tokens.get(gram)
+            if tokens is not None:
+                tokens.discard(token)
+                if not tokens:
+                    del self._trigram_tokens[gram]
+
+    def add(self, record: Dict[str, Any]) -> bool:
+        """Index (or re-index) a record with at least imdb_id and title"""
+        imdb_id = record.get('imdb_id')
+        title = record.get('title')
+        if not imdb_id or not title:
+            return False
+
+        doc = {
+            "imdb_id": imdb_id,
+            "title": title,
+            "year": record.get('year'),
+            "poster": record.get('poster'),
+        }
+        existing = self._docs.get(imdb_id)
+        if existing is not None:
+            # Keep fields a sparser payload (e.g. a search hit) does not carry
+            doc = {key: value if value is not None else existing.get(key) for key, value in doc.items()}
+            if existing['title'] != title:
+                self.remove(imdb_id)
+
+        self._docs[imdb_id] = doc
+        if imdb_id in self._doc_tokens:
+            return True
+
+        tokens = set(tokenize(title))
+        self._doc_tokens[imdb_id] = tokens
+        for token in tokens:
+            docs = self._token_docs.get(token)
+            if docs is None:
+                docs = self._token_docs[token] = set()
+                self._index_token(token)
+            docs.add(imdb_id)
+        return True
+
+    def add_many(self, records: Iterable[Dict[str, Any]]) -> int:
+        return sum(1 for record in records if self.add(record))
+
+    def remove(self, imdb_id: str):
+        self._docs.pop(imdb_id, None)
+        for token in self._doc_tokens.pop(imdb_id, ()):
+            docs = self._token_docs.get(token)
+            if docs is None:
+                continue
+            docs.discard(imdb_id)
+            if not docs:
+                del self._token_docs[token]
+                self._unindex_token(token)
+
+    def _prefix_matches(self, token: str) -> Set[str]:
+        candidates = self._prefix_tokens.get(token[:MAX_PREFIX], set())
+        if len(token) <= MAX_PREFIX:
+            return candidates
+        return {t for t in candidates if t.startswith(token)}
+
+    def _fuzzy_matches(self, token: str) -> Set[str]:
+        if len(token) < MIN_FUZZY_LENGTH:
+            return set()
+        limit = 1 if len(token) < 8 else 2
+        grams = trigrams(token)
+        counts: Dict[str, int] = {}
+        for gram in grams:
+            for candidate in self._trigram_tokens.get(gram, ()):
+                counts[candidate] = counts.get(candidate, 0) + 1
+        # Each edit can destroy at most three trigrams
+        needed = max(1, len(grams) - 3 * limit)
+        return {
+            candidate for candidate, shared in counts.items()
+            if shared >= needed and within_edit_distance(token, candidate, limit)
+        }
+
+    def _match_token(self, token: str) -> Dict[str, float]:
+        """Map doc id -> best score for one query token"""
+        scores: Dict[str, float] = {}
+        matched = self._prefix_matches(token)
+        if not matched:
+            matched = self._fuzzy_matches(token)
+            quality = {t: SCORE_FUZZY for t in matched}
+        else:
+            quality = {t: SCORE_EXACT if t == token else SCORE_PREFIX for t in matched}
+
+        for candidate, score in quality.items():
+            for imdb_id in self._token_docs.get(candidate, ()):
+                if score > scores.get(imdb_id, 0):
+                    scores[imdb_id] = score
+        return scores
+
+    def search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Return up to `limit` indexed records matching every word of the query"""
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return []
+
+        totals: Optional[Dict[str, float]] = None
+        for token in tokens:
+            scores = self._match_token(token)
+            if totals is None:
+                totals = scores
+            else:
+                totals = {imdb_id: total + scores[imdb_id] for imdb_id, total in totals.items() if imdb_id in scores}
+            if not totals:
+                return []
+
+        normalized_query = " ".join(tokens)
+        ranked = []
+        for imdb_id, score in totals.items():
+            doc = self._docs[imdb_id]
+            title = " ".join(tokenize(doc['title']))
+            if title == normalized_query:
+                score += 5
+            elif title.startswith(normalized_query):
+                score += 2
+            ranked.append((-score, len(title), doc['title'], imdb_id))
+        ranked.sort()
+        return [self._docs[imdb_id] for _, _, _, imdb_id in ranked[:limit]]
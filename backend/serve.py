@@ -0,0 +1,81 @@
+"""
+Run the API with several worker processes on one host.
+
+Each worker is a separate process with its own event loop, in-memory cache
+and upstream clients (created in the app lifespan, never before the fork).
+Workers share the SQLite metadata store: it is their common second cache
+tier, and its leases make sure only one worker fetches a given key or runs a
+warm job's upstream refresh at a time. Every worker prewarms before its
+``/api/ready`` turns 200, so a rolling restart never routes traffic to a
+cold worker.
+
+    python serve.py --workers 4 --port 8001
+
+Uses gunicorn with uvicorn workers when gunicorn is installed (graceful
+restarts via SIGHUP, worker recycling), else uvicorn's own process manager.
+"""
+import argparse
+import logging
+import os
+import sys
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+def default_workers() -> int:
+    return int(os.environ.get('WEB_CONCURRENCY', os.cpu_count() or 1))
+
+
+def main():
+    from dotenv import load_dotenv
+
+    root_dir = Path(__file__).parent
+    load_dotenv(root_dir / '.env')
+
+    parser = argparse.ArgumentParser(description="Serve the CineGraph API with multiple worker processes")
+    parser.add_argument("--host", default=os.environ.get('HOST', '0.0.0.0'))
+    parser.add_argument("--port", type=int, default=int(os.environ.get('PORT', 8001)))
+    parser.add_argument("--workers", type=int, default=default_workers(), help="default: WEB_CONCURRENCY or CPU count")
+    parser.add_argument("--graceful-timeout", type=int, default=30, help="seconds a stopping worker gets to finish requests")
+    parser.add_argument("--max-requests", type=int, default=0, help="recycle a gunicorn worker after this many requests (0 = never)")
+    parser.add_argument("--no-gunicorn", action="store_true", help="use uvicorn's process manager even if gunicorn is installed")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    os.chdir(root_dir)
+
+    try:
+        import gunicorn  # noqa: F401
+        use_gunicorn = not args.no_gunicorn
+    except ImportError:
+        use_gunicorn = False
+
+    if use_gunicorn:
+        argv = [
+            sys.executable, "-m", "gunicorn", "server:app",
+            "--worker-class", "uvicorn.workers.UvicornWorker",
+            "--workers", str(args.workers),
+            "--bind", f"{args.host}:{args.port}",
+            "--graceful-timeout", str(args.graceful_timeout),
+            "--max-requests", str(args.max_requests),
+            "--max-requests-jitter", str(args.max_requests // 10),
+        ]
+        logger.info("Starting %d gunicorn/uvicorn workers on %s:%d", args.workers, args.host, args.port)
+        os.execv(sys.executable, argv)
+
+    import uvicorn
+
+    logger.info("Starting %d uvicorn workers on %s:%d", args.workers, args.host, args.port)
+    uvicorn.run(
+        "server:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        proxy_headers=True,
+        timeout_graceful_shutdown=args.graceful_timeout,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,40 +1,255 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Query
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
+from contextlib import asynccontextmanager
 import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
-import httpx
+from typing import List, Optional, Dict, Any, Callable, Tuple
 import time
 import json
 import asyncio
+import random
+import re
+import base64
+import secrets
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from caching import TTLCache, SingleFlight, CachedFailure
+from store import MetadataStore, NullStore, open_store, normalize_omdb_movie, normalize_omdb_search_item, record_to_omdb
+from id_map import IdMapIndex
+from recommender import RecommendationIndex
+from search_index import TitleSearchIndex
+from image_proxy import ImageProxy
+from upstream import UpstreamClient, UpstreamUnavailable
+from warmer import Scheduler
+from metrics import Registry, TimingMiddleware, span
+from rendering import Rendered, jsonable, sse_event
+from geoip import GeoIPDatabase, client_ip
+from profiling import ProfileStore, ProfilingMiddleware, SamplingProfiler, collapsed
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # OMDb Configuration
 OMDB_API_KEY = os.environ.get('OMDB_API_KEY')
-OMDB_BASE_URL = "http://www.omdbapi.com"
+OMDB_BASE_URL = os.environ.get('OMDB_BASE_URL', "http://www.omdbapi.com")
+
+# Max concurrent OMDb lookups for batch fetches (trending, fallback recommendations)
+OMDB_FETCH_CONCURRENCY = int(os.environ.get('OMDB_FETCH_CONCURRENCY', 8))
+
+# Max IMDb IDs accepted by the batch movie endpoints
+BATCH_MAX_IDS = int(os.environ.get('BATCH_MAX_IDS', 50))
+IMDB_ID_RE = re.compile(r'^tt\d+$')
 
 # TMDB Configuration
 TMDB_API_KEY = os.environ.get('TMDB_API_KEY')
-TMDB_BASE_URL = "https://api.themoviedb.org/3"
+TMDB_BASE_URL = os.environ.get('TMDB_BASE_URL', "https://api.themoviedb.org/3")
+
+
+# Bounded in-memory cache (LRU + per-namespace TTLs)
+CACHE_TTL = 3600  # 1 hour, default for namespaces without an explicit TTL
+CACHE_NAMESPACE_TTLS = {
+    "omdb_detail": int(os.environ.get('CACHE_TTL_OMDB_DETAIL', 86400)),
+    "omdb_search": int(os.environ.get('CACHE_TTL_OMDB_SEARCH', 3600)),
+    "tmdb": int(os.environ.get('CACHE_TTL_TMDB', 21600)),
+    "tmdb_recommendations": int(os.environ.get('CACHE_TTL_TMDB_RECOMMENDATIONS', 3600)),
+}
+# Expired entries are still served for this long while a background refresh runs
+CACHE_STALE_TTL = int(os.environ.get('CACHE_STALE_TTL', 86400))
+# Short TTLs for "not found" answers and upstream failures
+NEGATIVE_CACHE_TTL = int(os.environ.get('NEGATIVE_CACHE_TTL', 600))
+FAILURE_CACHE_TTL = int(os.environ.get('FAILURE_CACHE_TTL', 30))
+cache = TTLCache(
+    max_entries=int(os.environ.get('CACHE_MAX_ENTRIES', 5000)),
+    max_bytes=int(os.environ.get('CACHE_MAX_BYTES', 64 * 1024 * 1024)),
+    default_ttl=CACHE_TTL,
+    namespace_ttls=CACHE_NAMESPACE_TTLS,
+    stale_ttl=CACHE_STALE_TTL,
+    sweep_interval=int(os.environ.get('CACHE_SWEEP_INTERVAL', 60)),
+)
+
+# Persistent second cache tier shared by all workers on the host ("sqlite" or "none")
+METADATA_STORE = os.environ.get('METADATA_STORE', 'sqlite')
+METADATA_STORE_PATH = os.environ.get('METADATA_STORE_PATH', str(ROOT_DIR / 'data' / 'cinegraph.db'))
+# How many recently stored responses each worker loads into memory on startup
+WARM_START_LIMIT = int(os.environ.get('WARM_START_LIMIT', 2000))
+# How long a worker waits for another worker that is already fetching the same key (0 = never wait)
+SHARED_FETCH_WAIT = float(os.environ.get('SHARED_FETCH_WAIT', 2.0))
+store: MetadataStore = NullStore()  # opened per worker in the app lifespan
+# Store writes run in order on one background thread so a busy SQLite never blocks the event loop
+store_writer: Optional[ThreadPoolExecutor] = None
+# How often expired responses and leases are deleted from the store (by one worker at a time)
+STORE_PURGE_INTERVAL = int(os.environ.get('STORE_PURGE_INTERVAL', 900))
+
+# IMDb <-> TMDB ID index, consulted before any /find or /external_ids call
+id_index = IdMapIndex(store)
+
+# Local content-based recommendation index (built with `python recommender.py build`)
+RECOMMENDER_INDEX_PATH = os.environ.get('RECOMMENDER_INDEX_PATH', str(ROOT_DIR / 'data' / 'recommender'))
+RECOMMENDER_MIN_SCORE = float(os.environ.get('RECOMMENDER_MIN_SCORE', 0.6))
+RECOMMENDER_MIN_RESULTS = int(os.environ.get('RECOMMENDER_MIN_RESULTS', 5))
+# Below this many titles (and without a prebuilt .npy) the index only backs up TMDB: a few
+# hundred browsed/curated titles would otherwise answer for everything from the same small pool
+RECOMMENDER_MIN_CATALOG = int(os.environ.get('RECOMMENDER_MIN_CATALOG', 5000))
+rec_index = RecommendationIndex()
+rec_index_prebuilt = False
+
+# Local title index answering /api/search before OMDb is asked
+SEARCH_INDEX_MIN_RESULTS = int(os.environ.get('SEARCH_INDEX_MIN_RESULTS', 3))
+search_index = TitleSearchIndex()
+
+# Cursor pagination for /api/search: results per page, deepest page served, and how long
+# a cursor's already built pages (and its place in the OMDb/TMDB result lists) are kept
+SEARCH_PAGE_SIZE = 10
+SEARCH_MAX_PAGES = int(os.environ.get('SEARCH_MAX_PAGES', 10))
+SEARCH_CURSOR_TTL = int(os.environ.get('SEARCH_CURSOR_TTL', 600))
+
+# Background warmer keeping trending/curated titles fresh and their responses precomputed
+WARMER_ENABLED = os.environ.get('WARMER_ENABLED', '1') == '1'
+WARMER_CONCURRENCY = int(os.environ.get('WARMER_CONCURRENCY', 2))
+WARM_TRENDING_INTERVAL = int(os.environ.get('WARM_TRENDING_INTERVAL', 600))
+WARM_CURATED_INTERVAL = int(os.environ.get('WARM_CURATED_INTERVAL', 1800))
+# Longest a worker reports "not ready" while the first warm-up runs
+PREWARM_TIMEOUT = float(os.environ.get('PREWARM_TIMEOUT', 60))
+scheduler = Scheduler(max_concurrency=1)
+readiness: Dict[str, Any] = {"ready": False, "prewarm_seconds": None, "prewarm_ok": None}
+
+# Local IP-to-country range database (CSV, optionally gzipped) answering /api/geolocation
+GEOIP_DB_PATH = os.environ.get('GEOIP_DB_PATH', str(ROOT_DIR / 'data' / 'geoip.csv'))
+GEOIP_CACHE_SIZE = int(os.environ.get('GEOIP_CACHE_SIZE', 10000))
+geoip = GeoIPDatabase(GEOIP_CACHE_SIZE)
+
+# Default and maximum time a recommendations stream stays open before closing with what it has
+RECS_STREAM_DEADLINE = float(os.environ.get('RECS_STREAM_DEADLINE', 3.0))
+RECS_STREAM_MAX_DEADLINE = float(os.environ.get('RECS_STREAM_MAX_DEADLINE', 30.0))
+
+# Opt-in request profiling: requests sending ADMIN_TOKEN in the X-Profile header, plus a
+# PROFILE_SAMPLE_RATE fraction of all requests; reports are read via /api/admin/profiles
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+profiler = SamplingProfiler(interval=float(os.environ.get('PROFILE_INTERVAL_MS', 5)) / 1000)
+profile_store = ProfileStore(
+    os.environ.get('PROFILE_DIR', str(ROOT_DIR / 'data' / 'profiles')),
+    max_reports=int(os.environ.get('PROFILE_MAX_REPORTS', 100)),
+)
 
+# In-flight upstream fetches, keyed like the cache so identical misses share one call
+inflight = SingleFlight()
 
-# Simple in-memory cache
-cache = {}
-CACHE_TTL = 3600  # 1 hour
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Per-worker setup and teardown (see startup/shutdown below)"""
+    await startup()
+    try:
+        yield
+    finally:
+        await shutdown()
 
 # Create the main app without a prefix
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
-# HTTP client for OMDb & TMDB APIs
-http_client = httpx.AsyncClient(timeout=10.0)
+# Prometheus metrics, served at /metrics
+metrics_registry = Registry()
+REQUEST_LATENCY = metrics_registry.histogram(
+    "cinegraph_http_request_duration_seconds", "Request latency by route", ("method", "route", "status"))
+REQUESTS_IN_FLIGHT = metrics_registry.gauge(
+    "cinegraph_http_requests_in_flight", "Requests currently being served", ("method",))
+UPSTREAM_REQUESTS = metrics_registry.counter(
+    "cinegraph_upstream_requests_total", "Upstream calls by provider, path and outcome", ("provider", "path", "outcome"))
+UPSTREAM_LATENCY = metrics_registry.histogram(
+    "cinegraph_upstream_request_duration_seconds", "Upstream call latency including retries", ("provider", "path"))
+UPSTREAM_FETCHES_IN_FLIGHT = metrics_registry.gauge(
+    "cinegraph_upstream_fetches_in_flight", "Distinct upstream fetches currently in flight")
+UPSTREAM_CIRCUIT_OPEN = metrics_registry.gauge(
+    "cinegraph_upstream_circuit_open", "1 while a provider's circuit breaker is not closed", ("provider",))
+CACHE_ENTRIES = metrics_registry.gauge("cinegraph_cache_entries", "Entries in the in-memory cache")
+CACHE_BYTES = metrics_registry.gauge("cinegraph_cache_bytes", "Estimated size of the in-memory cache")
+CACHE_HIT_RATIO = metrics_registry.gauge("cinegraph_cache_hit_ratio", "Cache hits (fresh or stale) / lookups")
+CACHE_EVENTS = metrics_registry.counter(
+    "cinegraph_cache_events_total", "Cache hits, misses, evictions and expirations by namespace", ("namespace", "event"))
+
+# Per-provider HTTP clients (own connection pool, rate limit, retries and circuit breaker)
+# and the poster proxy; created per worker by open_resources(), never at import time
+omdb_client: Optional[UpstreamClient] = None
+tmdb_client: Optional[UpstreamClient] = None
+image_proxy: Optional[ImageProxy] = None
+
+def open_resources():
+    """Open this worker's store handle, upstream clients and image proxy"""
+    global store, store_writer, id_index, omdb_client, tmdb_client, image_proxy
+    store = open_store(METADATA_STORE, METADATA_STORE_PATH)
+    store_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="store-writer")
+    id_index = IdMapIndex(store, write=store_write)
+    omdb_client = UpstreamClient(
+        "omdb",
+        timeout=float(os.environ.get('OMDB_TIMEOUT', 10.0)),
+        max_connections=20,
+        rate=float(os.environ.get('OMDB_RATE_LIMIT', 10)),
+        burst=float(os.environ.get('OMDB_RATE_BURST', 20)),
+        daily_quota=int(os.environ.get('OMDB_DAILY_QUOTA', 0)),  # 0 = no daily cap
+    )
+    tmdb_client = UpstreamClient(
+        "tmdb",
+        timeout=float(os.environ.get('TMDB_TIMEOUT', 10.0)),
+        max_connections=50,
+        max_keepalive=20,
+        http2=True,
+        rate=float(os.environ.get('TMDB_RATE_LIMIT', 40)),
+        burst=float(os.environ.get('TMDB_RATE_BURST', 40)),
+    )
+    # Poster proxy with its own client and a bounded on-disk cache
+    image_proxy = ImageProxy(
+        cache_dir=os.environ.get('IMAGE_CACHE_DIR', str(ROOT_DIR / 'data' / 'images')),
+        max_bytes=int(os.environ.get('IMAGE_CACHE_MAX_BYTES', 512 * 1024 * 1024)),
+        timeout=float(os.environ.get('IMAGE_PROXY_TIMEOUT', 10.0)),
+    )
+
+async def close_resources():
+    for client in (omdb_client, tmdb_client, image_proxy):
+        if client is not None:
+            await client.aclose()
+    if store_writer is not None:
+        # Flush queued writes before closing the connection
+        await asyncio.to_thread(store_writer.shutdown, wait=True)
+    store.close()
+
+def _log_store_error(future: Future):
+    if not future.cancelled() and future.exception() is not None:
+        logger.error("Metadata store write failed: %s", future.exception())
+
+def store_write(fn: Callable[..., Any], *args: Any):
+    """Queue a store write on the writer thread (fire and forget; failures are logged)"""
+    try:
+        store_writer.submit(fn, *args).add_done_callback(_log_store_error)
+    except RuntimeError:  # writer already shut down
+        logger.warning("Dropped a metadata store write during shutdown")
+
+async def store_call(fn: Callable[..., Any], *args: Any):
+    """Run a store write whose result we need on the writer thread, without blocking the loop"""
+    return await asyncio.wrap_future(store_writer.submit(fn, *args))
+
+def collect_runtime_metrics():
+    """Refresh gauges that mirror cache and client state before a scrape"""
+    stats = cache.stats()
+    CACHE_ENTRIES.set(stats['entries'])
+    CACHE_BYTES.set(stats['bytes'])
+    CACHE_HIT_RATIO.set(stats['hit_ratio'])
+    for namespace, counts in stats['namespaces'].items():
+        for event in ("hits", "stale_hits", "misses", "evictions", "expirations"):
+            CACHE_EVENTS.set(counts[event], namespace=namespace, event=event)
+    UPSTREAM_FETCHES_IN_FLIGHT.set(len(inflight))
+    for client in (omdb_client, tmdb_client):
+        if client is None:
+            continue
+        UPSTREAM_CIRCUIT_OPEN.set(int(client.breaker.state != client.breaker.CLOSED), provider=client.name)
+
+metrics_registry.add_collector(collect_runtime_metrics)
 
 # Models
 class MovieSearchResult(BaseModel):
@@ -70,11 +285,219 @@ class MovieDetail(BaseModel):
     genres: List[Dict[str, Any]] = []
     tagline: Optional[str] = None
     
+class MovieBatchRequest(BaseModel):
+    ids: List[str]
+
+class MovieBatchItem(BaseModel):
+    id: str
+    movie: Optional[MovieDetail] = None
+    error: Optional[str] = None
+
 class GeolocationResponse(BaseModel):
     country_code: str
     country_name: str
 
 # Helper Functions
+def cache_negative(namespace: str, cache_key: str, value: Any, ttl: int):
+    """Cache a not-found/failure result briefly, unless a stale good copy is still servable"""
+    if cache.peek(cache_key) is None:
+        cache.set(namespace, cache_key, value, ttl=ttl, stale_ttl=0)
+    # Published under its own key so other workers waiting in fetch_shared see the outcome,
+    # while normal lookups never serve it as a stale copy
+    encoded = {"failure": value.detail} if isinstance(value, CachedFailure) else {"value": value}
+    store_write(store.set, f"negative:{cache_key}", namespace, encoded, time.time() + ttl)
+
+def _shared_result(cache_key: str, now: float):
+    """A result another worker published for a key: (value, expires_at, is_negative) or None"""
+    persisted = store.get(cache_key, min_expires_at=now)
+    if persisted is not None:
+        return persisted[1], persisted[2], False
+    persisted = store.get(f"negative:{cache_key}", min_expires_at=now)
+    if persisted is not None:
+        encoded = persisted[1]
+        value = CachedFailure(encoded["failure"]) if "failure" in encoded else encoded.get("value")
+        return value, persisted[2], True
+    return None
+
+async def cache_lookup(namespace: str, cache_key: str):
+    """Look a key up in memory, then in the persistent store. Returns (value, is_stale) or None"""
+    with span("cache"):
+        return await _cache_lookup(namespace, cache_key)
+
+async def stored_response(cache_key: str, min_expires_at: float):
+    """Read the persistent tier; like writes, it is best-effort, so a failed read is a miss"""
+    try:
+        return await asyncio.to_thread(store.get, cache_key, min_expires_at)
+    except Exception as e:
+        logger.warning("Metadata store read failed for %s: %s", cache_key, e)
+        return None
+
+async def _cache_lookup(namespace: str, cache_key: str):
+    now = time.time()
+    cached = cache.lookup(namespace, cache_key)
+    if cached is not None:
+        if not cached[1]:
+            return cached
+        # Stale here, but another worker may already have refreshed it into the store
+        persisted = await stored_response(cache_key, now)
+        if persisted is None:
+            return cached
+        _, value, expires_at = persisted
+        cache.set(namespace, cache_key, value, ttl=expires_at - now)
+        return value, False
+
+    persisted = await stored_response(cache_key, now - cache.stale_ttl)
+    if persisted is None:
+        return None
+    _, value, expires_at = persisted
+    cache.set(namespace, cache_key, value, ttl=max(expires_at - now, 0))
+    return value, expires_at <= now
+
+def cache_store(namespace: str, cache_key: str, value: Any, size: int):
+    """Write a good upstream response to memory and to the persistent store"""
+    ttl = cache.ttl_for(namespace)
+    cache.set(namespace, cache_key, value, ttl=ttl, size=size)
+    store_write(store.set, cache_key, namespace, value, time.time() + ttl)
+
+async def fetch_shared(namespace: str, cache_key: str, fetch: Callable[[], Any]):
+    """Run `fetch` unless another worker process is already fetching this key.
+
+    `inflight` only dedupes within one process; across workers a store lease
+    elects one fetcher and the others wait (up to SHARED_FETCH_WAIT) for its
+    result, or its not-found/failure outcome, to appear in the store.
+    """
+    if SHARED_FETCH_WAIT <= 0:
+        return await fetch()
+    owner = str(os.getpid())
+    lease = f"fetch:{cache_key}"
+    try:
+        leased = await store_call(store.try_lease, lease, owner, SHARED_FETCH_WAIT * 2)
+    except Exception as e:
+        # The lease only saves upstream calls; a busy or broken store must not fail the request
+        logger.warning("Could not take lease %s, fetching directly: %s", lease, e)
+        return await fetch()
+    if not leased:
+        deadline = time.monotonic() + SHARED_FETCH_WAIT
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+            now = time.time()
+            try:
+                published = await asyncio.to_thread(_shared_result, cache_key, now)
+            except Exception as e:
+                logger.warning("Could not poll the store for %s, fetching directly: %s", cache_key, e)
+                break
+            if published is None:
+                continue
+            value, expires_at, negative = published
+            if not negative:
+                cache.set(namespace, cache_key, value, ttl=expires_at - now)
+                return value
+            if cache.peek(cache_key) is None:
+                cache.set(namespace, cache_key, value, ttl=expires_at - now, stale_ttl=0)
+            if isinstance(value, CachedFailure):
+                raise HTTPException(status_code=500, detail=value.detail)
+            return value
+        # The other worker is slow or gone: fetch it ourselves
+    try:
+        return await fetch()
+    finally:
+        # An unreleased lease (e.g. during shutdown) just expires
+        store_write(store.release_lease, lease, owner)
+
+def render_cached(kind: str, key: str, source: Any, build: Callable[[], Any]) -> Rendered:
+    """Encoded response for `source`, rebuilt only when the cached source object changes"""
+    cache_key = f"render_{kind}_{key}"
+    cached = cache.lookup("rendered", cache_key)
+    if cached is not None and cached[0].source is source:
+        return cached[0]
+    rendered = Rendered(build(), source=source)
+    cache.set("rendered", cache_key, rendered, size=2 * len(rendered.body))
+    return rendered
+
+def load_geoip():
+    """Load the GeoIP range database if one is installed"""
+    global geoip
+    if Path(GEOIP_DB_PATH).exists():
+        geoip = GeoIPDatabase.load(GEOIP_DB_PATH, GEOIP_CACHE_SIZE)
+    else:
+        logger.warning("No GeoIP database at %s; /api/geolocation will default to US", GEOIP_DB_PATH)
+    return len(geoip)
+
+def load_recommendation_index():
+    """Open the prebuilt index, or seed an in-memory one from stored movie records"""
+    global rec_index, rec_index_prebuilt
+    rec_index_prebuilt = Path(RECOMMENDER_INDEX_PATH).with_suffix('.npy').exists()
+    if rec_index_prebuilt:
+        rec_index = RecommendationIndex.load(RECOMMENDER_INDEX_PATH)
+    else:
+        rec_index = RecommendationIndex()
+        for record in store.iter_movies():
+            rec_index.add(record)
+    return len(rec_index)
+
+def local_index_first() -> bool:
+    """Whether the local index covers a real catalog and may answer before TMDB"""
+    return rec_index_prebuilt or len(rec_index) >= RECOMMENDER_MIN_CATALOG
+
+async def local_recommendations(movie_id: str, k: int = 10) -> List[MovieSearchResult]:
+    """Answer from the local similarity index; empty if it has too little to go on"""
+    neighbours = rec_index.similar(movie_id, k=k, min_score=RECOMMENDER_MIN_SCORE)
+    if len(neighbours) < RECOMMENDER_MIN_RESULTS:
+        return []
+    try:
+        records = await asyncio.to_thread(lambda: [store.get_movie(imdb_id) for imdb_id, _ in neighbours])
+    except Exception as e:
+        logger.warning("Metadata store read failed for %s neighbours: %s", movie_id, e)
+        return []
+    results = []
+    for (imdb_id, _), record in zip(neighbours, records):
+        if record:
+            results.append(MovieSearchResult(
+                id=imdb_id,
+                title=record.get('title', ''),
+                release_date=str(record['year']) if record.get('year') else None,
+                poster_path=record.get('poster'),
+                vote_average=record.get('rating'),
+                overview=record.get('plot') or ""
+            ))
+    return results
+
+def warm_start_cache():
+    """Load the most recently stored responses into the in-memory cache"""
+    now = time.time()
+    loaded = 0
+    for cache_key, namespace, value, expires_at in store.iter_recent(WARM_START_LIMIT, min_expires_at=now - cache.stale_ttl):
+        if cache.peek(cache_key) is None:
+            cache.set(namespace, cache_key, value, ttl=max(expires_at - now, 0))
+            loaded += 1
+    store.purge_expired(now - cache.stale_ttl)
+    return loaded
+
+def upstream_path(path: str) -> str:
+    """Low-cardinality path label: IDs become placeholders"""
+    return re.sub(r'/(tt)?\d+', lambda m: '/{imdb_id}' if m.group(1) else '/{id}', path)
+
+async def upstream_get(client: UpstreamClient, path: str, url: str, params: Optional[Dict[str, Any]] = None):
+    """GET through a provider client, counting the call and its latency per provider and path"""
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        response = await client.get(url, params=params)
+        outcome = str(response.status_code)
+        return response
+    except UpstreamUnavailable:
+        outcome = "rejected"
+        raise
+    finally:
+        UPSTREAM_REQUESTS.inc(provider=client.name, path=path, outcome=outcome)
+        if outcome != "rejected":
+            UPSTREAM_LATENCY.observe(time.perf_counter() - started, provider=client.name, path=path)
+
+def omdb_cache_key(params: Dict[str, Any]) -> str:
+    """Cache key for an OMDb call (params without the API key, which must never reach the store)"""
+    params = {key: value for key, value in params.items() if key != 'apikey'}
+    return f"omdb_{json.dumps(params, sort_keys=True)}"
+
 async def omdb_request(params: Dict[str, Any]):
     """Make a request to OMDb API with caching"""
     if not OMDB_API_KEY:
@@ -85,89 +508,514 @@ async def omdb_request(params: Dict[str, Any]):
     params['apikey'] = OMDB_API_KEY
     
     # Create cache key
-    cache_key = f"omdb_{json.dumps(params, sort_keys=True)}"
+    cache_key = omdb_cache_key(params)
+    namespace = "omdb_search" if 's' in params else "omdb_detail"
     
-    # Check cache
-    if cache_key in cache:
-        cached_data, timestamp = cache[cache_key]
-        if time.time() - timestamp < CACHE_TTL:
-            return cached_data
+    # Check cache (stale entries are served immediately and refreshed in the background)
+    cached = await cache_lookup(namespace, cache_key)
+    if cached is not None:
+        cached_data, stale = cached
+        if stale:
+            inflight.spawn(cache_key, lambda: fetch_shared(namespace, cache_key, lambda: _omdb_fetch(params, cache_key, namespace)))
+        if isinstance(cached_data, CachedFailure):
+            raise HTTPException(status_code=500, detail=cached_data.detail)
+        return cached_data
     
-    # Make request
+    # Make request (concurrent misses for the same key share one upstream call)
+    with span("upstream"):
+        return await inflight.do(cache_key, lambda: fetch_shared(namespace, cache_key, lambda: _omdb_fetch(params, cache_key, namespace)))
+
+async def _omdb_fetch(params: Dict[str, Any], cache_key: str, namespace: str):
+    """Fetch from OMDb and fill the cache"""
     try:
-        response = await http_client.get(OMDB_BASE_URL, params=params)
+        response = await upstream_get(omdb_client, "/?s=" if 's' in params else "/?i=", OMDB_BASE_URL, params)
         response.raise_for_status()
         data = response.json()
         
         if data.get('Response') == 'False':
+            cache_negative(namespace, cache_key, data, NEGATIVE_CACHE_TTL)
             return data
 
-        # Cache the result
-        cache[cache_key] = (data, time.time())
+        # Cache the result (and keep a normalized record of full title payloads)
+        cache_store(namespace, cache_key, data, size=len(response.content))
+        try:
+            if 'i' in params and data.get('imdbID'):
+                record = normalize_omdb_movie(data)
+                store_write(store.put_movie, record)
+                rec_index.add(record)
+                search_index.add(record)
+            elif 's' in params:
+                records = [normalize_omdb_search_item(item) for item in data.get('Search', []) if item.get('imdbID')]
+                store_write(store.put_movies, records)
+                search_index.add_many(records)
+        except Exception as e:
+            logger.error("Metadata store write failed: %s", e)
         return data
+    except UpstreamUnavailable as e:
+        # OMDb is down or over quota: fail fast, from the stored record if we have one
+        try:
+            record = await asyncio.to_thread(store.get_movie, params['i']) if 'i' in params else None
+        except Exception as store_error:
+            logger.warning("Metadata store read failed for %s: %s", params.get('i'), store_error)
+            record = None
+        if record and record.get('genres'):
+            return record_to_omdb(record)
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
-        logger.error(f"OMDb API error: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"OMDb API error: {str(e)}")
+        logger.error("OMDb API error: %s", e)
+        detail = f"OMDb API error: {str(e)}"
+        cache_negative(namespace, cache_key, CachedFailure(detail), FAILURE_CACHE_TTL)
+        raise HTTPException(status_code=500, detail=detail)
+
+async def omdb_fetch_many(imdb_ids: List[str], limit: int = OMDB_FETCH_CONCURRENCY, want: Optional[int] = None):
+    """
+    Look up several IMDb IDs concurrently, with at most `limit` requests in flight.
+    Stops early once `want` titles have been found. Returns the found OMDb payloads
+    keyed by IMDb ID, in input order; unknown or failing IDs are skipped.
+    """
+    found = {imdb_id: data async for imdb_id, data in omdb_iter_many(imdb_ids, limit, want)}
+    return {imdb_id: found[imdb_id] for imdb_id in dict.fromkeys(imdb_ids) if imdb_id in found}
+
+async def omdb_iter_many(imdb_ids: List[str], limit: int = OMDB_FETCH_CONCURRENCY, want: Optional[int] = None):
+    """Like omdb_fetch_many, but yields (imdb_id, payload) as each lookup completes"""
+    imdb_ids = list(dict.fromkeys(imdb_ids))
+    semaphore = asyncio.Semaphore(limit)
+
+    async def fetch(imdb_id: str):
+        async with semaphore:
+            return imdb_id, await omdb_request({"i": imdb_id})
+
+    tasks = [asyncio.ensure_future(fetch(imdb_id)) for imdb_id in imdb_ids]
+    found = 0
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            try:
+                imdb_id, data = await next_done
+            except Exception as e:
+                logger.error("Failed to fetch movie: %s", e)
+                continue
+            if data.get('Response') != 'False':
+                found += 1
+                yield imdb_id, data
+                if want and found >= want:
+                    break
+    finally:
+        # Upstream fetches are shared via `inflight`, so cancelling a waiter here
+        # still lets an already-started call finish and fill the cache
+        for task in tasks:
+            task.cancel()
 
 async def tmdb_request(path: str, params: Dict[str, Any] = {}):
     """Make a request to TMDB API with caching"""
     if not TMDB_API_KEY:
         return None  # Fail gracefully if no key
 
+    url = f"{TMDB_BASE_URL}{path}"
+    # Keyed without the API key, which must never reach the store
+    cache_key = f"tmdb_{url}_{json.dumps(params, sort_keys=True)}"
+
     # Add API key to params
     params = params.copy()
     params['api_key'] = TMDB_API_KEY
+    namespace = "tmdb_recommendations" if path.endswith('/recommendations') else "tmdb"
     
-    url = f"{TMDB_BASE_URL}{path}"
-    cache_key = f"tmdb_{url}_{json.dumps(params, sort_keys=True)}"
-    
-    if cache_key in cache:
-        cached_data, timestamp = cache[cache_key]
-        if time.time() - timestamp < CACHE_TTL:
-            return cached_data
-            
+    cached = await cache_lookup(namespace, cache_key)
+    if cached is not None:
+        cached_data, stale = cached
+        if stale:
+            inflight.spawn(cache_key, lambda: fetch_shared(namespace, cache_key, lambda: _tmdb_fetch(path, url, params, cache_key, namespace)))
+        return cached_data
+
+    with span("upstream"):
+        return await inflight.do(cache_key, lambda: fetch_shared(namespace, cache_key, lambda: _tmdb_fetch(path, url, params, cache_key, namespace)))
+
+async def _tmdb_fetch(path: str, url: str, params: Dict[str, Any], cache_key: str, namespace: str):
+    """Fetch from TMDB, fill the cache and learn any IMDb <-> TMDB mappings"""
     try:
-        response = await http_client.get(url, params=params)
+        response = await upstream_get(tmdb_client, upstream_path(path), url, params)
         response.raise_for_status()
         data = response.json()
-        cache[cache_key] = (data, time.time())
+        try:
+            id_index.observe(path, data)
+        except Exception as e:
+            logger.error("ID index update failed: %s", e)
+        if '/find/' in url and not data.get('movie_results'):
+            # Unmapped IDs are re-checked sooner in case TMDB adds them
+            cache_negative(namespace, cache_key, data, NEGATIVE_CACHE_TTL)
+        else:
+            cache_store(namespace, cache_key, data, size=len(response.content))
         return data
+    except UpstreamUnavailable as e:
+        logger.warning("Skipping TMDB call: %s", e)
+        return None
     except Exception as e:
-        logger.error(f"TMDB API error: {str(e)}")
+        logger.error("TMDB API error: %s", e)
+        cache_negative(namespace, cache_key, None, FAILURE_CACHE_TTL)
         return None
 
+# List of popular movie IMDb IDs (Global + Indian)
+TRENDING_IDS = [
+    "tt15354916",  # Jawan
+    "tt12844910",  # Pathaan
+    "tt13751694",  # Animal
+    "tt23849204",  # 12th Fail
+    "tt15398776",  # Oppenheimer
+    "tt1517268",   # Barbie
+    "tt15239678",  # Dune: Part Two
+]
+
+# Language-specific curated pools for the OMDb recommendation fallback
+LANGUAGE_POOLS = {
+    'hi': {  # Hindi/Bollywood
+        "Action": ["tt8178634", "tt15354916", "tt7019842", "tt13751694", "tt12844910"],  # RRR, Jawan, Pathaan, KGF2, Pushpa
+        "Drama": ["tt1187043", "tt0169102", "tt5074352", "tt2338151", "tt23849204"],  # 3 Idiots, Lagaan, Dangal, PK, 12th Fail
+        "Comedy": ["tt1187043", "tt1620933", "tt1821480", "tt1954470", "tt2283748"],  # 3 Idiots, Munna Bhai, Andhadhun, Queen, Vicky Donor
+        "Crime": ["tt6148156", "tt1821480", "tt10280296", "tt8108202", "tt7838252"],  # Gangs of Wasseypur, Andhadhun, Sacred Games, Mirzapur, Article 15
+        "Romance": ["tt1039928", "tt0367110", "tt0871510", "tt1954470", "tt0367495"]  # YJHD, Kal Ho Naa Ho, Jab We Met, Queen, DDLJ
+    },
+    'ta': {  # Tamil
+        "Action": ["tt9179430", "tt15097216", "tt9900782", "tt7019842", "tt8178634"],  # Vikram, Leo, Jailer, Pathaan, RRR
+        "Drama": ["tt10189514", "tt8108274", "tt1821480", "tt5074352", "tt0169102"],  # Jai Bhim, Soorarai Pottru, Andhadhun, Dangal, Lagaan
+        "Comedy": ["tt1187043", "tt1620933", "tt1821480", "tt1954470", "tt2283748"]
+    },
+    'te': {  # Telugu
+        "Action": ["tt8178634", "tt4849438", "tt12844910", "tt7019842", "tt13751694"],  # RRR, Baahubali, Pushpa, Pathaan, KGF2
+        "Drama": ["tt8178634", "tt4849438", "tt5074352", "tt0169102", "tt1187043"],
+        "Comedy": ["tt1187043", "tt1620933", "tt1821480", "tt1954470", "tt2283748"]
+    },
+    'kn': {  # Kannada
+        "Action": ["tt13751694", "tt12844910", "tt8178634", "tt7019842", "tt15354916"],  # KGF series, RRR, Pathaan, Jawan
+        "Drama": ["tt13751694", "tt5074352", "tt0169102", "tt1187043", "tt2338151"]
+    },
+    'en': {  # English/Hollywood
+        "Action": ["tt0468569", "tt1375666", "tt0816692", "tt4154796", "tt10872600"],  # Dark Knight, Inception, Interstellar, Avengers, Spider-Man
+        "Drama": ["tt0111161", "tt0068646", "tt0110912", "tt0137523", "tt0109830"],  # Shawshank, Godfather, Pulp Fiction, Fight Club, Forrest Gump
+        "Sci-Fi": ["tt0133093", "tt1375666", "tt0816692", "tt0167260", "tt0468569"],  # Matrix, Inception, Interstellar, LOTR, Dark Knight
+        "Comedy": ["tt0332280", "tt0113243", "tt0081505", "tt1201607", "tt0110413"],  # Notebook, Braveheart, Raiders, Harry Potter, Leon
+        "Crime": ["tt0068646", "tt0110912", "tt0468569", "tt0102926", "tt0114709"],  # Godfather, Pulp Fiction, Dark Knight, Silence, Se7en
+        "Animation": ["tt6718170", "tt1323594", "tt0435625", "tt3104988", "tt0462499"]  # Spider-Verse, Toy Story, Ratatouille, Coco, Up
+    }
+}
+
+# Precomputed by the background warmer (see start_warmer)
+trending_snapshot: Optional[List[MovieSearchResult]] = None
+curated_results: Dict[str, MovieSearchResult] = {}
+
+def curated_result(data: Dict[str, Any]) -> MovieSearchResult:
+    """Build the MovieSearchResult used by the OMDb recommendation fallback"""
+    return MovieSearchResult(
+        id=data['imdbID'],
+        title=data.get('Title', ''),
+        release_date=data.get('Year'),
+        poster_path=data.get('Poster') if data.get('Poster') != 'N/A' else None,
+        vote_average=float(data['imdbRating']) if data.get('imdbRating') != 'N/A' else None,
+        overview=data.get('Plot') if data.get('Plot') != 'N/A' else ""
+    )
+
+async def build_trending() -> List[MovieSearchResult]:
+    """Fetch the trending titles from OMDb concurrently (failures are skipped)"""
+    fetched = await omdb_fetch_many(TRENDING_IDS)
+
+    results = []
+    for data in fetched.values():
+        # Parse rating
+        vote_average = None
+        if data.get('imdbRating') and data.get('imdbRating') != 'N/A':
+            try:
+                vote_average = float(data['imdbRating'])
+            except:
+                pass
+        
+        results.append(MovieSearchResult(
+            id=data['imdbID'],
+            title=data.get('Title', ''),
+            release_date=data.get('Year'),
+            poster_path=data.get('Poster') if data.get('Poster') != 'N/A' else None,
+            vote_average=vote_average,
+            overview=data.get('Plot') if data.get('Plot') != 'N/A' else None
+        ))
+    
+    return results
+
+async def refresh_omdb_titles(imdb_ids: List[str], refresh_ahead: float):
+    """Re-fetch titles that are missing or expire within refresh_ahead seconds"""
+    now = time.time()
+    semaphore = asyncio.Semaphore(WARMER_CONCURRENCY)
+
+    async def refresh(imdb_id: str):
+        params = {"i": imdb_id, "apikey": OMDB_API_KEY}
+        cache_key = omdb_cache_key(params)
+        entry = cache.peek(cache_key)
+        if entry is not None and entry.expires_at - now > refresh_ahead:
+            return
+        async with semaphore:
+            # Small random spacing so a refresh never bursts upstream
+            await asyncio.sleep(random.uniform(0, 0.25))
+            try:
+                await inflight.do(cache_key, lambda: fetch_shared(
+                    "omdb_detail", cache_key, lambda: _omdb_fetch(params, cache_key, "omdb_detail")))
+            except HTTPException as e:
+                logger.warning("Warmer could not refresh %s: %s", imdb_id, e.detail)
+
+    await asyncio.gather(*[refresh(imdb_id) for imdb_id in dict.fromkeys(imdb_ids)])
+
+async def lead_job(name: str, interval: float) -> bool:
+    """Whether this worker should do a job's upstream refresh this round (one worker per interval)"""
+    return await store_call(store.try_lease, f"job:{name}", str(os.getpid()), interval / 2)
+
+async def purge_store():
+    """Delete responses past their stale window, and expired leases"""
+    if await lead_job("purge", STORE_PURGE_INTERVAL):
+        purged = await store_call(store.purge_expired, time.time() - cache.stale_ttl)
+        logger.info("Purged %d expired responses from the metadata store", purged)
+
+async def warm_trending():
+    global trending_snapshot
+    if not OMDB_API_KEY:
+        return
+    # Other workers skip the refresh and build their snapshot from what the leader stored
+    if await lead_job("trending", WARM_TRENDING_INTERVAL):
+        await refresh_omdb_titles(TRENDING_IDS, refresh_ahead=WARM_TRENDING_INTERVAL * 2)
+    results = await build_trending()
+    if not results:
+        # OMDb is unreachable: keep serving the previous snapshot rather than an empty list
+        logger.warning("Trending refresh found no titles; keeping the previous snapshot")
+        return
+    trending_snapshot = results
+
+async def warm_curated():
+    global curated_results
+    if not OMDB_API_KEY:
+        return
+    pool_ids = [imdb_id for pool in LANGUAGE_POOLS.values() for ids in pool.values() for imdb_id in ids]
+    if await lead_job("curated", WARM_CURATED_INTERVAL):
+        await refresh_omdb_titles(pool_ids, refresh_ahead=WARM_CURATED_INTERVAL * 2)
+    fetched = await omdb_fetch_many(pool_ids, limit=WARMER_CONCURRENCY)
+    results = {}
+    for imdb_id, data in fetched.items():
+        try:
+            results[imdb_id] = curated_result(data)
+        except (KeyError, ValueError):
+            continue
+    curated_results = results
+
 # API Routes
 @api_router.get("/")
 async def root():
     return {"message": "CineGraph API - Movie Recommendation Platform (Hybrid Backend)"}
 
+async def tmdb_imdb_id(tmdb_id: int) -> Optional[str]:
+    """IMDb ID for a TMDB movie (local index first, then /external_ids)"""
+    imdb_id = await asyncio.to_thread(id_index.imdb_id, tmdb_id)
+    if imdb_id is None:
+        ids_data = await tmdb_request(f"/movie/{tmdb_id}/external_ids")
+        imdb_id = ids_data.get('imdb_id') if ids_data else None
+    return imdb_id
+
+def tmdb_result(imdb_id: str, movie: Dict[str, Any]) -> MovieSearchResult:
+    """MovieSearchResult for a TMDB list item (recommendations, search)"""
+    return MovieSearchResult(
+        id=imdb_id,
+        title=movie.get('title', ''),
+        release_date=movie.get('release_date', '')[:4] if movie.get('release_date') else None,
+        poster_path=f"https://image.tmdb.org/t/p/w500{movie['poster_path']}" if movie.get('poster_path') else None,
+        vote_average=movie.get('vote_average'),
+        overview=movie.get('overview') or ""
+    )
+
+def omdb_search_result(movie: Dict[str, Any]) -> MovieSearchResult:
+    """MovieSearchResult for an item of an OMDb ?s= response"""
+    return MovieSearchResult(
+        id=movie['imdbID'],
+        title=movie.get('Title', ''),
+        release_date=movie.get('Year'),
+        poster_path=movie.get('Poster') if movie.get('Poster') != 'N/A' else None,
+        vote_average=None,
+        overview=None
+    )
+
+def search_doc_result(doc: Dict[str, Any]) -> MovieSearchResult:
+    return MovieSearchResult(
+        id=doc['imdb_id'],
+        title=doc['title'],
+        release_date=str(doc['year']) if doc.get('year') else None,
+        poster_path=doc.get('poster'),
+        vote_average=None,
+        overview=None
+    )
+
 @api_router.get("/search", response_model=List[MovieSearchResult])
-async def search_movies(query: str = Query(..., min_length=1)):
-    """Search for movies by title"""
+async def search_movies(request: Request, query: str = Query(..., min_length=1), cursor: Optional[str] = None):
+    """
+    Search for movies by title (local index first, OMDb on a miss).
+    When more results exist the X-Next-Cursor header holds a cursor for the next page.
+    """
+    if cursor is None:
+        results, more = await search_results(query)
+        next_cursor = None
+        if more:
+            # Page 2 must be built against exactly what this page showed, so keep its state now
+            state = SearchCursor(query, results)
+            remember_search_cursor(state)
+            prefetch_next_search_page(state, 1)
+            next_cursor = encode_search_cursor(query, 2, state.id)
+    else:
+        cursor_query, page, state_id = decode_search_cursor(cursor)
+        if cursor_query != query:
+            raise HTTPException(status_code=400, detail="Cursor belongs to a different query")
+        results, next_cursor = await search_page(query, page, state_id)
+
+    response = Rendered(results).response(request)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
+
+def encode_search_cursor(query: str, page: int, state_id: Optional[str]) -> str:
+    raw = json.dumps({"q": query, "p": page, "s": state_id}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_search_cursor(cursor: str):
+    """(query, page, state ID) from a cursor; 400 if it is malformed"""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        query, page, state_id = data["q"], int(data["p"]), data.get("s")
+    except (ValueError, TypeError, KeyError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(query, str) or not 2 <= page <= SEARCH_MAX_PAGES:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return query, page, state_id
+
+class SearchCursor:
+    """Server-side paging state for one query: built pages plus the position in each provider's results"""
+
+    __slots__ = ("id", "query", "pages", "buffer", "seen", "omdb_page", "omdb_done",
+                 "tmdb_page", "tmdb_done", "lock", "prefetch")
+
+    def __init__(self, query: str, first_page: List[MovieSearchResult]):
+        self.id = secrets.token_urlsafe(9)
+        self.query = query
+        self.pages = [first_page]
+        self.buffer: List[MovieSearchResult] = []
+        self.seen = {movie.id for movie in first_page}
+        self.omdb_page = 1
+        self.omdb_done = False
+        self.tmdb_page = 1
+        self.tmdb_done = not TMDB_API_KEY
+        self.lock = asyncio.Lock()
+        self.prefetch: Optional[asyncio.Task] = None
+
+    @property
+    def exhausted(self) -> bool:
+        return self.omdb_done and self.tmdb_done and not self.buffer
+
+    def add(self, results: List[MovieSearchResult]):
+        """Queue results not already on an earlier page (IMDb ID is the identity across providers)"""
+        for movie in results:
+            if movie.id not in self.seen:
+                self.seen.add(movie.id)
+                self.buffer.append(movie)
+
+async def search_page(query: str, page: int, state_id: Optional[str]):
+    """Results for page `page` (2..SEARCH_MAX_PAGES) and the cursor for the page after it"""
+    cached = cache.lookup("search_cursor", f"cursor_{state_id}") if state_id else None
+    state = cached[0] if cached is not None else None
+    if state is None or state.query != query:
+        # New, expired or other-worker cursor: rebuild from page 1 (upstream pages are cached)
+        first_page, _ = await search_results(query)
+        state = SearchCursor(query, first_page)
+
+    async with state.lock:
+        while len(state.pages) < page and not state.exhausted:
+            await build_search_page(state)
+    remember_search_cursor(state)
+
+    results = state.pages[page - 1] if page <= len(state.pages) else []
+    more = page < SEARCH_MAX_PAGES and (page < len(state.pages) or not state.exhausted)
+    if not more:
+        return results, None
+    prefetch_next_search_page(state, page)
+    return results, encode_search_cursor(query, page + 1, state.id)
+
+def remember_search_cursor(state: SearchCursor):
+    cache.set("search_cursor", f"cursor_{state.id}", state, ttl=SEARCH_CURSOR_TTL, stale_ttl=0,
+              size=512 * (len(state.seen) + 1))
+
+def prefetch_next_search_page(state: SearchCursor, page: int):
+    """Build the page after `page` while the client is still showing this one"""
+    if len(state.pages) <= page and (state.prefetch is None or state.prefetch.done()):
+        state.prefetch = asyncio.create_task(prefetch_search_page(state, page + 1))
+
+async def prefetch_search_page(state: SearchCursor, page: int):
+    try:
+        async with state.lock:
+            while len(state.pages) < page and not state.exhausted:
+                await build_search_page(state)
+    except Exception as e:
+        logger.warning("Search prefetch for %r page %d failed: %s", state.query, page, e)
+
+async def build_search_page(state: SearchCursor):
+    """Walk OMDb pages, then TMDB search pages, until a full page of unseen titles is queued"""
+    while len(state.buffer) < SEARCH_PAGE_SIZE and not (state.omdb_done and state.tmdb_done):
+        if not state.omdb_done:
+            await fetch_omdb_search_page(state)
+        else:
+            await fetch_tmdb_search_page(state)
+    if state.buffer:
+        state.pages.append(state.buffer[:SEARCH_PAGE_SIZE])
+        del state.buffer[:SEARCH_PAGE_SIZE]
+
+async def fetch_omdb_search_page(state: SearchCursor):
+    params = {"s": state.query, "type": "movie"}
+    if state.omdb_page > 1:
+        params["page"] = state.omdb_page
+    try:
+        data = await omdb_request(params)
+    except HTTPException as e:
+        logger.warning("OMDb search page %d for %r failed: %s", state.omdb_page, state.query, e.detail)
+        state.omdb_done = True
+        return
+    items = data.get('Search') or []
+    try:
+        total = int(data.get('totalResults') or 0)
+    except ValueError:
+        total = 0
+    # OMDb pages hold 10 results and stop at page 100
+    state.omdb_done = not items or state.omdb_page * 10 >= total or state.omdb_page >= 100
+    state.omdb_page += 1
+    state.add([omdb_search_result(movie) for movie in items if movie.get('imdbID')])
+
+async def fetch_tmdb_search_page(state: SearchCursor):
+    data = await tmdb_request("/search/movie", {"query": state.query, "page": state.tmdb_page})
+    items = (data.get('results') or []) if data else []
+    state.tmdb_done = not items or state.tmdb_page >= (data.get('total_pages') or 0)
+    state.tmdb_page += 1
+    imdb_ids = await asyncio.gather(*[tmdb_imdb_id(movie['id']) for movie in items])
+    state.add([tmdb_result(imdb_id, movie) for imdb_id, movie in zip(imdb_ids, items) if imdb_id])
+
+async def search_results(query: str) -> Tuple[List[MovieSearchResult], bool]:
+    """The first page of results, and whether later pages may have more"""
+    local = search_index.search(query, limit=10)
+    if len(local) >= SEARCH_INDEX_MIN_RESULTS:
+        # The local index only knows titles seen so far; the providers may have many more
+        return [search_doc_result(doc) for doc in local], True
+
     data = await omdb_request({"s": query, "type": "movie"})
     
     results = data.get('Search', [])
     
-    return [
-        MovieSearchResult(
-            id=movie['imdbID'],
-            title=movie.get('Title', ''),
-            release_date=movie.get('Year'),
-            poster_path=movie.get('Poster') if movie.get('Poster') != 'N/A' else None,
-            vote_average=None,
-            overview=None
-        )
-        for movie in results
-    ]
+    upstream = [omdb_search_result(movie) for movie in results]
+    # Top up with local partial-word/typo matches OMDb's whole-word search misses
+    seen = {movie.id for movie in upstream}
+    extra = [search_doc_result(doc) for doc in local if doc['imdb_id'] not in seen]
+    try:
+        total = int(data.get('totalResults') or 0)
+    except ValueError:
+        total = 0
+    page = (upstream + extra)[:max(10, len(upstream))]
+    return page, total > len(results) or len(page) >= SEARCH_PAGE_SIZE
 
-@api_router.get("/movie/{movie_id}", response_model=MovieDetail)
-async def get_movie_detail(movie_id: str):
-    """Get detailed information about a specific movie"""
-    data = await omdb_request({"i": movie_id, "plot": "full"})
-    
-    if data.get('Response') == 'False':
-        raise HTTPException(status_code=404, detail="Movie not found")
-    
+def parse_movie_detail(data: Dict[str, Any]) -> MovieDetail:
+    """Build a MovieDetail from an OMDb ?i= payload"""
     # Parse runtime "148 min" -> 148
     runtime = None
     if data.get('Runtime') and data.get('Runtime') != 'N/A':
@@ -202,33 +1050,158 @@ async def get_movie_detail(movie_id: str):
         tagline=data.get('Awards')
     )
 
+def rendered_movie_detail(movie_id: str, data: Dict[str, Any]) -> Rendered:
+    """MovieDetail for an OMDb payload, parsed and encoded once per cached payload"""
+    return render_cached("movie", movie_id, data, lambda: parse_movie_detail(data))
+
+@api_router.get("/movie/{movie_id}", response_model=MovieDetail)
+async def get_movie_detail(request: Request, movie_id: str):
+    """Get detailed information about a specific movie"""
+    data = await omdb_request({"i": movie_id, "plot": "full"})
+    
+    if data.get('Response') == 'False':
+        raise HTTPException(status_code=404, detail="Movie not found")
+    
+    return rendered_movie_detail(movie_id, data).response(request)
+
+async def resolve_movie_batch(movie_ids: List[str]) -> List[MovieBatchItem]:
+    """Resolve cached titles in one pass, then fetch the misses concurrently under a limit"""
+    unique_ids = list(dict.fromkeys(movie_ids))
+    resolved: Dict[str, MovieBatchItem] = {}
+
+    async def resolve(movie_id: str) -> MovieBatchItem:
+        if not IMDB_ID_RE.match(movie_id):
+            return MovieBatchItem(id=movie_id, error="Invalid IMDb ID")
+        try:
+            data = await omdb_request({"i": movie_id, "plot": "full"})
+        except HTTPException as e:
+            return MovieBatchItem(id=movie_id, error=str(e.detail))
+        if data.get('Response') == 'False':
+            return MovieBatchItem(id=movie_id, error="Movie not found")
+        return MovieBatchItem(id=movie_id, movie=rendered_movie_detail(movie_id, data).model)
+
+    misses = []
+    for movie_id in unique_ids:
+        if not IMDB_ID_RE.match(movie_id) or cache.peek(omdb_cache_key({"i": movie_id, "plot": "full"})) is not None:
+            resolved[movie_id] = await resolve(movie_id)  # no upstream I/O
+        else:
+            misses.append(movie_id)
+
+    semaphore = asyncio.Semaphore(OMDB_FETCH_CONCURRENCY)
+
+    async def resolve_limited(movie_id: str) -> MovieBatchItem:
+        async with semaphore:
+            return await resolve(movie_id)
+
+    for item in await asyncio.gather(*[resolve_limited(movie_id) for movie_id in misses]):
+        resolved[item.id] = item
+
+    return [resolved[movie_id] for movie_id in movie_ids]
+
+@api_router.post("/movies/batch", response_model=List[MovieBatchItem])
+async def get_movies_batch(request: Request, batch: MovieBatchRequest):
+    """Get details for several movies at once, in request order with per-item errors"""
+    if len(batch.ids) > BATCH_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_IDS} IDs per batch")
+    return Rendered(await resolve_movie_batch(batch.ids)).response(request)
+
+@api_router.get("/movies", response_model=List[MovieBatchItem])
+async def get_movies(request: Request, ids: str = Query(..., min_length=1)):
+    """GET variant of /movies/batch taking comma-separated IMDb IDs"""
+    movie_ids = [movie_id.strip() for movie_id in ids.split(',') if movie_id.strip()]
+    if len(movie_ids) > BATCH_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_IDS} IDs per batch")
+    return Rendered(await resolve_movie_batch(movie_ids)).response(request)
+
 @api_router.get("/movie/{movie_id}/recommendations", response_model=List[MovieSearchResult])
-async def get_recommendations(movie_id: str):
+async def get_recommendations(request: Request, movie_id: str):
     """
     Get dynamic movie recommendations using TMDB (preferred) or OMDb genre fallback.
     """
+    return Rendered(await recommend(movie_id)).response(request)
+
+@api_router.get("/movie/{movie_id}/recommendations/stream")
+async def stream_recommendations(movie_id: str, deadline: Optional[float] = Query(None, gt=0, le=RECS_STREAM_MAX_DEADLINE)):
+    """
+    Server-Sent Events variant of /recommendations: one `recommendation` event per
+    result as soon as it resolves (with its `rank` in the full list), then a `done`
+    event. After `deadline` seconds the stream ends with whatever has arrived.
+    """
+    return StreamingResponse(
+        recommendation_events(movie_id, deadline or RECS_STREAM_DEADLINE),
+        media_type="text/event-stream",
+        # No caching, and no proxy buffering that would hold events back
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+async def recommendation_events(movie_id: str, deadline: float):
+    loop = asyncio.get_running_loop()
+    ends_at = loop.time() + deadline
+    results = iter_recommendations(movie_id)
+    sent = 0
+    complete = False
     try:
-        logger.info(f"Fetching recommendations for movie_id: {movie_id}")
+        while True:
+            remaining = ends_at - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                rank, result = await asyncio.wait_for(results.__anext__(), remaining)
+            except StopAsyncIteration:
+                complete = True
+                break
+            except asyncio.TimeoutError:
+                logger.info("Recommendation stream for %s hit its %.1fs deadline after %d results", movie_id, deadline, sent)
+                break
+            sent += 1
+            yield sse_event("recommendation", {**jsonable(result), "rank": rank})
+    finally:
+        await results.aclose()
+    yield sse_event("done", {"count": sent, "complete": complete})
+
+async def recommend(movie_id: str) -> List[MovieSearchResult]:
+    """Local index first, then TMDB, then the curated OMDb pools"""
+    ranked = [item async for item in iter_recommendations(movie_id)]
+    return [result for _, result in sorted(ranked, key=lambda item: item[0])]
+
+async def iter_recommendations(movie_id: str):
+    """Yield (rank, MovieSearchResult) as each recommendation resolves; see recommend()"""
+    try:
+        logger.info("Fetching recommendations for movie_id: %s", movie_id)
         
+        # 0. 🧭 Local similarity index (no upstream call at all), once it holds a real catalog
+        local_results = await local_recommendations(movie_id) if local_index_first() else []
+        if local_results:
+            logger.info("Returning %d recommendations from the local index", len(local_results))
+            for rank, result in enumerate(local_results):
+                yield rank, result
+            return
+
         # 1. 🌟 Strategy A: Try TMDB Recommendations first (Language-Aware)
         if TMDB_API_KEY:
             logger.info("Attempting TMDB recommendation strategy")
-            # Map IMDb ID -> TMDB ID
-            find_data = await tmdb_request(f"/find/{movie_id}", {"external_source": "imdb_id"})
-            if find_data and find_data.get('movie_results'):
-                tmdb_movie = find_data['movie_results'][0]
-                tmdb_id = tmdb_movie['id']
-                logger.info(f"Found TMDB movie ID: {tmdb_id} for {movie_id}")
+            # Map IMDb ID -> TMDB ID (local index first, then TMDB /find)
+            tmdb_id = await asyncio.to_thread(id_index.tmdb_id, movie_id)
+            if tmdb_id is None:
+                find_data = await tmdb_request(f"/find/{movie_id}", {"external_source": "imdb_id"})
+                if find_data and find_data.get('movie_results'):
+                    tmdb_movie = find_data['movie_results'][0]
+                    tmdb_id = tmdb_movie['id']
+                    id_index.add(tmdb_id, movie_id, tmdb_movie.get('original_language'))
+            if tmdb_id is not None:
+                logger.info("Found TMDB movie ID: %s for %s", tmdb_id, movie_id)
                 
-                # Get full movie details to extract language
-                movie_details = await tmdb_request(f"/movie/{tmdb_id}")
-                source_language = movie_details.get('original_language', 'en') if movie_details else 'en'
-                logger.info(f"Source movie language: {source_language}")
+                # Get full movie details to extract language (unless the index already knows it)
+                source_language = id_index.language(tmdb_id)
+                if source_language is None:
+                    movie_details = await tmdb_request(f"/movie/{tmdb_id}")
+                    source_language = movie_details.get('original_language', 'en') if movie_details else 'en'
+                logger.info("Source movie language: %s", source_language)
                 
                 # Fetch recommendations from TMDB
                 rec_data = await tmdb_request(f"/movie/{tmdb_id}/recommendations")
                 if rec_data and rec_data.get('results'):
-                    logger.info(f"Found {len(rec_data['results'])} recommendations from TMDB")
+                    logger.info("Found %d recommendations from TMDB", len(rec_data['results']))
                     
                     # Filter by language first
                     language_filtered = [
@@ -236,48 +1209,58 @@ async def get_recommendations(movie_id: str):
                         if m.get('original_language') == source_language
                     ]
                     
-                    logger.info(f"After language filter: {len(language_filtered)} movies match {source_language}")
+                    logger.info("After language filter: %d movies match %s", len(language_filtered), source_language)
                     
                     # If we have enough language-matched recommendations, use them
                     movies_to_process = language_filtered[:10] if len(language_filtered) >= 5 else rec_data['results'][:10]
                     
                     # Optimization: Fetch all external IDs in parallel
                     async def fetch_movie_with_imdb(movie):
-                        ids_data = await tmdb_request(f"/movie/{movie['id']}/external_ids")
-                        imdb_id = ids_data.get('imdb_id') if ids_data else None
+                        imdb_id = await tmdb_imdb_id(movie['id'])
                         if imdb_id and imdb_id != movie_id:
-                            return MovieSearchResult(
-                                id=imdb_id,
-                                title=movie.get('title', ''),
-                                release_date=movie.get('release_date', '')[:4] if movie.get('release_date') else None,
-                                poster_path=f"https://image.tmdb.org/t/p/w500{movie['poster_path']}" if movie.get('poster_path') else None,
-                                vote_average=movie.get('vote_average'),
-                                overview=movie.get('overview') or ""
-                            )
+                            return tmdb_result(imdb_id, movie)
                         return None
 
-                    # Use gather for concurrency
-                    tasks = [fetch_movie_with_imdb(m) for m in movies_to_process]
-                    results_list = await asyncio.gather(*tasks)
-                    
-                    # Filter out None values
-                    results = [r for r in results_list if r]
-                    
-                    if results:
-                        logger.info(f"Successfully returning {len(results)} TMDB recommendations")
-                        return results
+                    async def ranked(rank, movie):
+                        return rank, await fetch_movie_with_imdb(movie)
+
+                    # Run concurrently and hand each result on as soon as it resolves
+                    tasks = [asyncio.ensure_future(ranked(rank, m)) for rank, m in enumerate(movies_to_process)]
+                    found = 0
+                    try:
+                        for next_done in asyncio.as_completed(tasks):
+                            rank, result = await next_done
+                            if result:
+                                found += 1
+                                yield rank, result
+                    finally:
+                        for task in tasks:
+                            task.cancel()
+
+                    if found:
+                        logger.info("Successfully returned %d TMDB recommendations", found)
+                        return
                 else:
-                    logger.warning(f"No recommendations found on TMDB for movie: {tmdb_id}")
+                    logger.warning("No recommendations found on TMDB for movie: %s", tmdb_id)
             else:
-                logger.warning(f"Could not find TMDB mapping for IMDb ID: {movie_id}")
+                logger.warning("Could not find TMDB mapping for IMDb ID: %s", movie_id)
         else:
             logger.warning("TMDB_API_KEY is missing, skipping TMDB strategy")
 
+        # 1b. Small local index: only as a fallback for what TMDB could not answer
+        if not local_index_first():
+            local_results = await local_recommendations(movie_id)
+            if local_results:
+                logger.info("Returning %d recommendations from the local index (fallback)", len(local_results))
+                for rank, result in enumerate(local_results):
+                    yield rank, result
+                return
+
         # 2. ⚡ Strategy B: Language-Aware OMDb Fallback
         logger.info("Falling back to OMDb logic")
         source_data = await omdb_request({"i": movie_id})
         if source_data.get('Response') == 'False':
-            return []
+            return
 
         # Detect language from OMDb data
         source_language = source_data.get('Language', '').lower()
@@ -297,45 +1280,10 @@ async def get_recommendations(movie_id: str):
         elif 'malayalam' in source_language:
             detected_lang = 'ml'
         
-        logger.info(f"Detected language: {detected_lang} from OMDb data")
+        logger.info("Detected language: %s from OMDb data", detected_lang)
         
-        results_map = {} 
-
-        # Language-specific curated pools
-        language_pools = {
-            'hi': {  # Hindi/Bollywood
-                "Action": ["tt8178634", "tt15354916", "tt7019842", "tt13751694", "tt12844910"],  # RRR, Jawan, Pathaan, KGF2, Pushpa
-                "Drama": ["tt1187043", "tt0169102", "tt5074352", "tt2338151", "tt23849204"],  # 3 Idiots, Lagaan, Dangal, PK, 12th Fail
-                "Comedy": ["tt1187043", "tt1620933", "tt1821480", "tt1954470", "tt2283748"],  # 3 Idiots, Munna Bhai, Andhadhun, Queen, Vicky Donor
-                "Crime": ["tt6148156", "tt1821480", "tt10280296", "tt8108202", "tt7838252"],  # Gangs of Wasseypur, Andhadhun, Sacred Games, Mirzapur, Article 15
-                "Romance": ["tt1039928", "tt0367110", "tt0871510", "tt1954470", "tt0367495"]  # YJHD, Kal Ho Naa Ho, Jab We Met, Queen, DDLJ
-            },
-            'ta': {  # Tamil
-                "Action": ["tt9179430", "tt15097216", "tt9900782", "tt7019842", "tt8178634"],  # Vikram, Leo, Jailer, Pathaan, RRR
-                "Drama": ["tt10189514", "tt8108274", "tt1821480", "tt5074352", "tt0169102"],  # Jai Bhim, Soorarai Pottru, Andhadhun, Dangal, Lagaan
-                "Comedy": ["tt1187043", "tt1620933", "tt1821480", "tt1954470", "tt2283748"]
-            },
-            'te': {  # Telugu
-                "Action": ["tt8178634", "tt4849438", "tt12844910", "tt7019842", "tt13751694"],  # RRR, Baahubali, Pushpa, Pathaan, KGF2
-                "Drama": ["tt8178634", "tt4849438", "tt5074352", "tt0169102", "tt1187043"],
-                "Comedy": ["tt1187043", "tt1620933", "tt1821480", "tt1954470", "tt2283748"]
-            },
-            'kn': {  # Kannada
-                "Action": ["tt13751694", "tt12844910", "tt8178634", "tt7019842", "tt15354916"],  # KGF series, RRR, Pathaan, Jawan
-                "Drama": ["tt13751694", "tt5074352", "tt0169102", "tt1187043", "tt2338151"]
-            },
-            'en': {  # English/Hollywood
-                "Action": ["tt0468569", "tt1375666", "tt0816692", "tt4154796", "tt10872600"],  # Dark Knight, Inception, Interstellar, Avengers, Spider-Man
-                "Drama": ["tt0111161", "tt0068646", "tt0110912", "tt0137523", "tt0109830"],  # Shawshank, Godfather, Pulp Fiction, Fight Club, Forrest Gump
-                "Sci-Fi": ["tt0133093", "tt1375666", "tt0816692", "tt0167260", "tt0468569"],  # Matrix, Inception, Interstellar, LOTR, Dark Knight
-                "Comedy": ["tt0332280", "tt0113243", "tt0081505", "tt1201607", "tt0110413"],  # Notebook, Braveheart, Raiders, Harry Potter, Leon
-                "Crime": ["tt0068646", "tt0110912", "tt0468569", "tt0102926", "tt0114709"],  # Godfather, Pulp Fiction, Dark Knight, Silence, Se7en
-                "Animation": ["tt6718170", "tt1323594", "tt0435625", "tt3104988", "tt0462499"]  # Spider-Verse, Toy Story, Ratatouille, Coco, Up
-            }
-        }
-
         # Get language-specific pool
-        lang_pool = language_pools.get(detected_lang, language_pools['en'])
+        lang_pool = LANGUAGE_POOLS.get(detected_lang, LANGUAGE_POOLS['en'])
         
         fallback_ids = []
         for genre in source_genres:
@@ -348,34 +1296,32 @@ async def get_recommendations(movie_id: str):
                 fallback_ids.extend(genre_list)
         
         # Shuffle IDs to make it feel dynamic
-        import random
         random.shuffle(fallback_ids)
 
         if not fallback_ids:
             fallback_ids = ["tt0468569", "tt15398776", "tt0111161"]
 
-        for imdb_id in list(set(fallback_ids)):
-            if imdb_id != movie_id and imdb_id not in results_map:
+        candidate_ids = list(dict.fromkeys(imdb_id for imdb_id in fallback_ids if imdb_id != movie_id))
+        precomputed = [curated_results[imdb_id] for imdb_id in candidate_ids if imdb_id in curated_results]
+        found = 0
+        if len(precomputed) >= min(10, len(candidate_ids)):
+            # The warmer already holds every result we need
+            for rank, result in enumerate(precomputed[:10]):
+                found += 1
+                yield rank, result
+        else:
+            ranks = {imdb_id: rank for rank, imdb_id in enumerate(candidate_ids)}
+            async for imdb_id, data in omdb_iter_many(candidate_ids, want=10):
                 try:
-                    data = await omdb_request({"i": imdb_id})
-                    if data.get('Response') != 'False':
-                        results_map[imdb_id] = MovieSearchResult(
-                            id=data['imdbID'],
-                            title=data.get('Title', ''),
-                            release_date=data.get('Year'),
-                            poster_path=data.get('Poster') if data.get('Poster') != 'N/A' else None,
-                            vote_average=float(data['imdbRating']) if data.get('imdbRating') != 'N/A' else None,
-                            overview=data.get('Plot') if data.get('Plot') != 'N/A' else ""
-                        )
+                    result = curated_result(data)
                 except: continue
-                if len(results_map) >= 10: break
+                found += 1
+                yield ranks[imdb_id], result
 
-        logger.info(f"Returning {len(results_map)} {detected_lang} language-based recommendations from OMDb")
-        return list(results_map.values())
+        logger.info("Returned %d %s language-based recommendations from OMDb", found, detected_lang)
         
     except Exception as e:
-        logger.error(f"Failed to fetch recommendations: {e}")
-        return []
+        logger.error("Failed to fetch recommendations: %s", e)
 
 @api_router.get("/movie/{movie_id}/streaming", response_model=StreamingAvailability)
 async def get_streaming_availability(movie_id: str, country: str = "US"):
@@ -392,104 +1338,37 @@ async def get_streaming_availability(movie_id: str, country: str = "US"):
     )
 
 @api_router.get("/trending", response_model=List[MovieSearchResult])
-async def get_trending():
+async def get_trending(request: Request):
     """
     Get trending movies.
     NOTE: OMDb does not support trending. Fetching actual data from OMDb API for popular movies.
     """
-    # List of popular movie IMDb IDs (Global + Indian)
-    movie_ids = [
-        "tt15354916",  # Jawan
-        "tt12844910",  # Pathaan
-        "tt13751694",  # Animal
-        "tt23849204",  # 12th Fail
-        "tt15398776",  # Oppenheimer
-        "tt1517268",   # Barbie
-        "tt15239678",  # Dune: Part Two
-    ]
-    
-    # Fetch each movie from OMDb API
-    results = []
-    for imdb_id in movie_ids:
-        try:
-            data = await omdb_request({"i": imdb_id})
-            
-            if data.get('Response') != 'False':
-                # Parse rating
-                vote_average = None
-                if data.get('imdbRating') and data.get('imdbRating') != 'N/A':
-                    try:
-                        vote_average = float(data['imdbRating'])
-                    except:
-                        pass
-                
-                results.append(MovieSearchResult(
-                    id=data['imdbID'],
-                    title=data.get('Title', ''),
-                    release_date=data.get('Year'),
-                    poster_path=data.get('Poster') if data.get('Poster') != 'N/A' else None,
-                    vote_average=vote_average,
-                    overview=data.get('Plot') if data.get('Plot') != 'N/A' else None
-                ))
-        except Exception as e:
-            # Skip movies that fail to load
-            logger.error(f"Failed to fetch movie {imdb_id}: {e}")
-            continue
-    
-    return results
+    # Served from the warmer's precomputed (and pre-encoded) snapshot when available
+    if trending_snapshot:
+        snapshot = trending_snapshot
+        return render_cached("trending", "snapshot", snapshot, lambda: snapshot).response(request)
+    return Rendered(await build_trending()).response(request)
 
 @api_router.get("/geolocation", response_model=GeolocationResponse)
-async def get_geolocation():
-    """Detect user's country via IP geolocation"""
-    try:
-        # Using a free IP geolocation service
-        response = await http_client.get("https://ipapi.co/json/")
-        data = response.json()
-        return GeolocationResponse(
-            country_code=data.get('country_code', 'US'),
-            country_name=data.get('country_name', 'United States')
-        )
-    except Exception:
-        # Default to US if geolocation fails
-        return GeolocationResponse(
-            country_code='US',
-            country_name='United States'
-        )
+async def get_geolocation(request: Request, response: Response):
+    """Detect user's country from their IP via the local GeoIP database"""
+    # The answer depends on the caller's address, so only their browser may reuse it
+    response.headers["Cache-Control"] = "private, max-age=3600"
+    ip = client_ip(request.headers, request.client.host if request.client else None)
+    country = geoip.lookup(ip) if ip else None
+    if country is None:
+        # Default to US for private/unknown addresses or without a database
+        return GeolocationResponse(country_code='US', country_name='United States')
+    return GeolocationResponse(country_code=country[0], country_name=country[1])
 
 @api_router.get("/proxy-image")
-async def proxy_image(url: str):
+async def proxy_image(request: Request, url: str, w: Optional[int] = None):
     """
     Proxy image requests to bypass CORS restrictions.
     This allows images from Amazon/IMDb to load properly.
+    Streams through a disk cache; `w` (185 or 500) selects a resized variant.
     """
-    from fastapi.responses import Response
-    
-    if not url:
-        raise HTTPException(status_code=400, detail="URL parameter is required")
-    
-    try:
-        # Fetch the image from the original URL
-        response = await http_client.get(
-            url,
-            headers={
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
-                "Referer": "https://www.imdb.com/"
-            },
-            timeout=10.0
-        )
-        response.raise_for_status()
-        
-        # Return the image with proper CORS headers
-        return Response(
-            content=response.content,
-            media_type=response.headers.get("content-type", "image/jpeg"),
-            headers={
-                "Cache-Control": "public, max-age=86400",  # Cache for 24 hours
-                "Access-Control-Allow-Origin": "*"
-            }
-        )
-    except Exception as e:
-        raise HTTPException(status_code=404, detail=f"Failed to fetch image: {str(e)}")
+    return await image_proxy.serve(url, width=w, if_none_match=request.headers.get("if-none-match"))
 
 @api_router.get("/api-info")
 async def get_api_info():
@@ -504,6 +1383,50 @@ async def get_api_info():
         "note": "Recommendations and Streaming data are limited/mocked in this version."
     }
 
+@api_router.get("/health")
+async def health():
+    """Liveness: the worker process is up and serving"""
+    return {"status": "ok", "pid": os.getpid()}
+
+@api_router.get("/ready")
+async def ready():
+    """Readiness: 503 until this worker's prewarm has finished (or timed out)"""
+    body = {
+        "status": "ready" if readiness["ready"] else "warming",
+        "pid": os.getpid(),
+        "prewarm_seconds": readiness["prewarm_seconds"],
+        "prewarm_ok": readiness["prewarm_ok"],
+    }
+    return JSONResponse(body, status_code=200 if readiness["ready"] else 503)
+
+def require_admin(request: Request):
+    """Admin endpoints exist only when ADMIN_TOKEN is set, and need it as a bearer token"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    supplied = request.headers.get("authorization", "").removeprefix("Bearer ").strip()
+    if not secrets.compare_digest(supplied, ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+@api_router.get("/admin/profiles", include_in_schema=False, dependencies=[Depends(require_admin)])
+async def list_profiles():
+    """Recent request profiles from all workers, newest first"""
+    return await asyncio.to_thread(profile_store.list)
+
+@api_router.get("/admin/profiles/{profile_id}", include_in_schema=False, dependencies=[Depends(require_admin)])
+async def get_profile(profile_id: str, format: str = Query("json", pattern="^(json|collapsed)$")):
+    """One profile: task timeline, top functions and stacks; format=collapsed for flamegraph tools"""
+    report = await asyncio.to_thread(profile_store.get, profile_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "collapsed":
+        return PlainTextResponse(collapsed(report))
+    return report
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus scrape endpoint"""
+    return Response(metrics_registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 # Include the router in the main app
 app.include_router(api_router)
 
@@ -513,8 +1436,20 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Next-Cursor", "X-Profile-Id"],
+)
+
+app.add_middleware(
+    ProfilingMiddleware,
+    profiler=profiler,
+    store=profile_store,
+    token=ADMIN_TOKEN,
+    sample_rate=PROFILE_SAMPLE_RATE,
 )
 
+# Outermost, so latency covers CORS handling and Server-Timing is on every response
+app.add_middleware(TimingMiddleware, latency=REQUEST_LATENCY, in_flight=REQUESTS_IN_FLIGHT)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -522,6 +1457,51 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-@app.on_event("shutdown")
-async def shutdown_client():
-    await http_client.aclose()
+async def startup():
+    open_resources()
+    if ADMIN_TOKEN or PROFILE_SAMPLE_RATE > 0:
+        profiler.install(asyncio.get_running_loop())
+    try:
+        loaded = warm_start_cache()
+        logger.info("Warm-started cache with %d stored responses", loaded)
+        logger.info("Loaded %d IMDb <-> TMDB mappings", id_index.load())
+        logger.info("Recommendation index holds %d titles", load_recommendation_index())
+        logger.info("Search index holds %d titles", search_index.add_many(store.iter_movies()))
+        logger.info("GeoIP database holds %d ranges", load_geoip())
+    except Exception as e:
+        logger.error("Cache warm start failed: %s", e)
+    cache.start_sweeper()
+    # warm_start_cache has just purged, so housekeeping stays out of prewarm and keeps its delay
+    scheduler.add("purge", purge_store, STORE_PURGE_INTERVAL, initial_delay=STORE_PURGE_INTERVAL, prewarm=False)
+    if WARMER_ENABLED:
+        scheduler.add("trending", warm_trending, WARM_TRENDING_INTERVAL)
+        scheduler.add("curated", warm_curated, WARM_CURATED_INTERVAL, initial_delay=30)
+        readiness["task"] = asyncio.create_task(prewarm())
+    else:
+        readiness["ready"] = True
+        scheduler.start()
+
+async def prewarm():
+    """Run every warm job once, then report ready and hand over to the regular schedule"""
+    started = time.perf_counter()
+    try:
+        readiness["prewarm_ok"] = await asyncio.wait_for(scheduler.run_all(), PREWARM_TIMEOUT)
+    except asyncio.TimeoutError:
+        logger.warning("Prewarm did not finish within %.0fs; serving anyway", PREWARM_TIMEOUT)
+        readiness["prewarm_ok"] = False
+    readiness["prewarm_seconds"] = round(time.perf_counter() - started, 3)
+    readiness["ready"] = True
+    logger.info("Worker %d ready after %.2fs prewarm", os.getpid(), readiness["prewarm_seconds"])
+    scheduler.start(skip_first_run=True)
+
+async def shutdown():
+    task = readiness.pop("task", None)
+    if task is not None:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+    await scheduler.stop()
+    await cache.stop_sweeper()
+    # Let a restarted or sibling worker pick the warm jobs up without waiting for the leases to expire
+    for job in ("trending", "curated", "purge"):
+        store_write(store.release_lease, f"job:{job}", str(os.getpid()))
+    await close_resources()
@@ -0,0 +1,429 @@
+"""
+Persistent metadata store shared by every worker on a host.
+
+The in-process ``TTLCache`` is the first tier; this module is the second. It
+keeps raw upstream responses (keyed exactly like the in-memory cache),
+normalized movie records keyed by IMDb ID and TMDB ID, and the IMDb <-> TMDB
+ID mapping, so a restarted or newly spawned worker can warm itself from disk
+instead of from OMDb/TMDB.
+
+Backends implement ``MetadataStore``. ``SQLiteStore`` is the default and
+needs nothing beyond the standard library; WAL mode lets several uvicorn
+workers read and write the same file concurrently. ``NullStore`` disables
+persistence entirely.
+"""
+import json
+import logging
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def _omdb_value(data: Dict[str, Any], field: str) -> Optional[str]:
+    value = data.get(field)
+    if not value or value == 'N/A':
+        return None
+    return value
+
+
+def normalize_omdb_movie(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Turn an OMDb ``?i=`` payload into the store's movie record shape"""
+    runtime = None
+    if _omdb_value(data, 'Runtime'):
+        try:
+            runtime = int(data['Runtime'].split(' ')[0])
+        except ValueError:
+            pass
+
+    rating = None
+    if _omdb_value(data, 'imdbRating'):
+        try:
+            rating = float(data['imdbRating'])
+        except ValueError:
+            pass
+
+    year = None
+    if _omdb_value(data, 'Year'):
+        try:
+            year = int(data['Year'][:4])
+        except ValueError:
+            pass
+
+    def split_list(field: str) -> List[str]:
+        value = _omdb_value(data, field)
+        return [part.strip() for part in value.split(',')] if value else []
+
+    return {
+        "imdb_id": data['imdbID'],
+        "title": data.get('Title', ''),
+        "year": year,
+        "released": _omdb_value(data, 'Released'),
+        "runtime": runtime,
+        "rating": rating,
+        "genres": split_list('Genre'),
+        "languages": split_list('Language'),
+        "countries": split_list('Country'),
+        "plot": _omdb_value(data, 'Plot'),
+        "poster": _omdb_value(data, 'Poster'),
+        "awards": _omdb_value(data, 'Awards'),
+    }
+
+
+def normalize_omdb_search_item(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Turn one entry of an OMDb ``?s=`` result list into a (sparse) movie record"""
+    year = None
+    if _omdb_value(item, 'Year'):
+        try:
+            year = int(item['Year'][:4])
+        except ValueError:
+            pass
+    return {
+        "imdb_id": item['imdbID'],
+        "title": item.get('Title', ''),
+        "year": year,
+        "poster": _omdb_value(item, 'Poster'),
+    }
+
+
+def record_to_omdb(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Rebuild an OMDb-shaped ``?i=`` payload from a stored record (used while OMDb is unreachable)"""
+    def text(value: Any) -> str:
+        return str(value) if value not in (None, "") else 'N/A'
+
+    return {
+        "imdbID": record['imdb_id'],
+        "Title": record.get('title', ''),
+        "Year": text(record.get('year')),
+        "Released": text(record.get('released')),
+        "Runtime": f"{record['runtime']} min" if record.get('runtime') else 'N/A',
+        "imdbRating": text(record.get('rating')),
+        "Genre": ", ".join(record.get('genres') or []) or 'N/A',
+        "Language": ", ".join(record.get('languages') or []) or 'N/A',
+        "Country": ", ".join(record.get('countries') or []) or 'N/A',
+        "Plot": text(record.get('plot')),
+        "Poster": text(record.get('poster')),
+        "Awards": text(record.get('awards')),
+        "Response": "True",
+    }
+
+
+class MetadataStore(ABC):
+    """Interface for persistent cache backends"""
+
+    @abstractmethod
+    def get(self, key: str, min_expires_at: float = 0) -> Optional[Tuple[str, Any, float]]:
+        """Return (namespace, value, expires_at) for a stored response, ignoring rows that expired before min_expires_at"""
+
+    @abstractmethod
+    def set(self, key: str, namespace: str, value: Any, expires_at: float):
+        """Store a raw upstream response"""
+
+    @abstractmethod
+    def iter_recent(self, limit: int, min_expires_at: float = 0) -> Iterator[Tuple[str, str, Any, float]]:
+        """Yield (key, namespace, value, expires_at) for the most recently stored responses"""
+
+    @abstractmethod
+    def purge_expired(self, before: float) -> int:
+        """Delete responses that expired before the given timestamp"""
+
+    @abstractmethod
+    def get_movie(self, imdb_id: str) -> Optional[Dict[str, Any]]:
+        """Return the normalized record for an IMDb ID"""
+
+    @abstractmethod
+    def get_movie_by_tmdb(self, tmdb_id: int) -> Optional[Dict[str, Any]]:
+        """Return the normalized record for a TMDB ID"""
+
+    @abstractmethod
+    def put_movies(self, records: Iterable[Dict[str, Any]]):
+        """Insert or update normalized movie records (merged with any existing fields)"""
+
+    @abstractmethod
+    def update_movies(self, records: Iterable[Dict[str, Any]]) -> int:
+        """Merge fields into records that already exist; returns how many were updated"""
+
+    @abstractmethod
+    def iter_movies(self) -> Iterator[Dict[str, Any]]:
+        """Yield every stored movie record"""
+
+    @abstractmethod
+    def get_id_mapping(self, imdb_id: Optional[str] = None, tmdb_id: Optional[int] = None) -> Optional[Tuple[int, Optional[str], Optional[str]]]:
+        """Return (tmdb_id, imdb_id, original_language) looked up by either ID"""
+
+    @abstractmethod
+    def put_id_mappings(self, rows: Iterable[Tuple[int, Optional[str], Optional[str]]]):
+        """Upsert (tmdb_id, imdb_id, original_language) rows; None fields keep their stored value"""
+
+    @abstractmethod
+    def iter_id_mappings(self) -> Iterator[Tuple[int, Optional[str], Optional[str]]]:
+        """Yield every stored (tmdb_id, imdb_id, original_language) row"""
+
+    @abstractmethod
+    def try_lease(self, name: str, owner: str, ttl: float) -> bool:
+        """Take or renew a named lease for ttl seconds unless another owner holds an unexpired one"""
+
+    @abstractmethod
+    def release_lease(self, name: str, owner: str):
+        """Drop a lease if `owner` still holds it"""
+
+    def put_movie(self, record: Dict[str, Any]):
+        self.put_movies([record])
+
+    def close(self):
+        pass
+
+
+class NullStore(MetadataStore):
+    """Store that persists nothing"""
+
+    def get(self, key, min_expires_at=0):
+        return None
+
+    def set(self, key, namespace, value, expires_at):
+        pass
+
+    def iter_recent(self, limit, min_expires_at=0):
+        return iter(())
+
+    def purge_expired(self, before):
+        return 0
+
+    def get_movie(self, imdb_id):
+        return None
+
+    def get_movie_by_tmdb(self, tmdb_id):
+        return None
+
+    def put_movies(self, records):
+        pass
+
+    def update_movies(self, records):
+        return 0
+
+    def iter_movies(self):
+        return iter(())
+
+    def get_id_mapping(self, imdb_id=None, tmdb_id=None):
+        return None
+
+    def put_id_mappings(self, rows):
+        pass
+
+    def iter_id_mappings(self):
+        return iter(())
+
+    def try_lease(self, name, owner, ttl):
+        return True  # nothing to coordinate with
+
+    def release_lease(self, name, owner):
+        pass
+
+
+class SQLiteStore(MetadataStore):
+    """SQLite-backed store; safe to share between worker processes"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY,
+            namespace TEXT NOT NULL,
+            value TEXT NOT NULL,
+            stored_at REAL NOT NULL,
+            expires_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS responses_stored_at ON responses(stored_at);
+        CREATE TABLE IF NOT EXISTS movies (
+            imdb_id TEXT PRIMARY KEY,
+            tmdb_id INTEGER,
+            record TEXT NOT NULL,
+            updated_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS movies_tmdb_id ON movies(tmdb_id);
+        CREATE TABLE IF NOT EXISTS id_map (
+            tmdb_id INTEGER PRIMARY KEY,
+            imdb_id TEXT,
+            original_language TEXT
+        );
+        CREATE INDEX IF NOT EXISTS id_map_imdb_id ON id_map(imdb_id);
+        CREATE TABLE IF NOT EXISTS leases (
+            name TEXT PRIMARY KEY,
+            owner TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        );
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), timeout=5.0, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+        # Earlier versions keyed responses on the full upstream params, API key included
+        self._conn.execute("DELETE FROM responses WHERE key LIKE '%\"apikey\"%' OR key LIKE '%\"api_key\"%'")
+
+    def get(self, key, min_expires_at=0):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT namespace, value, expires_at FROM responses WHERE key = ? AND expires_at > ?",
+                (key, min_expires_at),
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1]), row[2]
+
+    def set(self, key, namespace, value, expires_at):
+        encoded = json.dumps(value, separators=(",", ":"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, namespace, value, stored_at, expires_at) VALUES (?, ?, ?, ?, ?)",
+                (key, namespace, encoded, time.time(), expires_at),
+            )
+
+    def iter_recent(self, limit, min_expires_at=0):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, namespace, value, expires_at FROM responses WHERE expires_at > ? "
+                "ORDER BY stored_at DESC LIMIT ?",
+                (min_expires_at, limit),
+            ).fetchall()
+        for key, namespace, value, expires_at in rows:
+            yield key, namespace, json.loads(value), expires_at
+
+    def purge_expired(self, before):
+        with self._lock:
+            # Leases left behind by crashed workers go too
+            self._conn.execute("DELETE FROM leases WHERE expires_at <= ?", (time.time(),))
+            return self._conn.execute("DELETE FROM responses WHERE expires_at <= ?", (before,)).rowcount
+
+    def _load_movie(self, where: str, arg: Any) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(f"SELECT record FROM movies WHERE {where} = ?", (arg,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_movie(self, imdb_id):
+        return self._load_movie("imdb_id", imdb_id)
+
+    def get_movie_by_tmdb(self, tmdb_id):
+        return self._load_movie("tmdb_id", tmdb_id)
+
+    def _merge_movies(self, records: Iterable[Dict[str, Any]], only_existing: bool) -> int:
+        now = time.time()
+        written = 0
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for record in records:
+                    row = self._conn.execute(
+                        "SELECT record FROM movies WHERE imdb_id = ?", (record['imdb_id'],)
+                    ).fetchone()
+                    if row is None and only_existing:
+                        continue
+                    merged = json.loads(row[0]) if row else {}
+                    merged.update({k: v for k, v in record.items() if v is not None})
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO movies (imdb_id, tmdb_id, record, updated_at) VALUES (?, ?, ?, ?)",
+                        (merged['imdb_id'], merged.get('tmdb_id'), json.dumps(merged, separators=(",", ":")), now),
+                    )
+                    written += 1
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return written
+
+    def put_movies(self, records):
+        self._merge_movies(records, only_existing=False)
+
+    def update_movies(self, records):
+        return self._merge_movies(records, only_existing=True)
+
+    def iter_movies(self, page_size: int = 1000):
+        # Page by primary key so large catalogs never sit in memory at once
+        last_id = ""
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT imdb_id, record FROM movies WHERE imdb_id > ? ORDER BY imdb_id LIMIT ?",
+                    (last_id, page_size),
+                ).fetchall()
+            for _, record in rows:
+                yield json.loads(record)
+            if len(rows) < page_size:
+                return
+            last_id = rows[-1][0]
+
+    def get_id_mapping(self, imdb_id=None, tmdb_id=None):
+        if tmdb_id is not None:
+            where, arg = "tmdb_id", tmdb_id
+        elif imdb_id is not None:
+            where, arg = "imdb_id", imdb_id
+        else:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT tmdb_id, imdb_id, original_language FROM id_map WHERE {where} = ?", (arg,)
+            ).fetchone()
+        return tuple(row) if row else None
+
+    def put_id_mappings(self, rows):
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for tmdb_id, imdb_id, language in rows:
+                    self._conn.execute(
+                        "INSERT INTO id_map (tmdb_id, imdb_id, original_language) VALUES (?, ?, ?) "
+                        "ON CONFLICT(tmdb_id) DO UPDATE SET "
+                        "imdb_id = COALESCE(excluded.imdb_id, id_map.imdb_id), "
+                        "original_language = COALESCE(excluded.original_language, id_map.original_language)",
+                        (tmdb_id, imdb_id, language),
+                    )
+                    if imdb_id:
+                        self._conn.execute("UPDATE movies SET tmdb_id = ? WHERE imdb_id = ?", (tmdb_id, imdb_id))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def iter_id_mappings(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT tmdb_id, imdb_id, original_language FROM id_map").fetchall()
+        for row in rows:
+            yield tuple(row)
+
+    def try_lease(self, name, owner, ttl):
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO leases (name, owner, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+                "WHERE leases.owner = excluded.owner OR leases.expires_at <= ?",
+                (name, owner, now + ttl, now),
+            )
+        return cursor.rowcount == 1
+
+    def release_lease(self, name, owner):
+        with self._lock:
+            self._conn.execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, owner))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def open_store(backend: str, path: str) -> MetadataStore:
+    """Create the configured store, falling back to NullStore if it cannot be opened"""
+    if backend == "none":
+        return NullStore()
+    if backend != "sqlite":
+        raise ValueError(f"Unknown metadata store backend: {backend}")
+    try:
+        return SQLiteStore(path)
+    except (sqlite3.Error, OSError) as e:
+        logger.error("Could not open metadata store at %s: %s", path, e)
+        return NullStore()
@@ -0,0 +1,69 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Backend modules import each other flat (``from caching import ...``)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+FAKE_UPSTREAM = "http://upstream.test"
+
+
+@pytest.fixture
+def fake_upstream(monkeypatch):
+    """The benchmark stand-in for OMDb/TMDB/poster hosts, with no latency or injected errors"""
+    from bench import fake_upstream
+
+    monkeypatch.setitem(fake_upstream.config, "latency", 0)
+    monkeypatch.setitem(fake_upstream.config, "jitter", 0)
+    monkeypatch.setitem(fake_upstream.config, "error_rate", 0)
+    monkeypatch.setattr(fake_upstream, "counters", {})
+    return fake_upstream
+
+
+@pytest.fixture
+def api(tmp_path, monkeypatch, fake_upstream):
+    """A TestClient for the app, with its own data dir and every upstream served by the fake"""
+    import httpx
+    from fastapi.testclient import TestClient
+
+    import server
+    from caching import SingleFlight
+    from recommender import RecommendationIndex
+    from search_index import TitleSearchIndex
+    from warmer import Scheduler
+
+    for name, value in {
+        "OMDB_API_KEY": "omdb-key",
+        "OMDB_BASE_URL": FAKE_UPSTREAM,
+        "TMDB_API_KEY": "tmdb-key",
+        "TMDB_BASE_URL": f"{FAKE_UPSTREAM}/3",
+        "METADATA_STORE_PATH": str(tmp_path / "cinegraph.db"),
+        "RECOMMENDER_INDEX_PATH": str(tmp_path / "recommender"),
+        "GEOIP_DB_PATH": str(tmp_path / "geoip.csv"),
+        "WARMER_ENABLED": False,
+        "SHARED_FETCH_WAIT": 0.5,
+        "search_index": TitleSearchIndex(),
+        "rec_index": RecommendationIndex(),
+        "inflight": SingleFlight(),
+        "scheduler": Scheduler(),
+        "readiness": {"ready": False, "prewarm_seconds": None, "prewarm_ok": None},
+        "trending_snapshot": None,
+    }.items():
+        monkeypatch.setattr(server, name, value)
+    monkeypatch.setenv("IMAGE_CACHE_DIR", str(tmp_path / "images"))
+    server.cache.clear()
+
+    open_resources = server.open_resources
+
+    def open_fake_resources():
+        open_resources()
+        transport = httpx.ASGITransport(app=fake_upstream.app)
+        for client in (server.omdb_client, server.tmdb_client):
+            client.client = httpx.AsyncClient(transport=transport)
+        server.image_proxy.client = httpx.AsyncClient(transport=transport, follow_redirects=True)
+
+    monkeypatch.setattr(server, "open_resources", open_fake_resources)
+    with TestClient(server.app) as client:
+        yield client
+    server.cache.clear()
@@ -0,0 +1,93 @@
+import pytest
+
+import caching
+from caching import TTLCache
+
+
+class Clock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(caching.time, "time", clock)
+    return clock
+
+
+def test_lru_eviction_by_entry_count(clock):
+    cache = TTLCache(max_entries=2)
+    cache.set("ns", "a", 1)
+    cache.set("ns", "b", 2)
+    assert cache.lookup("ns", "a") == (1, False)  # a is now most recently used
+    cache.set("ns", "c", 3)
+
+    assert "b" not in cache
+    assert "a" in cache and "c" in cache
+    assert cache.stats()["namespaces"]["ns"]["evictions"] == 1
+
+
+def test_eviction_by_byte_budget(clock):
+    cache = TTLCache(max_bytes=100)
+    cache.set("ns", "a", "x", size=60)
+    cache.set("ns", "b", "y", size=60)
+
+    assert "a" not in cache
+    assert cache.total_bytes == 60
+
+
+def test_oversized_value_is_not_cached(clock):
+    cache = TTLCache(max_bytes=100)
+    cache.set("ns", "a", "x", size=50)
+    cache.set("ns", "big", "y", size=500)
+
+    assert "big" not in cache
+    assert "a" in cache
+
+
+def test_namespace_ttl(clock):
+    cache = TTLCache(default_ttl=100, namespace_ttls={"short": 10})
+    cache.set("short", "s", 1)
+    cache.set("long", "l", 2)
+    clock.now += 11
+
+    assert cache.get("short", "s") is None
+    assert cache.get("long", "l") == 2
+
+
+def test_sweep_drops_expired_entries(clock):
+    cache = TTLCache(default_ttl=10)
+    cache.set("ns", "old", 1)
+    clock.now += 5
+    cache.set("ns", "new", 2)
+    clock.now += 6
+
+    assert cache.sweep() == 1
+    assert cache.peek("old") is None
+    assert cache.peek("new") is not None
+
+
+def test_stale_window(clock):
+    cache = TTLCache(default_ttl=10, stale_ttl=20)
+    cache.set("ns", "k", "v")
+
+    clock.now += 5
+    assert cache.lookup("ns", "k") == ("v", False)
+    clock.now += 10
+    assert cache.lookup("ns", "k") == ("v", True)
+    assert cache.get("ns", "k") is None  # get() only returns fresh values
+    clock.now += 20
+    assert cache.lookup("ns", "k") is None
+    assert len(cache) == 0
+
+
+def test_negative_entries_have_no_stale_window(clock):
+    cache = TTLCache(default_ttl=10, stale_ttl=20)
+    cache.set("ns", "k", None, ttl=5, stale_ttl=0)
+    clock.now += 6
+
+    assert cache.lookup("ns", "k") is None
@@ -0,0 +1,73 @@
+import gzip
+
+import pytest
+
+from geoip import GeoIPDatabase, client_ip
+
+ROWS = [
+    ["start", "end", "country"],  # header
+    ["1.0.0.0", "1.0.0.255", "AU", "Australia"],
+    ["8.8.8.0", "8.8.8.255", "US", "United States"],
+    ["16777472", "16777727", "CN"],  # 1.0.1.0-1.0.1.255 as integers, no name
+    ["::ffff:9.9.9.0", "::ffff:9.9.9.255", "CH", "Switzerland"],
+    ["2001:4860::", "2001:4860:ffff:ffff:ffff:ffff:ffff:ffff", "US", "United States"],
+    ["10.0.0.0", "10.255.255.255", "ZZ", "Reserved"],
+    ["not-an-ip", "1.2.3.4", "XX"],
+]
+
+
+@pytest.fixture
+def db():
+    db = GeoIPDatabase()
+    db.add_rows(ROWS)
+    return db
+
+
+def test_counts_only_usable_rows(db):
+    assert len(db) == 5
+
+
+def test_ipv4_lookup(db):
+    assert db.lookup("1.0.0.1") == ("AU", "Australia")
+    assert db.lookup("8.8.8.8") == ("US", "United States")
+    assert db.lookup("8.8.9.1") is None  # in a gap between ranges
+
+
+def test_integer_bounds_and_missing_name(db):
+    assert db.lookup("1.0.1.7") == ("CN", "CN")
+
+
+def test_ipv4_mapped_rows_and_addresses(db):
+    assert db.lookup("9.9.9.9") == ("CH", "Switzerland")
+    assert db.lookup("::ffff:8.8.8.8") == ("US", "United States")
+
+
+def test_ipv6_lookup(db):
+    assert db.lookup("2001:4860:4860::8888") == ("US", "United States")
+    assert db.lookup("::1") is None
+
+
+def test_reserved_and_invalid(db):
+    assert db.lookup("10.1.2.3") is None
+    assert db.lookup("garbage") is None
+
+
+def test_results_are_cached(db):
+    db.lookup("8.8.8.8")
+    db.lookup("8.8.8.8")
+
+    assert db.cache_info().hits == 1
+
+
+def test_load_gzip(tmp_path):
+    path = tmp_path / "ranges.csv.gz"
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        f.write("1.0.0.0,1.0.0.255,AU,Australia\n")
+
+    assert GeoIPDatabase.load(str(path)).lookup("1.0.0.9") == ("AU", "Australia")
+
+
+def test_client_ip_prefers_first_valid_forwarded_hop():
+    assert client_ip({"x-forwarded-for": "unknown, 203.0.113.9, 10.0.0.1"}, "127.0.0.1") == "203.0.113.9"
+    assert client_ip({"x-forwarded-for": "garbage"}, "127.0.0.1") == "127.0.0.1"
+    assert client_ip({}, None) is None
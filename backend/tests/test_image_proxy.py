@@ -0,0 +1,97 @@
+import asyncio
+
+import httpx
+import pytest
+
+import image_proxy
+from image_proxy import ImageProxy, variant_url
+
+from conftest import FAKE_UPSTREAM
+
+POSTER = f"{FAKE_UPSTREAM}/images/7.jpg"
+TMDB_POSTER = "https://image.tmdb.org/t/p/w500/poster.jpg"
+
+
+def proxied(api, url, **params):
+    return api.get("/api/proxy-image", params={"url": url, **params})
+
+
+def test_images_are_cached_and_revalidated(api, fake_upstream):
+    first = proxied(api, POSTER)
+    assert first.status_code == 200
+    assert first.content.startswith(b"\xff\xd8")
+
+    cached = proxied(api, POSTER)
+    assert cached.content == first.content
+    assert fake_upstream.counters["image"] == 1
+
+    etag = cached.headers["etag"]
+    revalidated = api.get("/api/proxy-image", params={"url": POSTER}, headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert fake_upstream.counters["image"] == 1
+
+
+def test_rejects_bad_requests(api):
+    assert proxied(api, "ftp://example.com/a.jpg").status_code == 400
+    assert proxied(api, POSTER, w=300).status_code == 400
+
+
+def test_variant_url_uses_the_hosts_own_sizes():
+    assert variant_url(TMDB_POSTER, 185) == "https://image.tmdb.org/t/p/w185/poster.jpg"
+    assert variant_url(POSTER, 185) is None
+
+
+@pytest.fixture
+def poster_host(api, monkeypatch):
+    """Serve TMDB-style poster URLs from a mock host; returns the paths it was asked for"""
+    import server
+
+    requested = []
+    missing = set()
+
+    def handler(request):
+        requested.append(request.url.path)
+        if request.url.path in missing:
+            return httpx.Response(404)
+        return httpx.Response(200, content=request.url.path.encode(), headers={"content-type": "image/jpeg"})
+
+    monkeypatch.setattr(image_proxy, "Image", None)  # no local resizing
+    monkeypatch.setattr(server.image_proxy, "client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    return requested, missing
+
+
+def test_host_renders_the_variant(api, poster_host):
+    requested, _ = poster_host
+
+    response = proxied(api, TMDB_POSTER, w=185)
+
+    assert response.status_code == 200
+    assert response.content == b"/t/p/w185/poster.jpg"
+    assert requested == ["/t/p/w185/poster.jpg"]
+
+
+def test_failed_host_variant_falls_back_to_the_original(api, poster_host):
+    requested, missing = poster_host
+    missing.add("/t/p/w185/poster.jpg")
+
+    response = proxied(api, TMDB_POSTER, w=185)
+
+    assert response.status_code == 200
+    assert response.content == b"/t/p/w500/poster.jpg"
+    assert requested == ["/t/p/w185/poster.jpg", "/t/p/w500/poster.jpg"]
+
+
+def test_read_capped_stops_at_max_image_bytes(tmp_path):
+    def handler(request):
+        return httpx.Response(200, content=b"x" * 1000, headers={"content-type": "image/png"})
+
+    async def read(url, max_image_bytes):
+        proxy = ImageProxy(str(tmp_path), max_image_bytes=max_image_bytes)
+        proxy.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        try:
+            return await proxy._read_capped(url)
+        finally:
+            await proxy.aclose()
+
+    assert asyncio.run(read(POSTER, 100)) is None
+    assert asyncio.run(read(POSTER, 1000)) == (b"x" * 1000, "image/png")
@@ -0,0 +1,104 @@
+import asyncio
+import gzip
+import os
+
+import httpx
+import pytest
+
+import ingest
+from ingest import Checkpoints, SourceProgress, iter_tsv, open_lines, run_batches
+
+
+@pytest.fixture
+def checkpoints(tmp_path):
+    return Checkpoints(tmp_path / "checkpoints.json")
+
+
+class Writer:
+    """Collects written records; raises once `fail_after` batches have been written"""
+
+    def __init__(self, fail_after=None):
+        self.batches = []
+        self.fail_after = fail_after
+
+    def __call__(self, batch):
+        if self.fail_after is not None and len(self.batches) >= self.fail_after:
+            raise RuntimeError("disk full")
+        self.batches.append([record["n"] for record in batch])
+        return len(batch)
+
+
+def ingest_rows(checkpoints, write, count=10, restart=False):
+    rows = [{"n": n} for n in range(count)]
+    return asyncio.run(run_batches("test", rows, dict, write, checkpoints, "test:source", 3, restart))
+
+
+def test_checkpoints_persist(tmp_path, checkpoints):
+    checkpoints.save("k", rows=5, written=4)
+
+    state = Checkpoints(tmp_path / "checkpoints.json").get("k")
+    assert (state["rows"], state["written"]) == (5, 4)
+    assert checkpoints.get("missing") == {}
+
+
+def test_resumes_after_the_last_checkpointed_batch(checkpoints):
+    with pytest.raises(RuntimeError):
+        ingest_rows(checkpoints, Writer(fail_after=2))
+    assert checkpoints.get("test:source")["rows"] == 6
+
+    write = Writer()
+    assert ingest_rows(checkpoints, write) == 10
+    assert write.batches == [[6, 7, 8], [9]]
+    assert checkpoints.get("test:source")["done"]
+
+
+def test_finished_sources_are_skipped_unless_restarted(checkpoints):
+    ingest_rows(checkpoints, Writer())
+
+    assert ingest_rows(checkpoints, Writer()) == 0
+    write = Writer()
+    assert ingest_rows(checkpoints, write, restart=True) == 10
+    assert write.batches[0] == [0, 1, 2]
+
+
+def test_file_source_key_tracks_size_and_mtime(tmp_path):
+    source = tmp_path / "title.basics.tsv"
+    source.write_text("tconst\n")
+    key = Checkpoints.source_key("imdb-basics", str(source))
+
+    source.write_text("tconst\ntt1\n")
+    os.utime(source, (1, 1))
+    assert Checkpoints.source_key("imdb-basics", str(source)) != key
+
+
+def test_url_source_key_includes_validators(monkeypatch):
+    served = {"etag": '"v1"', "last-modified": "Mon, 01 Jan 2024 00:00:00 GMT", "content-length": "10"}
+
+    def head(url, **kwargs):
+        return httpx.Response(200, headers=served, request=httpx.Request("HEAD", url))
+
+    monkeypatch.setattr(ingest.httpx, "head", head)
+    url = "https://datasets.example.com/title.basics.tsv.gz"
+    key = Checkpoints.source_key("imdb-basics", url)
+    assert key == f'imdb-basics:{url}:"v1":Mon, 01 Jan 2024 00:00:00 GMT:10'
+
+    served["etag"] = '"v2"'
+    assert Checkpoints.source_key("imdb-basics", url) != key
+
+
+def test_url_source_key_without_validators(monkeypatch):
+    def head(url, **kwargs):
+        raise httpx.ConnectError("unreachable")
+
+    monkeypatch.setattr(ingest.httpx, "head", head)
+
+    assert Checkpoints.source_key("tmdb", "https://example.com/dump.json") == "tmdb:https://example.com/dump.json"
+
+
+def test_open_lines_gunzips_files(tmp_path):
+    source = tmp_path / "ratings.tsv.gz"
+    with gzip.open(source, "wt", encoding="utf-8") as f:
+        f.write("tconst\taverageRating\ntt1\t7.5\n")
+
+    rows = list(iter_tsv(open_lines(str(source), SourceProgress())))
+    assert rows == [{"tconst": "tt1", "averageRating": "7.5"}]
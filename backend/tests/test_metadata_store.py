@@ -0,0 +1,73 @@
+import sqlite3
+import time
+
+import pytest
+
+from store import SQLiteStore
+
+
+def flush_store_writes(server):
+    """Wait for queued store writes (they run on the writer thread)"""
+    server.store_writer.submit(lambda: None).result(timeout=5)
+
+
+def test_responses_survive_a_cold_memory_cache(api, fake_upstream):
+    import server
+
+    assert api.get("/api/movie/tt0100001").status_code == 200
+    flush_store_writes(server)
+    server.cache.clear()
+
+    assert api.get("/api/movie/tt0100001").status_code == 200
+    assert fake_upstream.counters["omdb_title"] == 1
+
+
+@pytest.fixture
+def broken_reads(api, monkeypatch):
+    import server
+
+    def locked(*args, **kwargs):
+        raise sqlite3.OperationalError("database is locked")
+
+    for name in ("get", "get_movie", "get_id_mapping"):
+        monkeypatch.setattr(server.store, name, locked)
+
+
+def test_store_read_errors_are_cache_misses(api, broken_reads, fake_upstream):
+    assert api.get("/api/movie/tt0100001").status_code == 200
+    assert api.get("/api/search", params={"query": "king"}).status_code == 200
+    assert fake_upstream.counters["omdb_title"] == 1
+
+
+def test_store_read_errors_do_not_break_recommendations(api, broken_reads):
+    response = api.get("/api/movie/tt0100001/recommendations")
+
+    assert response.status_code == 200
+    assert response.json()
+
+
+def test_api_keys_never_reach_the_store(api):
+    import server
+
+    api.get("/api/movie/tt0100001")
+    api.get("/api/movie/tt0100001/recommendations")
+    flush_store_writes(server)
+
+    with server.store._lock:
+        keys = [row[0] for row in server.store._conn.execute("SELECT key FROM responses UNION ALL SELECT name FROM leases")]
+    assert any(key.startswith("omdb_") for key in keys)
+    assert any(key.startswith("tmdb_") for key in keys)
+    assert not [key for key in keys if "omdb-key" in key or "tmdb-key" in key]
+
+
+def test_rows_keyed_with_api_keys_are_dropped_on_open(tmp_path):
+    path = str(tmp_path / "store.db")
+    store = SQLiteStore(path)
+    store.set('omdb_{"apikey": "secret", "i": "tt1"}', "omdb_detail", {}, time.time() + 60)
+    store.set('omdb_{"i": "tt1"}', "omdb_detail", {}, time.time() + 60)
+    store.close()
+
+    store = SQLiteStore(path)
+    assert store.get('omdb_{"apikey": "secret", "i": "tt1"}') is None
+    assert store.get('omdb_{"i": "tt1"}') is not None
+    store.close()
@@ -0,0 +1,70 @@
+import time
+
+from test_metadata_store import flush_store_writes
+
+MOVIE = "/api/movie/tt0100001"
+
+
+def wait_for_refreshes(server, timeout=5):
+    deadline = time.monotonic() + timeout
+    while len(server.inflight) and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def expire_cached(server, namespace):
+    """Push every entry in a namespace into its stale window, in memory and in the store"""
+    expired = time.time() - 1
+    for entry in server.cache._entries.values():
+        if entry.namespace == namespace:
+            entry.expires_at = expired
+    flush_store_writes(server)
+    with server.store._lock:
+        server.store._conn.execute("UPDATE responses SET expires_at = ? WHERE namespace = ?", (expired, namespace))
+
+
+def test_not_found_is_cached_and_published(api, fake_upstream):
+    import server
+
+    assert api.get("/api/movie/ttunknown").status_code == 404
+    assert api.get("/api/movie/ttunknown").status_code == 404
+    assert fake_upstream.counters["omdb_title"] == 1
+
+    flush_store_writes(server)
+    key = server.omdb_cache_key({"i": "ttunknown", "plot": "full"})
+    assert server.store.get(f"negative:{key}")[1]["value"]["Response"] == "False"
+
+
+def test_upstream_failures_are_cached_briefly(api, fake_upstream, monkeypatch):
+    monkeypatch.setitem(fake_upstream.config, "error_rate", 1)
+
+    assert api.get(MOVIE).status_code == 500
+    calls = fake_upstream.counters["omdb_title"]
+    assert api.get(MOVIE).status_code == 500
+    assert fake_upstream.counters["omdb_title"] == calls
+
+
+def test_stale_copy_is_served_while_refreshing(api, fake_upstream):
+    import server
+
+    first = api.get(MOVIE).json()
+    expire_cached(server, "omdb_detail")
+
+    assert api.get(MOVIE).json() == first
+    wait_for_refreshes(server)
+    assert fake_upstream.counters["omdb_title"] == 2
+    assert server.cache.lookup("omdb_detail", server.omdb_cache_key({"i": "tt0100001", "plot": "full"}))[1] is False
+
+
+def test_failed_refresh_keeps_the_stale_copy(api, fake_upstream, monkeypatch):
+    import server
+
+    first = api.get(MOVIE).json()
+    expire_cached(server, "omdb_detail")
+    monkeypatch.setitem(fake_upstream.config, "error_rate", 1)
+
+    assert api.get(MOVIE).json() == first
+    wait_for_refreshes(server)
+    assert fake_upstream.counters["errors"]
+    response = api.get(MOVIE)
+    assert response.status_code == 200
+    assert response.json() == first
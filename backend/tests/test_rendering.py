@@ -0,0 +1,63 @@
+from email.utils import formatdate
+
+from starlette.requests import Request
+
+from rendering import Rendered, sse_event
+
+
+def request(**headers):
+    raw = [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw})
+
+
+def test_etag_depends_only_on_the_body():
+    assert Rendered({"a": 1}).etag == Rendered({"a": 1}, last_modified=0).etag
+    assert Rendered({"a": 1}).etag != Rendered({"a": 2}).etag
+
+
+def test_response_carries_validators():
+    rendered = Rendered({"title": "Heat"}, last_modified=1_000_000)
+    response = rendered.response(request())
+
+    assert response.status_code == 200
+    assert response.body == b'{"title":"Heat"}'
+    assert response.headers["etag"] == rendered.etag
+    assert response.headers["last-modified"] == formatdate(1_000_000, usegmt=True)
+
+
+def test_if_none_match():
+    rendered = Rendered({"title": "Heat"})
+
+    assert rendered.response(request(if_none_match=f'"other", {rendered.etag}')).status_code == 304
+    assert rendered.response(request(if_none_match=f"W/{rendered.etag}")).status_code == 304
+    assert rendered.response(request(if_none_match="*")).status_code == 304
+    assert rendered.response(request(if_none_match='"other"')).status_code == 200
+
+
+def test_if_modified_since():
+    rendered = Rendered({"title": "Heat"}, last_modified=1_000_000)
+
+    assert rendered.response(request(if_modified_since=formatdate(1_000_000, usegmt=True))).status_code == 304
+    assert rendered.response(request(if_modified_since=formatdate(999_999, usegmt=True))).status_code == 200
+    assert rendered.response(request(if_modified_since="garbage")).status_code == 200
+
+
+def test_if_none_match_takes_precedence():
+    rendered = Rendered({"title": "Heat"}, last_modified=1_000_000)
+    headers = {"if_none_match": '"other"', "if_modified_since": formatdate(2_000_000, usegmt=True)}
+
+    assert rendered.response(request(**headers)).status_code == 200
+
+
+def test_sse_event():
+    assert sse_event("movie", {"a": 1}) == b'event: movie\ndata: {"a":1}\n\n'
+
+
+def test_movie_detail_revalidates_with_304(api, fake_upstream):
+    first = api.get("/api/movie/tt0100001")
+    assert first.status_code == 200
+
+    revalidated = api.get("/api/movie/tt0100001", headers={"If-None-Match": first.headers["etag"]})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert fake_upstream.counters["omdb_title"] == 1
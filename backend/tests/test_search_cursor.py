@@ -0,0 +1,75 @@
+import pytest
+from fastapi import HTTPException
+
+from server import SEARCH_MAX_PAGES, decode_search_cursor, encode_search_cursor
+
+
+def test_round_trip():
+    cursor = encode_search_cursor("star wars", 3, "abc123")
+
+    assert decode_search_cursor(cursor) == ("star wars", 3, "abc123")
+
+
+def test_cursor_is_url_safe():
+    cursor = encode_search_cursor("amélie & co/?", 2, None)
+
+    assert "=" not in cursor and "+" not in cursor and "/" not in cursor
+    assert decode_search_cursor(cursor) == ("amélie & co/?", 2, None)
+
+
+@pytest.mark.parametrize("cursor", [
+    "@@@",
+    "bm90IGpzb24",  # "not json"
+    encode_search_cursor("q", 1, None),  # page 1 never needs a cursor
+    encode_search_cursor("q", SEARCH_MAX_PAGES + 1, None),
+])
+def test_invalid_cursors_are_rejected(cursor):
+    with pytest.raises(HTTPException) as excinfo:
+        decode_search_cursor(cursor)
+    assert excinfo.value.status_code == 400
+
+
+def cursor_state(cursor):
+    import server
+
+    _, _, state_id = decode_search_cursor(cursor)
+    entry = server.cache.peek(f"cursor_{state_id}")
+    return entry.value if entry is not None else None
+
+
+def test_pages_never_repeat_titles(api, fake_upstream):
+    hits = [fake_upstream.imdb_id(n) for n in fake_upstream.search_hits("king")]
+    # Titles learned from detail pages change what the local index would answer for page 1
+    for imdb_id in hits[20:22]:
+        assert api.get(f"/api/movie/{imdb_id}").status_code == 200
+
+    response = api.get("/api/search", params={"query": "king"})
+    first_page = [movie["id"] for movie in response.json()]
+    cursor = response.headers["x-next-cursor"]
+
+    seen = list(first_page)
+    for _ in range(3):
+        response = api.get("/api/search", params={"query": "king", "cursor": cursor})
+        assert response.status_code == 200
+        seen += [movie["id"] for movie in response.json()]
+        cursor = response.headers.get("x-next-cursor")
+        if cursor is None:
+            break
+    assert len(seen) == len(set(seen)) > 20
+
+
+def test_first_page_prefetches_the_second(api):
+    import time
+
+    response = api.get("/api/search", params={"query": "king"})
+    state = cursor_state(response.headers["x-next-cursor"])
+    deadline = time.monotonic() + 5
+    while len(state.pages) < 2 and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert len(state.pages) >= 2
+
+
+def test_cursor_must_match_the_query(api):
+    cursor = api.get("/api/search", params={"query": "king"}).headers["x-next-cursor"]
+
+    assert api.get("/api/search", params={"query": "queen", "cursor": cursor}).status_code == 400
@@ -0,0 +1,69 @@
+import pytest
+
+from search_index import TitleSearchIndex
+
+
+@pytest.fixture
+def index():
+    index = TitleSearchIndex()
+    index.add_many([
+        {"imdb_id": "tt1375666", "title": "Inception", "year": "2010"},
+        {"imdb_id": "tt0468569", "title": "The Dark Knight", "year": "2008"},
+        {"imdb_id": "tt1345836", "title": "The Dark Knight Rises", "year": "2012"},
+        {"imdb_id": "tt0816692", "title": "Interstellar", "year": "2014"},
+        {"imdb_id": "tt0110912", "title": "Pulp Fiction", "year": "1994"},
+    ])
+    return index
+
+
+def ids(results):
+    return [doc["imdb_id"] for doc in results]
+
+
+def test_prefix_match(index):
+    assert ids(index.search("incep")) == ["tt1375666"]
+
+
+def test_every_word_must_match(index):
+    assert set(ids(index.search("dark kni"))) == {"tt0468569", "tt1345836"}
+    assert index.search("dark fiction") == []
+
+
+def test_exact_title_ranks_first(index):
+    assert ids(index.search("the dark knight"))[0] == "tt0468569"
+
+
+def test_typo_match(index):
+    assert ids(index.search("incepton")) == ["tt1375666"]
+    assert ids(index.search("intersteller")) == ["tt0816692"]
+
+
+def test_short_tokens_are_not_fuzzy_matched(index):
+    assert index.search("pux") == []  # one edit from the prefix "pul", but too short to guess at
+    assert ids(index.search("pulx")) == ["tt0110912"]
+
+
+def test_limit(index):
+    assert len(index.search("the", limit=1)) == 1
+
+
+def test_reindex_on_title_change(index):
+    index.add({"imdb_id": "tt1375666", "title": "Origin"})
+
+    assert index.search("inception") == []
+    assert ids(index.search("origin")) == ["tt1375666"]
+    assert index.get("tt1375666")["year"] == "2010"  # kept from the earlier payload
+
+
+def test_remove(index):
+    index.remove("tt0816692")
+
+    assert index.search("interstellar") == []
+    assert "tt0816692" not in index
+
+
+def test_records_without_title_are_skipped():
+    index = TitleSearchIndex()
+
+    assert not index.add({"imdb_id": "tt1"})
+    assert len(index) == 0
@@ -0,0 +1,129 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from store import SQLiteStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SQLiteStore(str(tmp_path / "store.db"))
+    yield store
+    store.close()
+
+
+def test_lease_is_exclusive_until_released(store):
+    assert store.try_lease("job:trending", "worker-1", ttl=60)
+    assert not store.try_lease("job:trending", "worker-2", ttl=60)
+
+    store.release_lease("job:trending", "worker-2")  # not the owner: no effect
+    assert not store.try_lease("job:trending", "worker-2", ttl=60)
+
+    store.release_lease("job:trending", "worker-1")
+    assert store.try_lease("job:trending", "worker-2", ttl=60)
+
+
+def test_expired_lease_can_be_taken_over(store):
+    assert store.try_lease("fetch:k", "worker-1", ttl=0.05)
+    time.sleep(0.1)
+
+    assert store.try_lease("fetch:k", "worker-2", ttl=60)
+
+
+def test_purge_drops_expired_responses_and_leases(store):
+    now = time.time()
+    store.set("old", "ns", {"v": 1}, now - 10)
+    store.set("new", "ns", {"v": 2}, now + 60)
+    store.try_lease("fetch:old", "worker-1", ttl=0.01)
+    time.sleep(0.05)
+
+    assert store.purge_expired(now) == 1
+    assert store.get("new") is not None
+    assert store.try_lease("fetch:old", "worker-2", ttl=60)
+
+
+def other_worker_fetching(server, cache_key):
+    """Hold the fetch lease for a key as if a sibling worker were fetching it"""
+    assert server.store.try_lease(f"fetch:{cache_key}", "sibling", ttl=60)
+
+
+def publish_later(fn, *args, delay=0.1):
+    timer = threading.Timer(delay, fn, args)
+    timer.start()
+    return timer
+
+
+def counting_fetch(result="fetched"):
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        return result
+
+    return fetch, calls
+
+
+def test_waiter_takes_the_value_another_worker_stored(api):
+    import server
+
+    other_worker_fetching(server, "k")
+    publish_later(server.store.set, "k", "omdb_detail", {"Title": "Shared"}, time.time() + 60)
+    fetch, calls = counting_fetch()
+
+    assert api.portal.call(server.fetch_shared, "omdb_detail", "k", fetch) == {"Title": "Shared"}
+    assert not calls
+
+
+def test_waiter_stops_early_on_a_published_failure(api):
+    import server
+
+    other_worker_fetching(server, "k")
+    publish_later(server.store.set, "negative:k", "omdb_detail", {"failure": "boom"}, time.time() + 60)
+    fetch, calls = counting_fetch()
+
+    started = time.monotonic()
+    with pytest.raises(HTTPException) as excinfo:
+        api.portal.call(server.fetch_shared, "omdb_detail", "k", fetch)
+    assert excinfo.value.detail == "boom"
+    assert time.monotonic() - started < server.SHARED_FETCH_WAIT
+    assert not calls
+
+
+def test_waiter_fetches_itself_when_nothing_is_published(api):
+    import server
+
+    other_worker_fetching(server, "k")
+    fetch, calls = counting_fetch()
+
+    assert api.portal.call(server.fetch_shared, "omdb_detail", "k", fetch) == "fetched"
+    assert calls == [1]
+
+
+def test_lease_errors_fall_through_to_fetching(api, monkeypatch):
+    import server
+
+    def locked(*args):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(server.store, "try_lease", locked)
+
+    assert api.get("/api/movie/tt0100001").status_code == 200
+    assert api.get("/api/search", params={"query": "king"}).status_code == 200
+
+
+def test_poll_errors_fall_through_to_fetching(api, monkeypatch):
+    import server
+
+    other_worker_fetching(server, "k")
+
+    def locked(*args, **kwargs):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(server.store, "get", locked)
+    fetch, calls = counting_fetch()
+
+    assert api.portal.call(server.fetch_shared, "omdb_detail", "k", fetch) == "fetched"
+    assert calls == [1]
@@ -0,0 +1,62 @@
+import asyncio
+
+from caching import SingleFlight
+
+
+def test_single_flight_coalesces_concurrent_calls():
+    flight = SingleFlight()
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "value"
+
+    async def main():
+        return await asyncio.gather(*[flight.do("k", fetch) for _ in range(5)])
+
+    assert asyncio.run(main()) == ["value"] * 5
+    assert calls == 1
+    assert flight.coalesced == 4
+    assert len(flight) == 0
+
+
+def test_single_flight_shares_errors_and_forgets_the_key():
+    flight = SingleFlight()
+    calls = 0
+
+    async def failing():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream down")
+
+    async def main():
+        results = await asyncio.gather(*[flight.do("k", failing) for _ in range(3)], return_exceptions=True)
+        # A later call starts a fresh attempt instead of replaying the old error
+        retry = await asyncio.gather(flight.do("k", failing), return_exceptions=True)
+        return results, retry
+
+    results, retry = asyncio.run(main())
+    assert all(isinstance(result, ValueError) for result in results)
+    assert len({id(result) for result in results}) == 1
+    assert isinstance(retry[0], ValueError)
+    assert calls == 2
+
+
+def test_single_flight_waiter_cancellation_does_not_cancel_fetch():
+    flight = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.02)
+        return "value"
+
+    async def main():
+        impatient = asyncio.ensure_future(flight.do("k", fetch))
+        patient = asyncio.ensure_future(flight.do("k", fetch))
+        await asyncio.sleep(0.005)
+        impatient.cancel()
+        return await patient
+
+    assert asyncio.run(main()) == "value"
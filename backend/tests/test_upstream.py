@@ -0,0 +1,131 @@
+import asyncio
+
+import httpx
+import pytest
+
+from upstream import CircuitBreaker, CircuitOpenError, RateLimitedError, TokenBucket, UpstreamClient
+
+
+def client_for(handler, **kwargs):
+    kwargs.setdefault("backoff_base", 0)
+    return UpstreamClient("test", transport=httpx.MockTransport(handler), **kwargs)
+
+
+def call(client, url="http://upstream.test/"):
+    async def get():
+        try:
+            return await client.get(url)
+        finally:
+            await client.aclose()
+
+    return asyncio.run(get())
+
+
+def test_bucket_fails_fast_beyond_max_wait():
+    async def run():
+        bucket = TokenBucket(rate=10, capacity=1)
+        assert await bucket.acquire(0)
+        assert not await bucket.acquire(0)  # the next token is 0.1s away
+        assert await bucket.acquire(0.5)
+
+    asyncio.run(run())
+
+
+def test_bucket_reserves_turns_for_concurrent_callers():
+    async def run():
+        bucket = TokenBucket(rate=20, capacity=1)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        assert all(await asyncio.gather(*(bucket.acquire(1) for _ in range(3))))
+        return loop.time() - started
+
+    assert 0.08 <= asyncio.run(run()) < 0.5  # two queued turns of 0.05s each
+
+
+def test_cancelled_waiter_returns_its_turn():
+    async def run():
+        bucket = TokenBucket(rate=10, capacity=1)
+        await bucket.acquire(0)
+        waiter = asyncio.ensure_future(bucket.acquire(1))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return bucket._tokens
+
+    assert asyncio.run(run()) > -0.5
+
+
+def test_retries_server_errors_then_succeeds():
+    statuses = [503, 502, 200]
+    client = client_for(lambda request: httpx.Response(statuses.pop(0)))
+
+    assert call(client).status_code == 200
+    assert client.counters["retries"] == 2
+
+
+def test_gives_up_after_retries_and_returns_the_last_response():
+    client = client_for(lambda request: httpx.Response(503), retries=1)
+
+    assert call(client).status_code == 503
+    assert client.counters["requests"] == 2
+    assert client.counters["failures"] == 1
+
+
+def test_timeouts_are_not_retried():
+    def handler(request):
+        raise httpx.ReadTimeout("slow", request=request)
+
+    client = client_for(handler)
+
+    with pytest.raises(httpx.TimeoutException):
+        call(client)
+    assert client.counters["requests"] == 1
+
+
+def test_rate_limited_calls_fail_fast():
+    client = client_for(lambda request: httpx.Response(200), rate=1, burst=1, max_wait=0)
+
+    async def run():
+        try:
+            await client.get("http://upstream.test/")
+            with pytest.raises(RateLimitedError):
+                await client.get("http://upstream.test/")
+        finally:
+            await client.aclose()
+
+    asyncio.run(run())
+    assert client.counters["rejected"] == 1
+
+
+def test_open_circuit_rejects_without_calling_out():
+    calls = []
+
+    def handler(request):
+        calls.append(1)
+        return httpx.Response(500)
+
+    client = client_for(handler, retries=0, failure_threshold=2)
+
+    async def run():
+        try:
+            for _ in range(2):
+                await client.get("http://upstream.test/")
+            with pytest.raises(CircuitOpenError):
+                await client.get("http://upstream.test/")
+        finally:
+            await client.aclose()
+
+    asyncio.run(run())
+    assert client.breaker.state == CircuitBreaker.OPEN
+    assert len(calls) == 2
+
+
+def test_half_open_circuit_lets_one_probe_through():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+
+    assert breaker.allow()  # the probe
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
@@ -0,0 +1,65 @@
+import asyncio
+
+from warmer import Scheduler
+
+
+def test_run_all_skips_housekeeping_jobs():
+    runs = []
+
+    def job(name):
+        async def run():
+            runs.append(name)
+        return run
+
+    async def main():
+        scheduler = Scheduler()
+        scheduler.add("trending", job("trending"), 600)
+        scheduler.add("purge", job("purge"), 600, initial_delay=600, prewarm=False)
+        ok = await scheduler.run_all()
+        scheduler.start(skip_first_run=True)
+        await asyncio.sleep(0.05)
+        await scheduler.stop()
+        return ok
+
+    assert asyncio.run(main())
+    assert runs == ["trending"]
+
+
+def test_failed_job_is_reported_and_counted():
+    async def broken():
+        raise RuntimeError("upstream down")
+
+    async def main():
+        scheduler = Scheduler()
+        scheduler.add("broken", broken, 600)
+        return await scheduler.run_all(), scheduler.stats()[0]
+
+    ok, stats = asyncio.run(main())
+    assert not ok
+    assert stats["failures"] == 1 and stats["last_error"] == "upstream down"
+
+
+def test_empty_trending_refresh_keeps_the_previous_snapshot(api, monkeypatch):
+    import server
+
+    previous = [server.MovieSearchResult(id="tt0100001", title="Kept")]
+    monkeypatch.setattr(server, "trending_snapshot", previous)
+
+    async def nothing():
+        return []
+
+    monkeypatch.setattr(server, "build_trending", nothing)
+    api.portal.call(server.warm_trending)
+
+    assert server.trending_snapshot is previous
+
+
+def test_trending_is_built_live_while_the_snapshot_is_empty(api, monkeypatch):
+    import server
+
+    monkeypatch.setattr(server, "TRENDING_IDS", ["tt0100001", "tt0100002"])
+    monkeypatch.setattr(server, "trending_snapshot", [])
+    response = api.get("/api/trending")
+
+    assert response.status_code == 200
+    assert {movie["id"] for movie in response.json()} == {"tt0100001", "tt0100002"}
@@ -0,0 +1,239 @@
+"""
+Resilient HTTP clients for upstream providers (OMDb, TMDB).
+
+Each provider gets its own ``UpstreamClient`` with:
+
+- a dedicated, tuned ``httpx.AsyncClient`` connection pool (HTTP/2 where the
+  provider supports it and the ``h2`` package is installed)
+- token-bucket rate limiting (optionally a second, slow bucket for a daily
+  quota); callers that would wait longer than ``max_wait`` fail fast with
+  ``RateLimitedError`` instead of queueing
+- jittered exponential-backoff retries for idempotent GETs on connection
+  errors and 429/5xx responses, honouring ``Retry-After``; a timed-out call is
+  not retried, so one request never costs more than one full timeout
+- a circuit breaker that opens after consecutive failed calls and rejects
+  requests with ``CircuitOpenError`` until a cool-down has passed, so a dead
+  provider costs microseconds instead of a full timeout per request
+"""
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+
+try:
+    import h2  # noqa: F401  (only needed for HTTP/2 support in httpx)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class UpstreamUnavailable(Exception):
+    """The provider was not called because it is rate limited or known to be down"""
+
+    def __init__(self, provider: str, reason: str):
+        super().__init__(f"{provider} unavailable: {reason}")
+        self.provider = provider
+        self.reason = reason
+
+
+class CircuitOpenError(UpstreamUnavailable):
+    pass
+
+
+class RateLimitedError(UpstreamUnavailable):
+    pass
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, holding at most `capacity`"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, max_wait: float) -> bool:
+        """Take one token, waiting up to max_wait seconds; False if that is not enough"""
+        # No await until the token is reserved, so concurrent callers queue up by
+        # driving the balance negative and each one sleeps only for its own turn
+        self._refill()
+        wait = max(0.0, (1 - self._tokens) / self.rate)
+        if wait > max_wait:
+            return False
+        self._tokens -= 1
+        if wait:
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                self._tokens += 1  # hand the reserved turn back
+                raise
+        return True
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures; half-opens after `reset_timeout`"""
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+    def allow(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+            self._probing = False
+        if self.state == self.HALF_OPEN and not self._probing:
+            # Let exactly one trial request through
+            self._probing = True
+            return True
+        return False
+
+    def release_probe(self):
+        """Free the half-open trial slot if the trial ended without a verdict"""
+        if self.state == self.HALF_OPEN:
+            self._probing = False
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self._failures = 0
+        self._probing = False
+
+    def record_failure(self):
+        self._failures += 1
+        if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning("Circuit opened after %d consecutive failures", self._failures)
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+            self._probing = False
+
+
+class UpstreamClient:
+    """Rate-limited, retrying, circuit-broken GET client for one provider"""
+
+    def __init__(
+        self,
+        name: str,
+        timeout: float = 10.0,
+        max_connections: int = 20,
+        max_keepalive: int = 10,
+        http2: bool = False,
+        rate: float = 10.0,
+        burst: float = 20.0,
+        daily_quota: int = 0,
+        max_wait: float = 2.0,
+        retries: int = 2,
+        backoff_base: float = 0.2,
+        backoff_max: float = 2.0,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.name = name
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_wait = max_wait
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(timeout, connect=min(timeout, 3.0)),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive),
+            http2=self.http2,
+            transport=transport,
+        )
+        self.bucket = TokenBucket(rate, burst)
+        self.quota = TokenBucket(daily_quota / 86400.0, daily_quota) if daily_quota else None
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.counters = {"requests": 0, "retries": 0, "failures": 0, "rejected": 0}
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        if response is not None:
+            retry_after = response.headers.get("retry-after", "")
+            if retry_after.isdigit() and int(retry_after) <= self.backoff_max:
+                return float(retry_after)
+        # Full jitter keeps many workers from retrying in lockstep
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def _acquire(self):
+        if self.quota is not None and not await self.quota.acquire(0):
+            self.counters["rejected"] += 1
+            raise RateLimitedError(self.name, "daily quota exhausted")
+        if not await self.bucket.acquire(self.max_wait):
+            self.counters["rejected"] += 1
+            raise RateLimitedError(self.name, "rate limit exceeded")
+
+    async def get(self, url: str, params: Optional[Dict[str, Any]] = None, **kwargs) -> httpx.Response:
+        """GET with retries; raises UpstreamUnavailable without calling out if the provider is down"""
+        if not self.breaker.allow():
+            self.counters["rejected"] += 1
+            raise CircuitOpenError(self.name, "circuit open")
+
+        try:
+            return await self._get_with_retries(url, params, **kwargs)
+        finally:
+            # Rate-limited or cancelled trial requests must not wedge a half-open circuit
+            self.breaker.release_probe()
+
+    async def _get_with_retries(self, url: str, params: Optional[Dict[str, Any]], **kwargs) -> httpx.Response:
+        attempt = 0
+        while True:
+            await self._acquire()
+            self.counters["requests"] += 1
+            response = None
+            try:
+                response = await self.client.get(url, params=params, **kwargs)
+                if response.status_code not in RETRY_STATUSES:
+                    self.breaker.record_success()
+                    return response
+                error: Exception = httpx.HTTPStatusError(
+                    f"{self.name} returned {response.status_code}", request=response.request, response=response
+                )
+            except httpx.TimeoutException:
+                # The provider is slow rather than unreachable: another full timeout will not help
+                self.counters["failures"] += 1
+                self.breaker.record_failure()
+                raise
+            except httpx.TransportError as e:
+                error = e
+
+            if attempt >= self.retries:
+                self.counters["failures"] += 1
+                self.breaker.record_failure()
+                if response is not None:
+                    return response  # let the caller's raise_for_status report it
+                raise error
+            delay = self._backoff(attempt, response)
+            attempt += 1
+            self.counters["retries"] += 1
+            logger.info("Retrying %s request in %.2fs after: %s", self.name, delay, error)
+            await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "circuit": self.breaker.state,
+            "http2": self.http2,
+            **self.counters,
+        }
+
+    async def aclose(self):
+        await self.client.aclose()
@@ -0,0 +1,108 @@
+"""
+In-process background scheduler for cache warming and precompute jobs.
+
+Jobs are plain coroutine functions registered with an interval. Each job
+runs once shortly after startup (after a random delay, so workers started
+together do not hit upstream in the same instant), then again every
+``interval`` seconds +/- ``jitter``. A shared semaphore caps how many jobs
+run at once, and a failing job is logged and retried on its next tick
+without affecting the others.
+"""
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Job:
+    __slots__ = ("name", "fn", "interval", "jitter", "initial_delay", "prewarm", "runs", "failures",
+                 "last_run", "last_duration", "last_error")
+
+    def __init__(self, name: str, fn: Callable[[], Awaitable[Any]], interval: float, jitter: float, initial_delay: float,
+                 prewarm: bool = True):
+        self.name = name
+        self.fn = fn
+        self.interval = interval
+        self.jitter = jitter
+        self.initial_delay = initial_delay
+        self.prewarm = prewarm
+        self.runs = 0
+        self.failures = 0
+        self.last_run: Optional[float] = None
+        self.last_duration: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def next_delay(self) -> float:
+        return max(1.0, self.interval * (1 + random.uniform(-self.jitter, self.jitter)))
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__ if name != "fn"}
+
+
+class Scheduler:
+    """Runs registered jobs periodically on the event loop"""
+
+    def __init__(self, max_concurrency: int = 1):
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._jobs: List[Job] = []
+        self._tasks: List[asyncio.Task] = []
+
+    def add(self, name: str, fn: Callable[[], Awaitable[Any]], interval: float, jitter: float = 0.1, initial_delay: float = 5.0,
+            prewarm: bool = True):
+        """Register a job; `initial_delay` is the upper bound of the random delay before its first run.
+
+        Jobs with prewarm=False (housekeeping) are left out of run_all() and keep their initial delay.
+        """
+        self._jobs.append(Job(name, fn, interval, jitter, initial_delay, prewarm))
+
+    async def run_job(self, job: Job) -> bool:
+        """Run a job once under the concurrency limit; returns whether it succeeded"""
+        async with self._semaphore:
+            started = time.perf_counter()
+            job.last_run = time.time()
+            try:
+                await job.fn()
+                job.last_error = None
+                return True
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                job.failures += 1
+                job.last_error = str(e)
+                logger.exception("Background job %s failed", job.name)
+                return False
+            finally:
+                job.runs += 1
+                job.last_duration = time.perf_counter() - started
+
+    async def run_all(self) -> bool:
+        """Run every job once right now (e.g. to prewarm before reporting ready); True if all succeeded"""
+        return all(await asyncio.gather(*[self.run_job(job) for job in self._jobs if job.prewarm]))
+
+    async def _loop(self, job: Job, first_delay: float):
+        await asyncio.sleep(first_delay)
+        while True:
+            await self.run_job(job)
+            await asyncio.sleep(job.next_delay())
+
+    def start(self, skip_first_run: bool = False):
+        """Start every job's loop on the running event loop; skip_first_run after run_all()"""
+        if self._tasks:
+            return
+        loop = asyncio.get_running_loop()
+        for job in self._jobs:
+            ran = skip_first_run and job.prewarm
+            first_delay = job.next_delay() if ran else random.uniform(0, job.initial_delay)
+            self._tasks.append(loop.create_task(self._loop(job, first_delay)))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [job.as_dict() for job in self._jobs]